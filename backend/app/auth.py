@@ -1,27 +1,53 @@
 # backend/app/auth.py
+"""
+JWT auth with a verified-principal cache.
+
+Hot path (no DB): sha256(token) → cached principal, valid until the token's
+exp. Revocation works through users.token_version: tokens carry a "ver"
+claim and are rejected once the user's version moved on. Versions are kept
+in memory and re-read from the DB at most every AUTH_VERSION_TTL seconds per
+user (so another worker's revoke is seen within that window; revokes done in
+this process apply immediately).
+
+    python -m app.auth create-user alice admin
+"""
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
 from fastapi import HTTPException, Depends, Header
-from passlib.context import CryptContext
 import jwt
 from datetime import datetime, timedelta
-from .db import SessionLocal
+from .database import SessionLocal
 from .models import User
+from . import metrics, passwords
 
-JWT_SECRET = "pVoor7BmwBotzyKL"
+JWT_SECRET = os.getenv("JWT_SECRET", "pVoor7BmwBotzyKL")
 JWT_ALGO = "HS256"
-ACCESS_EXPIRE_MINUTES = 60 * 24
+ACCESS_EXPIRE_MINUTES = int(os.getenv("ACCESS_EXPIRE_MINUTES", str(60 * 24)))
+
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+AUTH_VERSION_TTL = float(os.getenv("AUTH_VERSION_TTL", "30"))
 
-pwd_ctx = CryptContext(schemes=["bcrypt"], deprecated="auto")
+ROLE_ORDER = {"reader": 0, "operator": 1, "approver": 2, "admin": 3}
 
+_lock = threading.Lock()
+_principals = OrderedDict()   # sha256(token) -> (principal, exp)
+_versions = {}                # username -> (token_version | None, checked_at)
+
+# bcrypt runs in a process pool (app/passwords.py)
 def hash_password(pw: str) -> str:
-    return pwd_ctx.hash(pw)
+    return passwords.hash_password(pw)
 
 def verify_password(plain: str, hashed: str) -> bool:
-    return pwd_ctx.verify(plain, hashed)
+    return passwords.verify_password(plain, hashed)
 
 def create_token_for_user(user: User):
     payload = {
         "sub": user.username,
         "role": user.role,
+        "ver": user.token_version or 0,
         "exp": datetime.utcnow() + timedelta(minutes=ACCESS_EXPIRE_MINUTES)
     }
     return jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGO)
@@ -33,29 +59,134 @@ def get_db_user(username: str):
     finally:
         db.close()
 
-def get_current_user(authorization: str = Header(None)):
-    if not authorization:
-        raise HTTPException(status_code=401, detail="Not authenticated")
-    if not authorization.startswith("Bearer "):
-        raise HTTPException(status_code=401, detail="Invalid auth header")
-    token = authorization.split(" ", 1)[1]
+# ---- revocation (version counter) ----
+
+def _current_version(username):
+    """token_version of the user (None = unknown user); DB hit at most every TTL."""
+    now = time.monotonic()
+    entry = _versions.get(username)
+    if entry and now - entry[1] < AUTH_VERSION_TTL:
+        return entry[0]
+    user = get_db_user(username)
+    version = (user.token_version or 0) if user else None
+    _versions[username] = (version, now)
+    return version
+
+def revoke_user_tokens(username: str):
+    """Invalidate every token issued to `username` so far."""
+    db = SessionLocal()
+    try:
+        user = db.query(User).filter(User.username == username).first()
+        if not user:
+            raise KeyError(username)
+        user.token_version = (user.token_version or 0) + 1
+        db.commit()
+        version = user.token_version
+    finally:
+        db.close()
+    with _lock:
+        _versions[username] = (version, time.monotonic())
+        for key in [k for k, (p, _) in _principals.items() if p["username"] == username]:
+            del _principals[key]
+    return version
+
+# ---- token → principal ----
+
+def _token_key(token):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+def principal_from_token(token: str) -> dict:
+    key = _token_key(token)
+    now = time.time()
+    with _lock:
+        hit = _principals.get(key)
+        if hit and hit[1] > now:
+            _principals.move_to_end(key)
+            principal = hit[0]
+        else:
+            principal = None
+            if hit:
+                del _principals[key]   # expired
+
+    if principal is not None:
+        if _current_version(principal["username"]) == principal["ver"]:
+            metrics.cache_hit("auth")
+            return principal
+        with _lock:
+            _principals.pop(key, None)
+        raise HTTPException(status_code=401, detail="Token revoked")
+
+    metrics.cache_miss("auth")
     try:
         payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGO])
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(status_code=401, detail="Token expired")
     except Exception:
         raise HTTPException(status_code=401, detail="Invalid token")
     username = payload.get("sub")
     if not username:
         raise HTTPException(status_code=401, detail="Invalid token payload")
-    user = get_db_user(username)
-    if not user:
+
+    version = _current_version(username)
+    if version is None:
         raise HTTPException(status_code=401, detail="User not found")
-    return user
+    if payload.get("ver", 0) != version:
+        raise HTTPException(status_code=401, detail="Token revoked")
+
+    principal = {"username": username, "role": payload.get("role") or "reader", "ver": version}
+    with _lock:
+        _principals[key] = (principal, float(payload["exp"]))
+        while len(_principals) > AUTH_CACHE_SIZE:
+            _principals.popitem(last=False)
+    return principal
+
+def get_current_user(authorization: str = Header(None)):
+    if not authorization:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    if not authorization.startswith("Bearer "):
+        raise HTTPException(status_code=401, detail="Invalid auth header")
+    return principal_from_token(authorization.split(" ", 1)[1])
 
 # simple role dependency
 def require_role(min_role: str):
-    order = {"reader": 0, "operator": 1, "approver": 2, "admin": 3}
     def dep(user = Depends(get_current_user)):
-        if order.get(user.role, 0) < order.get(min_role, 0):
+        if ROLE_ORDER.get(user["role"], 0) < ROLE_ORDER.get(min_role, 0):
             raise HTTPException(status_code=403, detail="Insufficient role")
         return user
     return dep
+
+def cache_stats():
+    with _lock:
+        return {"principals": len(_principals), "versions": len(_versions)}
+
+# ---- CLI ----
+
+def main():
+    import argparse
+    import getpass
+    from .database import init_db
+
+    ap = argparse.ArgumentParser(description="user admin")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    c = sub.add_parser("create-user")
+    c.add_argument("username")
+    c.add_argument("role", choices=list(ROLE_ORDER))
+    r = sub.add_parser("revoke")
+    r.add_argument("username")
+    args = ap.parse_args()
+
+    init_db()
+    if args.cmd == "create-user":
+        pw = getpass.getpass("password: ")
+        db = SessionLocal()
+        try:
+            db.add(User(username=args.username, password_hash=hash_password(pw), role=args.role))
+            db.commit()
+        finally:
+            db.close()
+        print(f"✔ user {args.username} ({args.role}) created")
+    else:
+        print(f"✔ tokens of {args.username} revoked (version {revoke_user_tokens(args.username)})")
+
+if __name__ == "__main__":
+    main()
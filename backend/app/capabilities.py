@@ -0,0 +1,146 @@
+# /app/backend/app/capabilities.py
+"""
+Per-device capability profile.
+
+Which RPC variant a switch accepts is learned once and remembered, so the
+helpers in netconf.py go straight to the one that works instead of
+trying the preferred variant (and falling back) on every call:
+
+    capabilities.supports("sw01", "filter:vlans")   # True / False / None (unknown)
+    capabilities.record("sw01", "filter:vlans", False)
+
+Sources:
+  hello     server capabilities seen on connect (learn_hello). A changed
+            list (firmware upgrade, other platform) drops everything
+            learned so far.
+  failures  record(..., False) after an <rpc-error>. A failed feature is
+            probed again after CAPABILITY_RETRY seconds.
+
+Kept in memory per process and persisted in device_capabilities, so a
+restart or another worker starts from what was learned.
+"""
+import os
+import time
+import threading
+from datetime import datetime
+
+CAPABILITY_RETRY = float(os.getenv("CAPABILITY_RETRY", str(24 * 3600)))
+
+# features answered from the hello alone: name -> substring of a capability URI
+HELLO_FEATURES = {
+    "candidate": ":candidate",
+    "confirmed-commit": ":confirmed-commit",
+    "validate": ":validate",
+    "junos": "http://xml.juniper.net/netconf/junos/",   # <command>, junos RPCs
+}
+
+_lock = threading.Lock()
+_profiles = {}   # device -> {"hello": [uri, ...], "features": {name: {"ok": bool, "at": epoch}}}
+
+
+def _load(device):
+    with _lock:
+        p = _profiles.get(device)
+    if p is not None:
+        return p
+    from .database import SessionLocal
+    from .models import DeviceCapability
+    db = SessionLocal()
+    try:
+        row = db.query(DeviceCapability).filter(DeviceCapability.device == device).one_or_none()
+        p = {"hello": list(row.hello or []), "features": dict(row.features or {})} if row \
+            else {"hello": [], "features": {}}
+    finally:
+        db.close()
+    with _lock:
+        return _profiles.setdefault(device, p)
+
+
+def _save(device, hello, features):
+    from .database import SessionLocal
+    from .models import DeviceCapability
+    db = SessionLocal()
+    try:
+        db.merge(DeviceCapability(device=device, hello=hello, features=features,
+                                  updated_at=datetime.utcnow()))
+        db.commit()
+    finally:
+        db.close()
+
+
+def learn_hello(device, server_capabilities):
+    """Remember the hello capabilities; no DB write while they stay the same."""
+    caps = sorted(set(server_capabilities))
+    p = _load(device)
+    with _lock:
+        if p["hello"] == caps:
+            return
+        changed = bool(p["hello"])
+        p["hello"] = caps
+        if changed:
+            p["features"] = {}
+        snap = (list(p["hello"]), dict(p["features"]))
+    if changed:
+        print(f"ℹ️ {device}: capabilities changed, relearning RPC variants")
+    _save(device, *snap)
+
+
+def supports(device, feature):
+    """True / False, or None when not known (yet) — callers then try it."""
+    p = _load(device)
+    if feature in HELLO_FEATURES:
+        if not p["hello"]:
+            return None
+        return any(HELLO_FEATURES[feature] in uri for uri in p["hello"])
+    f = p["features"].get(feature)
+    if f is None:
+        return None
+    if not f["ok"] and time.time() - f["at"] > CAPABILITY_RETRY:
+        return None
+    return f["ok"]
+
+
+def record(device, feature, ok):
+    """Store the outcome of trying `feature`; only changes hit the DB."""
+    p = _load(device)
+    now = time.time()
+    with _lock:
+        cur = p["features"].get(feature)
+        if cur is not None and cur["ok"] == ok and (ok or now - cur["at"] < CAPABILITY_RETRY):
+            return
+        p["features"] = {**p["features"], feature: {"ok": ok, "at": now}}
+        snap = (list(p["hello"]), dict(p["features"]))
+    if not ok:
+        print(f"ℹ️ {device}: {feature} rejected, using the fallback")
+    _save(device, *snap)
+
+
+def profile(device):
+    p = _load(device)
+    return {
+        "device": device,
+        "hello": p["hello"],
+        "derived": {name: supports(device, name) for name in HELLO_FEATURES},
+        "features": {name: {"ok": f["ok"], "at": datetime.utcfromtimestamp(f["at"]).isoformat()}
+                     for name, f in p["features"].items()},
+    }
+
+
+def forget(device=None):
+    """Drop what was learned (memory + DB), for one device or all."""
+    from .database import SessionLocal
+    from .models import DeviceCapability
+    with _lock:
+        if device is None:
+            _profiles.clear()
+        else:
+            _profiles.pop(device, None)
+    db = SessionLocal()
+    try:
+        q = db.query(DeviceCapability)
+        if device is not None:
+            q = q.filter(DeviceCapability.device == device)
+        q.delete(synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
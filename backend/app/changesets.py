@@ -0,0 +1,239 @@
+# /app/backend/app/changesets.py
+"""
+Change sets: many interface changes, across switches, submitted, approved
+and applied as one unit (e.g. a VLAN rolled out to 200 access ports).
+
+    POST /api/changesets                 JSON or text/csv, see parse()
+    POST /api/changesets/{id}/approve
+
+Submission validates every change in one pass (app/validation.py) and
+inserts the set + its change requests in one transaction. Apply opens one
+NETCONF session per switch and sends all of that switch's changes as a
+single edit-config + commit (netconf.apply_interface_changes), for
+CHANGESET_CONCURRENCY switches at a time.
+"""
+import io
+import os
+import csv
+import json
+from datetime import datetime
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from . import models, netconf, validation, health, rollback, tracing
+from .database import SessionLocal
+
+CHANGESET_MAX = int(os.getenv("CHANGESET_MAX", "2000"))
+CHANGESET_CONCURRENCY = int(os.getenv("CHANGESET_CONCURRENCY", "8"))
+
+
+# ---- input ----
+
+def _change(device, interface, type="config", config=None):
+    if not device or not interface:
+        raise ValueError("every change needs a device and an interface")
+    if not isinstance(device, str) or not isinstance(interface, str):
+        raise ValueError("device and interface must be strings")
+    if type not in ("config", "delete"):
+        raise ValueError(f"{device} {interface}: action must be 'config' or 'delete'")
+    if config is not None and not isinstance(config, dict):
+        raise ValueError(f"{device} {interface}: config must be an object")
+    return {"device": device.strip(), "interface": interface.strip(), "type": type,
+            "config": None if type == "delete" else (config or {})}
+
+
+def _parse_csv(text):
+    """
+    device,interface,action,mode,access_vlan,trunk_vlans,native_vlan,description
+    sw01,ge-0/0/1,,access,v101,,,desk 1
+    sw01,ge-0/0/2,,trunk,,v101 v102,101,
+    sw02,ge-0/0/9,delete,,,,,
+    trunk_vlans: separated by spaces or ';'. Empty action = config.
+    """
+    reader = csv.DictReader(io.StringIO(text.lstrip("\ufeff")))
+    missing = {"device", "interface"} - set(reader.fieldnames or [])
+    if missing:
+        raise ValueError(f"CSV header misses {', '.join(sorted(missing))}")
+    changes = []
+    for row in reader:
+        row = {k.strip(): (v or "").strip() for k, v in row.items() if k}
+        if not any(row.values()):
+            continue
+        action = row.get("action") or "config"
+        config = None
+        if action != "delete":
+            config = {
+                "mode": row.get("mode") or None,
+                "access_vlan": row.get("access_vlan") or None,
+                "trunk_vlans": row.get("trunk_vlans", "").replace(";", " ").split(),
+                "native_vlan": row.get("native_vlan") or None,
+                "description": row.get("description") or "",
+            }
+        changes.append(_change(row.get("device"), row.get("interface"), action, config))
+    return changes
+
+
+def parse(raw, content_type):
+    """
+    (changes, comment) from a request body.
+      application/json  {"comment": "...", "changes": [
+                           {"device", "interface", "config": {...}},
+                           {"device", "interface", "type": "delete"}, ...]}
+                        (a bare list of changes works too)
+      text/csv          see _parse_csv
+    """
+    text = raw.decode("utf-8")
+    if "csv" in content_type:
+        changes, comment = _parse_csv(text), None
+    else:
+        body = json.loads(text)
+        if isinstance(body, list):
+            items, comment = body, None
+        elif isinstance(body, dict):
+            items, comment = body.get("changes") or [], body.get("comment")
+        else:
+            raise ValueError("body must be an object or a list of changes")
+        if not isinstance(items, list):
+            raise ValueError("changes must be a list")
+        if comment is not None and not isinstance(comment, str):
+            raise ValueError("comment must be a string")
+        changes = []
+        for c in items:
+            if not isinstance(c, dict):
+                raise ValueError("every change must be an object")
+            changes.append(_change(c.get("device"), c.get("interface"),
+                                   c.get("type") or c.get("action") or "config", c.get("config")))
+    if not changes:
+        raise ValueError("no changes")
+    if len(changes) > CHANGESET_MAX:
+        raise ValueError(f"too many changes ({len(changes)} > {CHANGESET_MAX})")
+    return changes, comment
+
+
+def validate(db, changes):
+    """[{"index", "device", "interface", "errors"}] for every change that can't be applied."""
+    problems, seen = [], set()
+    for i, c in enumerate(changes):
+        errors = validation.check(db, c["device"], c["interface"], c["config"], c["type"])
+        key = (c["device"], c["interface"])
+        if key in seen:
+            errors.append(f"{c['interface']}: more than one change in this set")
+        seen.add(key)
+        if errors:
+            problems.append({"index": i, "device": c["device"], "interface": c["interface"],
+                             "errors": errors})
+    return problems
+
+
+# ---- storage ----
+
+def create(db, changes, requester, comment=None):
+    """Insert the set + one change request per change, one transaction."""
+    cs = models.ChangeSet(requester=requester, comment=comment,
+                          status=models.RequestStatus.pending)
+    db.add(cs)
+    db.flush()
+    reqs = [
+        models.ChangeRequest(device=c["device"], interface=c["interface"], type=c["type"],
+                             config=c["config"] or {}, requester=requester,
+                             status=models.RequestStatus.pending, comment=comment)
+        for c in changes
+    ]
+    db.add_all(reqs)
+    db.flush()
+    db.add_all([models.ChangeSetItem(request_id=r.id, change_set_id=cs.id) for r in reqs])
+    db.commit()
+    return cs, reqs
+
+
+def requests_of(db, cs_id):
+    return (
+        db.query(models.ChangeRequest)
+          .join(models.ChangeSetItem, models.ChangeSetItem.request_id == models.ChangeRequest.id)
+          .filter(models.ChangeSetItem.change_set_id == cs_id)
+          .order_by(models.ChangeRequest.id)
+          .all()
+    )
+
+
+def as_change(req):
+    return {"device": req.device, "interface": req.interface, "type": req.type or "config",
+            "config": None if req.type == "delete" else req.config}
+
+
+def to_dict(cs, reqs):
+    by_status = defaultdict(int)
+    for r in reqs:
+        by_status[r.status.value] += 1
+    return {
+        "id": cs.id,
+        "requester": cs.requester,
+        "approver": cs.approver,
+        "status": cs.status.value,
+        "comment": cs.comment,
+        "created_at": cs.created_at.isoformat() if cs.created_at else None,
+        "updated_at": cs.updated_at.isoformat() if cs.updated_at else None,
+        "devices": sorted({r.device for r in reqs}),
+        "counts": dict(by_status),
+        "requests": [{"id": r.id, "device": r.device, "interface": r.interface, "type": r.type,
+                      "config": r.config, "status": r.status.value, "comment": r.comment}
+                     for r in reqs],
+    }
+
+
+# ---- apply ----
+
+def _apply_device(device, changes):
+    """All changes of one switch: one session, one edit-config + commit, then refresh."""
+    try:
+        with netconf.connect(device) as nc:
+            netconf.apply_interface_changes(nc, changes)
+    except health.DeviceUnavailable as e:
+        return device, f"device unavailable: {e}", None
+    except Exception as e:
+        return device, str(e), None
+
+    db = SessionLocal()
+    try:
+        rollback.invalidate(db, device)
+    finally:
+        db.close()
+    from .jobs.refresh_interfaces import refresh_interfaces_for_device
+    try:
+        refresh_interfaces_for_device(device, reason="commit")
+        refresh_error = None
+    except Exception as e:
+        refresh_error = str(e)
+    return device, None, refresh_error
+
+
+def apply(reqs):
+    """
+    Apply requests grouped per switch, CHANGESET_CONCURRENCY switches in
+    parallel. Returns {device: {"error": str | None, "refresh_error": ...}}.
+    """
+    per_device = defaultdict(list)
+    for r in reqs:
+        c = as_change(r)
+        per_device[r.device].append((c["interface"], c["config"]))
+
+    workers = max(1, min(CHANGESET_CONCURRENCY, len(per_device)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="changeset") as pool:
+        futures = [pool.submit(tracing.wrap(_apply_device), device, changes)
+                   for device, changes in per_device.items()]
+        results = [f.result() for f in futures]
+    return {dev: {"error": err, "refresh_error": rerr} for dev, err, rerr in results}
+
+
+def finish(cs, reqs, results):
+    """Per-request outcome from the per-device results; the set fails if any switch failed."""
+    now = datetime.utcnow()
+    for r in reqs:
+        err = results[r.device]["error"]
+        if err:
+            r.status = models.RequestStatus.failed
+            r.comment = err
+        r.updated_at = now
+    failed = [d for d, res in results.items() if res["error"]]
+    cs.status = models.RequestStatus.failed if failed else models.RequestStatus.approved
+    return failed
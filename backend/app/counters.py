@@ -0,0 +1,396 @@
+# /app/backend/app/counters.py
+"""
+Interface counter time series.
+
+Traffic/error counters (`show interfaces statistics`) of watched ports are
+sampled every COUNTER_INTERVAL seconds into fixed-size ring buffers. The
+rings live in one memory-mapped file (COUNTER_FILE), so every gunicorn
+worker reads the same series and the size is fixed up front:
+
+    COUNTER_SLOTS x (128 + COUNTER_SAMPLES x 56) bytes
+    defaults: 1024 ports x 360 samples (1h at 10s) = ~20 MB
+
+Counters never end up in the interface_cache JSON.
+
+What is sampled:
+  - a port whose /stats endpoint was read in the last COUNTER_WATCH_TTL s
+  - all cached ports of the switches in COUNTER_DEVICES ("sw01,sw02")
+When all slots are taken, the slot with the oldest expired watch is reused.
+
+One worker polls (whoever holds COUNTER_FILE.leader); the others only read.
+If that worker dies, another one takes over on its next tick.
+"""
+import os
+import mmap
+import time
+import fcntl
+import struct
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from . import metrics, scheduler, health
+
+COUNTER_FILE = os.getenv(
+    "COUNTER_FILE",
+    os.path.join(os.path.dirname(os.getenv("APP_DB_PATH", "/app/backend/data/app.db")), "counters.bin"),
+)
+COUNTER_SLOTS = int(os.getenv("COUNTER_SLOTS", "1024"))
+COUNTER_SAMPLES = int(os.getenv("COUNTER_SAMPLES", "360"))
+COUNTER_INTERVAL = float(os.getenv("COUNTER_INTERVAL", "10"))
+COUNTER_WATCH_TTL = int(os.getenv("COUNTER_WATCH_TTL", "900"))
+COUNTER_CONCURRENCY = int(os.getenv("COUNTER_CONCURRENCY", "4"))
+COUNTER_DEVICES = [d.strip() for d in os.getenv("COUNTER_DEVICES", "").split(",") if d.strip()]
+
+FIELDS = ("in_bytes", "out_bytes", "in_packets", "out_packets", "in_errors", "out_errors")
+
+_MAGIC = b"CTR1"
+_FILE_HDR = struct.Struct("<4sIII")          # magic, version, slots, samples
+_FILE_HDR_SIZE = 64
+_KEY_SIZE = 112                               # bytes; longer keys are rejected, not truncated
+_SLOT_HDR = struct.Struct(f"<IIII{_KEY_SIZE}s")  # seq, head, count, watched_until, key
+_SAMPLE = struct.Struct("<d6Q")               # ts, FIELDS
+_PINNED = 0xFFFFFFFF                          # COUNTER_DEVICES ports: never expire
+
+COUNTER_SERIES = metrics.Gauge("counter_series_watched", "Ports currently sampled")
+COUNTER_POLL_SECONDS = metrics.Histogram(
+    "counter_poll_seconds", "One counter collection round over all watched ports")
+
+
+class RingStore:
+    """Fixed number of per-port rings in a memory-mapped file."""
+
+    def __init__(self, path, slots, samples):
+        self.path = path
+        self.slots = slots
+        self.samples = samples
+        self.slot_size = _SLOT_HDR.size + samples * _SAMPLE.size
+        size = _FILE_HDR_SIZE + slots * self.slot_size
+
+        self._mu = threading.Lock()
+        self._lock_fh = open(path + ".lock", "a+")
+        self._index = {}    # key -> slot (hint; verified against the file)
+
+        with self._alloc_lock():
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                hdr = os.pread(fd, _FILE_HDR.size, 0)
+                want = _FILE_HDR.pack(_MAGIC, 1, slots, samples)
+                if hdr != want or os.fstat(fd).st_size != size:
+                    # new file or other geometry: start empty
+                    os.ftruncate(fd, 0)
+                    os.ftruncate(fd, size)
+                    os.pwrite(fd, want, 0)
+                self.mm = mmap.mmap(fd, size)
+            finally:
+                os.close(fd)
+
+    @contextmanager
+    def _alloc_lock(self):
+        with self._mu:
+            fcntl.flock(self._lock_fh, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._lock_fh, fcntl.LOCK_UN)
+
+    def _off(self, slot):
+        return _FILE_HDR_SIZE + slot * self.slot_size
+
+    def _hdr(self, slot):
+        seq, head, count, until, key = _SLOT_HDR.unpack_from(self.mm, self._off(slot))
+        return seq, head, count, until, key.rstrip(b"\0").decode()
+
+    def _scan(self):
+        self._index = {}
+        for slot in range(self.slots):
+            key = self._hdr(slot)[4]
+            if key:
+                self._index[key] = slot
+
+    def find(self, key):
+        slot = self._index.get(key)
+        if slot is not None and self._hdr(slot)[4] == key:
+            return slot
+        self._scan()   # allocated by another worker, or reused
+        return self._index.get(key)
+
+    def watch(self, key, until):
+        """Make sure `key` has a slot watched until `until` (epoch s). None = store full."""
+        raw = key.encode()
+        if len(raw) > _KEY_SIZE:
+            # a truncated key could collide with another port's series
+            raise ValueError(f"counter key longer than {_KEY_SIZE} bytes: {key[:40]}…")
+        now = int(time.time())
+        with self._alloc_lock():
+            slot = self.find(key)
+            if slot is None:
+                slot = self._free_slot(now)
+                if slot is None:
+                    return None
+                off = self._off(slot)
+                seq = self._hdr(slot)[0]
+                _SLOT_HDR.pack_into(self.mm, off, seq + 2, 0, 0, 0, raw)
+                self._index[key] = slot
+            seq, head, count, cur, k = self._hdr(slot)
+            if cur != _PINNED and (until == _PINNED or until > cur):
+                _SLOT_HDR.pack_into(self.mm, self._off(slot), seq, head, count, until, k.encode())
+            return slot
+
+    def _free_slot(self, now):
+        best, best_until = None, None
+        for slot in range(self.slots):
+            _, _, _, until, key = self._hdr(slot)
+            if not key:
+                return slot
+            if until != _PINNED and until < now and (best is None or until < best_until):
+                best, best_until = slot, until
+        return best
+
+    def watched(self):
+        """[(key, watched_until)] of slots that are still being watched."""
+        now = int(time.time())
+        out = []
+        for slot in range(self.slots):
+            _, _, _, until, key = self._hdr(slot)
+            if key and until >= now:
+                out.append((key, until))
+        return out
+
+    def append(self, key, ts, values):
+        with self._alloc_lock():   # slot can't be reassigned meanwhile
+            slot = self.find(key)
+            if slot is None:
+                return
+            off = self._off(slot)
+            seq, head, count, until, k = self._hdr(slot)
+            # seqlock: odd while writing, readers retry
+            struct.pack_into("<I", self.mm, off, seq + 1)
+            _SAMPLE.pack_into(self.mm, off + _SLOT_HDR.size + head * _SAMPLE.size, ts, *values)
+            _SLOT_HDR.pack_into(self.mm, off, seq + 2, (head + 1) % self.samples,
+                                min(count + 1, self.samples), until, k.encode())
+
+    def read(self, key):
+        """(watched_until, [(ts, *FIELDS)] oldest first) or None."""
+        slot = self.find(key)
+        if slot is None:
+            return None
+        off = self._off(slot)
+        for _ in range(100):
+            seq, head, count, until, k = self._hdr(slot)
+            if seq & 1:
+                time.sleep(0)
+                continue
+            raw = self.mm[off + _SLOT_HDR.size: off + self.slot_size]
+            if struct.unpack_from("<I", self.mm, off)[0] != seq:
+                continue
+            if k != key:
+                return None
+            start = (head - count) % self.samples
+            rows = [_SAMPLE.unpack_from(raw, ((start + i) % self.samples) * _SAMPLE.size)
+                    for i in range(count)]
+            return until, rows
+        return None
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = RingStore(COUNTER_FILE, COUNTER_SLOTS, COUNTER_SAMPLES)
+        return _store
+
+
+def _key(device, ifname):
+    return f"{device}|{ifname}"
+
+
+# ---- collection ----
+
+def _pin_devices(st):
+    if not COUNTER_DEVICES:
+        return
+    from .database import SessionLocal
+    from .models import InterfaceCache
+    db = SessionLocal()
+    try:
+        rows = db.query(InterfaceCache).filter(InterfaceCache.device.in_(COUNTER_DEVICES)).all()
+        for row in rows:
+            for p in row.data or []:
+                if p.get("name") and not p.get("vc_port"):
+                    try:
+                        st.watch(_key(row.device, p["name"]), _PINNED)
+                    except ValueError as e:
+                        print(f"✖ counters {row.device}: {e}")
+    finally:
+        db.close()
+
+
+def _collect_device(device, ifnames):
+    from . import netconf
+    try:
+        with scheduler.priority(scheduler.BACKGROUND):
+            counters = netconf.get_interface_counters(device, ifnames)
+    except health.DeviceUnavailable:
+        return 0
+    except Exception as e:
+        print(f"✖ counters {device}: {e}")
+        return 0
+    st = store()
+    ts = time.time()
+    for ifname in ifnames:
+        values = counters.get(ifname)
+        if values is not None:
+            st.append(_key(device, ifname), ts, [values[f] for f in FIELDS])
+    return len(counters)
+
+
+def collect_once(pool=None):
+    st = store()
+    _pin_devices(st)
+    by_device = {}
+    for key, _ in st.watched():
+        device, ifname = key.split("|", 1)
+        by_device.setdefault(device, []).append(ifname)
+    COUNTER_SERIES.set(sum(len(v) for v in by_device.values()))
+    if not by_device:
+        return 0
+    with COUNTER_POLL_SECONDS.time():
+        if pool is None:
+            return sum(_collect_device(d, names) for d, names in by_device.items())
+        return sum(pool.map(lambda item: _collect_device(*item), by_device.items()))
+
+
+_stop = threading.Event()
+_thread = None
+
+
+def _loop():
+    leader_fh = open(COUNTER_FILE + ".leader", "a+")
+    leader = False
+    with ThreadPoolExecutor(max_workers=COUNTER_CONCURRENCY, thread_name_prefix="counters") as pool:
+        while not _stop.is_set():
+            started = time.monotonic()
+            if not leader:
+                try:
+                    fcntl.flock(leader_fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    leader = True
+                    print(f"✔ counter collector active in pid {os.getpid()}")
+                except OSError:
+                    pass
+            if leader:
+                try:
+                    collect_once(pool)
+                except Exception as e:
+                    print(f"✖ counter collection failed: {e}")
+            _stop.wait(max(0.5, COUNTER_INTERVAL - (time.monotonic() - started)))
+    leader_fh.close()
+
+
+def start():
+    """Start the collector thread (every worker; only the leader polls)."""
+    global _thread
+    if _thread is None:
+        store()
+        _stop.clear()
+        _thread = threading.Thread(target=_loop, name="counter-collector", daemon=True)
+        _thread.start()
+
+
+def stop():
+    global _thread
+    _stop.set()
+    if _thread is not None:
+        _thread.join(timeout=5)
+        _thread = None
+
+
+# ---- query ----
+
+def _rates(rows):
+    """[(t_end, dt, {field: per-second delta})] between consecutive samples."""
+    out = []
+    for a, b in zip(rows, rows[1:]):
+        dt = b[0] - a[0]
+        if dt <= 0:
+            continue
+        deltas = [y - x for x, y in zip(a[1:], b[1:])]
+        if any(d < 0 for d in deltas):
+            continue   # counter reset / clear statistics
+        out.append((b[0], dt, dict(zip(FIELDS, (d / dt for d in deltas)))))
+    return out
+
+
+def downsample(rates, start, end, points):
+    """Average rates into `points` equal time buckets (dt-weighted); empty buckets skipped."""
+    width = (end - start) / points
+    buckets = {}
+    for t, dt, r in rates:
+        if t <= start or t > end:
+            continue
+        i = min(points - 1, int((t - start) / width))
+        b = buckets.setdefault(i, [0.0, dict.fromkeys(FIELDS, 0.0)])
+        b[0] += dt
+        for f in FIELDS:
+            b[1][f] += r[f] * dt
+    series = []
+    for i in sorted(buckets):
+        total, acc = buckets[i]
+        avg = {f: acc[f] / total for f in FIELDS}
+        series.append({
+            "t": round(start + (i + 1) * width, 3),
+            "in_bps": round(avg["in_bytes"] * 8, 1),
+            "out_bps": round(avg["out_bytes"] * 8, 1),
+            "in_pps": round(avg["in_packets"], 2),
+            "out_pps": round(avg["out_packets"], 2),
+            "in_errors_ps": round(avg["in_errors"], 4),
+            "out_errors_ps": round(avg["out_errors"], 4),
+        })
+    return series
+
+
+def _port_known(device, ifname):
+    from .database import SessionLocal
+    from . import validation
+    db = SessionLocal()
+    try:
+        return validation.interface_known(db, device, ifname)
+    finally:
+        db.close()
+
+
+def stats(device, ifname, window=900, points=60):
+    """
+    Rates for one port over the last `window` s; (re)starts watching it.
+    KeyError for a port the switch doesn't have: watching it would cost an
+    RPC error every interval.
+    """
+    if not _port_known(device, ifname):
+        raise KeyError(f"unknown interface {ifname}")
+    st = store()
+    key = _key(device, ifname)
+    slot = st.watch(key, int(time.time()) + COUNTER_WATCH_TTL)
+    data = st.read(key) if slot is not None else None
+    until, rows = data if data else (0, [])
+
+    now = time.time()
+    window = min(window, COUNTER_SAMPLES * COUNTER_INTERVAL)
+    rows = [r for r in rows if r[0] >= now - window - COUNTER_INTERVAL]
+    latest = dict(zip(("ts",) + FIELDS, rows[-1])) if rows else None
+    return {
+        "device": device,
+        "interface": ifname,
+        "interval": COUNTER_INTERVAL,
+        "window": window,
+        "watching": slot is not None,
+        "watched_until": None if not until else
+                         "pinned" if until == _PINNED else datetime.utcfromtimestamp(until).isoformat(),
+        "samples": len(rows),
+        "latest": latest,
+        "series": downsample(_rates(rows), now - window, now, points),
+    }
@@ -13,6 +13,10 @@ engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False} i
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# commit latency histogram (see /metrics)
+from .metrics import instrument_sessions
+instrument_sessions(SessionLocal)
+
 def init_db():
     # creates tables if not existing (useful for simple deployments)
     from . import models
@@ -0,0 +1,186 @@
+# /app/backend/app/events.py
+"""
+Pub/sub broker behind the /api/events SSE stream.
+
+Topics:
+  device:<name>   interface / VLAN cache updates for one switch
+  device:*        wildcard: updates for every switch
+  requests        change request status transitions
+  audit           new audit log entries
+
+Publishers are plain (sync) functions running in the threadpool; subscribers
+are SSE streams living on the event loop. publish() hands events over with
+call_soon_threadsafe so it is safe to call from any thread.
+
+Across processes: with the shared (sqlite) cache backend every publish()
+is also appended to the shared event log, and a tailer thread in each
+process with subscribers delivers the events that other processes (the
+other gunicorn worker, nightly refresh, oper poller) appended. Own events
+are delivered directly and skipped by the tailer.
+"""
+import os
+import json
+import time
+import asyncio
+import itertools
+import socket
+import threading
+
+from . import sharedcache
+
+QUEUE_MAX = int(os.getenv("EVENTS_QUEUE_MAX", "256"))
+HEARTBEAT = float(os.getenv("EVENTS_HEARTBEAT", "15"))
+RETRY_MS = int(os.getenv("EVENTS_RETRY_MS", "3000"))
+TAIL_INTERVAL = float(os.getenv("EVENTS_TAIL_INTERVAL", "0.5"))
+
+_LOCK = threading.Lock()
+_subscribers = {}          # topic -> set(Subscription)
+_seq = itertools.count(1)
+_tailer = {"pid": None}    # pid that runs the tailer thread (fork-safe)
+
+
+def _origin():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class Subscription:
+    def __init__(self, topics, loop):
+        self.topics = set(topics)
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=QUEUE_MAX)
+        self.overflow = False
+
+    def _put(self, event):
+        # runs on the subscriber's loop
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # slow consumer: drop and let the client resync its state
+            self.overflow = True
+
+
+def subscribe(topics) -> Subscription:
+    """Register a subscription for the calling event loop."""
+    sub = Subscription(topics, asyncio.get_running_loop())
+    with _LOCK:
+        for t in sub.topics:
+            _subscribers.setdefault(t, set()).add(sub)
+    _ensure_tailer()
+    return sub
+
+
+def unsubscribe(sub: Subscription):
+    with _LOCK:
+        for t in sub.topics:
+            subs = _subscribers.get(t)
+            if subs:
+                subs.discard(sub)
+                if not subs:
+                    _subscribers.pop(t, None)
+
+
+def publish(topic: str, type: str, data) -> dict:
+    """
+    Fan an event out to every subscriber of `topic`.
+    device:<name> events are also delivered to device:* subscribers.
+    """
+    event = {
+        "id": None,
+        "topic": topic,
+        "type": type,
+        "ts": time.time(),
+        "data": data,
+    }
+    if sharedcache.shared():
+        try:
+            event["id"] = sharedcache.append_event(_origin(), json.dumps(event, default=str))
+        except Exception as e:
+            print(f"⚠️ event log append failed: {e}")
+    if event["id"] is None:
+        event["id"] = next(_seq)
+    _deliver(event)
+    return event
+
+
+def _deliver(event):
+    """Hand `event` to the local subscribers of its topic."""
+    topic = event["topic"]
+    with _LOCK:
+        targets = set(_subscribers.get(topic, ()))
+        if topic.startswith("device:"):
+            targets |= _subscribers.get("device:*", set())
+
+    for sub in targets:
+        try:
+            sub.loop.call_soon_threadsafe(sub._put, event)
+        except RuntimeError:
+            # loop already closed (client went away mid-publish)
+            unsubscribe(sub)
+
+
+def _ensure_tailer():
+    if not sharedcache.shared():
+        return
+    with _LOCK:
+        if _tailer["pid"] == os.getpid():
+            return
+        _tailer["pid"] = os.getpid()
+    threading.Thread(target=_tail, name="events-tail", daemon=True).start()
+
+
+def _tail():
+    """Deliver events appended by other processes to the local subscribers."""
+    me = _origin()
+    last = None
+    while True:
+        try:
+            if last is None or not subscriber_count():
+                last = sharedcache.last_event_id()
+                rows = []
+            else:
+                rows = sharedcache.events_since(last)
+        except Exception as e:
+            # e.g. "database is locked": try again next tick, the thread must live on
+            print(f"⚠️ event log read failed: {e}")
+            rows = []
+        for id, origin, payload in rows:
+            last = id
+            if origin != me:
+                _deliver({**json.loads(payload), "id": id})
+        time.sleep(TAIL_INTERVAL)
+
+
+def subscriber_count() -> int:
+    with _LOCK:
+        return len({s for subs in _subscribers.values() for s in subs})
+
+
+def format_sse(event: dict) -> str:
+    payload = json.dumps(event["data"], default=str)
+    return f"id: {event['id']}\nevent: {event['type']}\ndata: {payload}\n\n"
+
+
+async def stream(sub: Subscription, request=None):
+    """
+    Async generator producing text/event-stream chunks for one subscriber.
+    Sends a keepalive comment every HEARTBEAT seconds so proxies keep the
+    connection open.
+    """
+    try:
+        yield f"retry: {RETRY_MS}\n\n"
+        while True:
+            if request is not None and await request.is_disconnected():
+                break
+            try:
+                event = await asyncio.wait_for(sub.queue.get(), HEARTBEAT)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+
+            yield format_sse(event)
+
+            if sub.overflow and sub.queue.empty():
+                sub.overflow = False
+                yield format_sse({"id": event["id"], "type": "resync", "data": {}})
+    finally:
+        unsubscribe(sub)
@@ -0,0 +1,182 @@
+# /app/backend/app/health.py
+"""
+Per-device health tracking with a circuit breaker.
+
+    closed     normal operation; consecutive transport failures are counted
+    open       after BREAKER_FAILURES failures: calls fail fast with
+               DeviceUnavailable until BREAKER_COOLDOWN seconds have passed
+    half_open  one probe session is let through; success closes the
+               circuit, failure opens it again (cooldown doubles, capped)
+
+Only transport problems count (connect/handshake errors, RPC timeouts,
+dropped sessions). An <rpc-error> from the switch means it is reachable.
+
+State is per process (each gunicorn worker keeps its own breakers).
+"""
+import os
+import time
+import threading
+
+from . import events, metrics
+
+BREAKER_FAILURES = int(os.getenv("BREAKER_FAILURES", "3"))
+BREAKER_COOLDOWN = float(os.getenv("BREAKER_COOLDOWN", "30"))
+BREAKER_COOLDOWN_MAX = float(os.getenv("BREAKER_COOLDOWN_MAX", "300"))
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+_lock = threading.Lock()
+_devices = {}   # device -> state dict (see _entry)
+
+BREAKER_STATE = metrics.Gauge(
+    "netconf_breaker_open", "1 while the device circuit breaker is open/half-open", ("device",))
+BREAKER_REJECTED = metrics.Counter(
+    "netconf_breaker_rejected_total", "Calls failed fast by an open circuit", ("device",))
+
+
+class DeviceUnavailable(Exception):
+    """Raised instead of connecting while a device's circuit is open."""
+
+    def __init__(self, device, retry_after, last_error=None):
+        self.device = device
+        self.retry_after = max(1, int(retry_after + 0.999))
+        self.last_error = last_error
+        super().__init__(f"{device} unreachable (circuit open, retry in {self.retry_after}s): {last_error}")
+
+
+def _entry(device):
+    e = _devices.get(device)
+    if e is None:
+        e = _devices[device] = {
+            "state": CLOSED,
+            "failures": 0,
+            "cooldown": BREAKER_COOLDOWN,
+            "opened_at": None,
+            "probe": False,
+            "last_error": None,
+            "last_failure": None,
+            "last_success": None,
+        }
+    return e
+
+
+def _transition(device, e, state):
+    if e["state"] == state:
+        return
+    e["state"] = state
+    BREAKER_STATE.set(0 if state == CLOSED else 1, device=device)
+    print(f"circuit {device}: {state}" + (f" ({e['last_error']})" if state == OPEN else ""))
+    events.publish(f"device:{device}", "health", _public(device, e))
+
+
+def check(device):
+    """Read-only fast-fail: raise while the circuit is open and cooling down."""
+    with _lock:
+        e = _devices.get(device)
+        if e is None or e["state"] != OPEN:
+            return
+        retry = e["opened_at"] + e["cooldown"] - time.time()
+        if retry <= 0:
+            return
+        last_error = e["last_error"]
+    BREAKER_REJECTED.inc(device=device)
+    raise DeviceUnavailable(device, retry, last_error)
+
+
+def before_call(device):
+    """
+    Gate a new NETCONF session. Raises DeviceUnavailable while the circuit
+    is open (or another caller is already probing a half-open circuit).
+    """
+    with _lock:
+        e = _entry(device)
+        if e["state"] == CLOSED:
+            return
+        now = time.time()
+        if e["state"] == OPEN and now - e["opened_at"] >= e["cooldown"]:
+            _transition(device, e, HALF_OPEN)
+        if e["state"] == HALF_OPEN and not e["probe"]:
+            e["probe"] = True
+            return
+        retry = max(0.0, e["opened_at"] + e["cooldown"] - now) if e["state"] == OPEN else 1
+        last_error = e["last_error"]
+    BREAKER_REJECTED.inc(device=device)
+    raise DeviceUnavailable(device, retry, last_error)
+
+
+def record_success(device):
+    with _lock:
+        e = _entry(device)
+        e["failures"] = 0
+        e["probe"] = False
+        e["cooldown"] = BREAKER_COOLDOWN
+        e["last_success"] = time.time()
+        _transition(device, e, CLOSED)
+
+
+def record_failure(device, error):
+    with _lock:
+        e = _entry(device)
+        e["failures"] += 1
+        e["last_error"] = str(error) or type(error).__name__
+        e["last_failure"] = time.time()
+        if e["state"] == HALF_OPEN:
+            e["probe"] = False
+            e["cooldown"] = min(e["cooldown"] * 2, BREAKER_COOLDOWN_MAX)
+            e["opened_at"] = time.time()
+            _transition(device, e, OPEN)
+        elif e["state"] == CLOSED and e["failures"] >= BREAKER_FAILURES:
+            e["opened_at"] = time.time()
+            _transition(device, e, OPEN)
+
+
+def reachable(device):
+    """False when the last attempt failed or the circuit isn't closed."""
+    with _lock:
+        e = _devices.get(device)
+        return e is None or (e["state"] == CLOSED and e["failures"] == 0)
+
+
+def is_stale(device):
+    """Cached data can't currently be refreshed from the device."""
+    with _lock:
+        e = _devices.get(device)
+        return e is not None and e["state"] != CLOSED
+
+
+def _public(device, e):
+    def iso(ts):
+        return time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(ts)) if ts else None
+
+    retry = None
+    if e["state"] == OPEN:
+        retry = max(0, round(e["opened_at"] + e["cooldown"] - time.time(), 1))
+    return {
+        "device": device,
+        "state": e["state"],
+        "stale": e["state"] != CLOSED,
+        "failures": e["failures"],
+        "last_error": e["last_error"],
+        "last_failure": iso(e["last_failure"]),
+        "last_success": iso(e["last_success"]),
+        "retry_in": retry,
+    }
+
+
+def status(device):
+    with _lock:
+        return _public(device, _entry(device))
+
+
+def snapshot():
+    with _lock:
+        return [_public(d, e) for d, e in sorted(_devices.items())]
+
+
+def reset(device=None):
+    """Force circuits closed (admin action / tests)."""
+    with _lock:
+        for name in ([device] if device else list(_devices)):
+            e = _entry(name)
+            e.update(failures=0, probe=False, cooldown=BREAKER_COOLDOWN)
+            _transition(name, e, CLOSED)
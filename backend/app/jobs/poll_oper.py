@@ -0,0 +1,124 @@
+# /app/backend/app/jobs/poll_oper.py
+"""
+Operational-state poller.
+
+Every OPER_POLL_INTERVAL seconds: `show interfaces terse` + VC port status
+for every switch (OPER_POLL_CONCURRENCY devices at a time), patched into
+interface_cache (VC status also into vc_topology). Config is not fetched or parsed; updated_at (= config
+age, used by the stale-while-revalidate policy) is left alone, the patch time
+goes to interface_oper (search index version). Like store_interfaces_cache a
+patch re-indexes search and publishes an "interfaces" event.
+
+    python -m app.jobs.poll_oper          # loop
+    python -m app.jobs.poll_oper --once
+"""
+import os
+import time
+import argparse
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from app.database import SessionLocal, Base, engine
+from app.devices import load_devices
+from app.models import InterfaceCache, InterfaceOperStamp
+from app import netconf, scheduler, health, search, events
+
+OPER_POLL_INTERVAL = float(os.getenv("OPER_POLL_INTERVAL", "30"))
+OPER_POLL_CONCURRENCY = int(os.getenv("OPER_POLL_CONCURRENCY", "8"))
+
+Base.metadata.create_all(bind=engine)
+
+
+def poll_device(name):
+    """Poll one switch; returns number of ports whose state changed."""
+    db = SessionLocal()
+    try:
+        row = db.query(InterfaceCache).filter(InterfaceCache.device == name).one_or_none()
+        if row is None:
+            return 0   # never retrieved: the config refresh creates the row
+
+        with scheduler.priority(scheduler.BACKGROUND):
+            oper, vc = netconf.get_oper_state(name)
+        netconf.update_vc_status(db, name, vc)
+
+        ports, changed = netconf.patch_oper_state(row.data or [], oper, vc)
+        if not changed:
+            return 0
+
+        # only if the config wasn't refreshed meanwhile (that one has newer oper state)
+        updated_at = row.updated_at
+        n = (
+            db.query(InterfaceCache)
+              .filter(InterfaceCache.device == name,
+                      InterfaceCache.updated_at == updated_at)
+              .update({"data": ports}, synchronize_session=False)
+        )
+        if not n:
+            db.rollback()
+            return 0
+        patched_at = datetime.utcnow()
+        db.merge(InterfaceOperStamp(device=name, patched_at=patched_at))
+        db.commit()
+
+        # same hooks as netconf.store_interfaces_cache
+        search.update_device(name, ports, search.version(updated_at, patched_at))
+        events.publish(f"device:{name}", "interfaces", {
+            "device": name,
+            "retrieved_at": updated_at.isoformat(),
+            "interfaces": ports,
+        })
+        return changed
+    finally:
+        db.close()
+
+
+def _poll(name):
+    try:
+        return name, poll_device(name), None
+    except health.DeviceUnavailable:
+        return name, 0, "circuit open"
+    except Exception as e:
+        return name, 0, str(e)
+
+
+def poll_once(pool=None):
+    names = list(load_devices().keys())
+    t0 = time.perf_counter()
+    own = pool is None
+    pool = pool or ThreadPoolExecutor(max_workers=OPER_POLL_CONCURRENCY, thread_name_prefix="oper")
+    try:
+        results = list(pool.map(_poll, names))
+    finally:
+        if own:
+            pool.shutdown()
+
+    changed = sum(r[1] for r in results)
+    failed = [(n, err) for n, _, err in results if err]
+    for n, err in failed:
+        print(f"✖ oper poll {n}: {err}")
+    print(f"[{datetime.utcnow()}] oper poll: {len(names)} switches, "
+          f"{changed} ports changed, {len(failed)} failed ({time.perf_counter() - t0:.1f}s)")
+    return results
+
+
+def main():
+    ap = argparse.ArgumentParser(description="poll oper/admin/VC state into the interface cache")
+    ap.add_argument("--once", action="store_true")
+    args = ap.parse_args()
+
+    if args.once:
+        poll_once()
+        return
+
+    with ThreadPoolExecutor(max_workers=OPER_POLL_CONCURRENCY, thread_name_prefix="oper") as pool:
+        while True:
+            started = time.monotonic()
+            try:
+                poll_once(pool)
+            except Exception as e:
+                print(f"✖ oper poll round failed: {e}")
+            time.sleep(max(0.0, OPER_POLL_INTERVAL - (time.monotonic() - started)))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,38 +1,87 @@
-# /app/backend/app/jobs/refresh_interfaces.py
-from datetime import datetime
-from app.netconf import get_interfaces_raw, store_interfaces_cache
-from app.devices import load_devices
-from app.database import SessionLocal, Base, engine
-
-Base.metadata.create_all(bind=engine)
-
-def refresh():
-    db = SessionLocal()
-    try:
-        devices = load_devices()  # returns dict {name: {...}}
-        for dev_name in devices.keys():
-            try:
-                print(f"[{datetime.utcnow()}] Refresh interfaces for {dev_name}")
-                interfaces = get_interfaces_raw(dev_name)
-                # reuse the existing store helper so DB schema stays consistent
-                store_interfaces_cache(db, dev_name, interfaces)
-                print(f"✔ done: {dev_name} ({len(interfaces)} interfaces)")
-            except Exception as e:
-                print(f"✖ failed {dev_name}: {e}")
-    finally:
-        db.close()
-
-def refresh_interfaces_for_device(dev_name):
-    db = SessionLocal()
-    try:
-        interfaces = get_interfaces_raw(dev_name)
-        store_interfaces_cache(db, dev_name, interfaces)
-        return interfaces
-    finally:
-        db.close()
-
-def main():
-    refresh()
-
-if __name__ == "__main__":
-    main()
+# /app/backend/app/jobs/refresh_interfaces.py
+import time
+import argparse
+from datetime import datetime
+from app.netconf import get_interfaces_raw, store_interfaces_cache
+from app.devices import load_devices
+from app.database import SessionLocal, Base, engine
+from app.models import InterfaceCache, InterfaceCacheHead
+from app import tracing, scheduler, rollback
+from app.jobs import poll_oper
+
+Base.metadata.create_all(bind=engine)
+
+def refresh_device(db, dev_name, full=False):
+    """
+    Conditional refresh: when commit 0 (`show system commit`) is still the
+    one the cached config was fetched at, only oper state is refreshed.
+    Returns "full" or "unchanged".
+    """
+    # also keeps the rollback history cache current
+    try:
+        commits = rollback.refresh_history(db, dev_name)
+        head = commits[0]["timestamp"] if commits else None
+    except Exception as e:
+        # no head: full refresh now, and the stored None forces one next run too
+        db.rollback()
+        print(f"⚠️ {dev_name}: commit history unavailable ({e}), full refresh")
+        head = None
+
+    stored = db.query(InterfaceCacheHead).filter(InterfaceCacheHead.device == dev_name).one_or_none()
+    cached = db.query(InterfaceCache.device).filter(InterfaceCache.device == dev_name).first()
+
+    if not full and head and cached and stored and stored.head == head:
+        changed = poll_oper.poll_device(dev_name)
+        stored.checked_at = datetime.utcnow()
+        db.commit()
+        print(f"= unchanged: {dev_name} (commit {head}, {changed} oper changes)")
+        return "unchanged"
+
+    # head read *before* the config: a commit in between only causes one extra full refresh
+    interfaces = get_interfaces_raw(dev_name)
+    # reuse the existing store helper so DB schema stays consistent
+    store_interfaces_cache(db, dev_name, interfaces)
+    db.merge(InterfaceCacheHead(device=dev_name, head=head, checked_at=datetime.utcnow()))
+    db.commit()
+    print(f"✔ done: {dev_name} ({len(interfaces)} interfaces)")
+    return "full"
+
+def refresh(full=False):
+    db = SessionLocal()
+    t0 = time.perf_counter()
+    counts = {"full": 0, "unchanged": 0, "failed": 0}
+    try:
+        devices = load_devices()  # returns dict {name: {...}}
+        for dev_name in devices.keys():
+            try:
+                print(f"[{datetime.utcnow()}] Refresh interfaces for {dev_name}")
+                with scheduler.priority(scheduler.BACKGROUND):
+                    counts[refresh_device(db, dev_name, full)] += 1
+            except Exception as e:
+                db.rollback()
+                counts["failed"] += 1
+                print(f"✖ failed {dev_name}: {e}")
+    finally:
+        db.close()
+    print(f"interfaces: {counts['full']} refreshed, {counts['unchanged']} unchanged, "
+          f"{counts['failed']} failed ({time.perf_counter() - t0:.1f}s)")
+    return counts
+
+@tracing.traced()
+def refresh_interfaces_for_device(dev_name, reason="retrieve"):
+    db = SessionLocal()
+    try:
+        interfaces = get_interfaces_raw(dev_name, snapshot_reason=reason)
+        store_interfaces_cache(db, dev_name, interfaces)
+        return interfaces
+    finally:
+        db.close()
+
+def main():
+    ap = argparse.ArgumentParser(description="refresh the interface cache")
+    ap.add_argument("--full", action="store_true", help="download config even if no new commit")
+    args = ap.parse_args()
+    refresh(full=args.full)
+
+if __name__ == "__main__":
+    main()
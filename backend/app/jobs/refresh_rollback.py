@@ -0,0 +1,35 @@
+# /app/backend/app/jobs/refresh_rollback.py
+from datetime import datetime
+from app.database import SessionLocal, Base, engine
+from app.devices import get_devices
+from app.rollback import get_history
+from app import scheduler
+
+# safety-net: tables bestaan ook bij standalone job
+Base.metadata.create_all(bind=engine)
+
+def refresh():
+    """
+    Re-read commit history; a new commit 0 (e.g. CLI commit) drops cached diffs.
+    Devices whose history is younger than ROLLBACK_HISTORY_TTL (the interface
+    refresh just read it) are not asked again.
+    """
+    db = SessionLocal()
+    try:
+        for device in get_devices():
+            name = device["name"]
+            try:
+                with scheduler.priority(scheduler.BACKGROUND):
+                    commits = get_history(db, name)
+                print(f"[{datetime.utcnow()}] ✔ commit history {name} ({len(commits)})")
+            except Exception as e:
+                db.rollback()
+                print(f"✖ failed {name}: {e}")
+    finally:
+        db.close()
+
+def main():
+    refresh()
+
+if __name__ == "__main__":
+    main()
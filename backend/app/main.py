@@ -1,16 +1,19 @@
 # main.py
-from fastapi import FastAPI, HTTPException, Depends, Header, Query, Body
-from fastapi.responses import JSONResponse, PlainTextResponse
+from fastapi import FastAPI, HTTPException, Depends, Header, Query, Body, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse, Response
+from fastapi.concurrency import run_in_threadpool
 from typing import Optional, List
 from .devices import load_devices, get_device
-from . import netconf, models, schemas
+from . import netconf, models, schemas, events, search, metrics, tracing, health, rollback, snapshots, auth, passwords, counters, capabilities, validation, changesets
 from .database import SessionLocal, init_db, Base, engine
 from sqlalchemy.orm import Session
+import os
 import traceback
 import json
+import time
+import hashlib
 from datetime import datetime
 from .models import InterfaceCache, CachedVlan, AuditLog
-import xml.sax.saxutils as sax
 from pydantic import BaseModel
 
 class DeleteRequest(BaseModel):
@@ -18,6 +21,7 @@ class DeleteRequest(BaseModel):
     interface: str
     comment: str | None = None
 
+@tracing.traced()
 def write_audit(
     db: Session,
     *,
@@ -30,6 +34,7 @@ def write_audit(
     payload: dict | None = None,
 ):
     entry = models.AuditLog(
+        timestamp=datetime.utcnow(),
         actor=actor,
         action=action,
         device=device,
@@ -41,11 +46,86 @@ def write_audit(
     db.add(entry)
     db.commit()
 
+    events.publish("audit", "audit", {
+        "id": entry.id,
+        "timestamp": entry.timestamp.isoformat(),
+        "actor": actor,
+        "action": action,
+        "device": device,
+        "interface": interface,
+        "request_id": request_id,
+        "comment": comment,
+        "payload": payload,
+    })
+
+def publish_request(req: models.ChangeRequest):
+    """Push a change request status transition to SSE subscribers."""
+    status = req.status.value if hasattr(req.status, "value") else req.status
+    events.publish("requests", "request", {
+        "id": req.id,
+        "device": req.device,
+        "interface": req.interface,
+        "requester": req.requester,
+        "approver": req.approver,
+        "config": req.config,
+        "status": status,
+        "type": req.type,
+        "comment": req.comment,
+        "updated_at": req.updated_at.isoformat() if req.updated_at else None,
+    })
+
 app = FastAPI()
 
 # Initialize DB (creates tables if not present)
 init_db()
 
+metrics.Gauge("sse_subscribers", "Open /api/events streams", fn=events.subscriber_count)
+
+@app.middleware("http")
+async def observe_requests(request: Request, call_next):
+    t0 = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        metrics.HTTP_REQUEST_SECONDS.observe(
+            time.perf_counter() - t0,
+            method=request.method,
+            route=getattr(route, "path", "unmatched"),
+            status=status,
+        )
+
+@app.middleware("http")
+async def trace_requests(request: Request, call_next):
+    """Root span per request; timing breakdown returned as Server-Timing."""
+    with tracing.trace_request(request.method, request.url.path,
+                               request.headers.get("traceparent")) as root:
+        response = await call_next(request)
+        route = request.scope.get("route")
+        if route is not None:
+            root.name = f"{request.method} {route.path}"
+        root.set(**{"http.status_code": response.status_code})
+        response.headers["Server-Timing"] = tracing.server_timing(root)
+        response.headers["X-Trace-Id"] = root.trace.trace_id
+        return response
+
+@app.exception_handler(health.DeviceUnavailable)
+async def device_unavailable(request: Request, exc: health.DeviceUnavailable):
+    """Open circuit → fast 503; clients keep showing cached data."""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": str(exc), "device": exc.device, "retry_after": exc.retry_after},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+@app.get("/metrics")
+def metrics_endpoint():
+    """Prometheus text exposition (scrape backend:8000/metrics directly)."""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 # simple dependency: DB session
 def get_db():
     db = SessionLocal()
@@ -55,12 +135,27 @@ def get_db():
         db.close()
 
 
-# === Very simple "auth" dependency for demo ===
-# Expects headers: X-User, X-Role
-def get_current_user(x_user: Optional[str] = Header(None), x_role: Optional[str] = Header(None)):
+# === Auth ===
+# Bearer JWT (app/auth.py, cached: no DB on the hot path).
+# Without a token the legacy X-User / X-Role headers are still accepted
+# unless AUTH_HEADER_FALLBACK=0.
+AUTH_HEADER_FALLBACK = os.getenv("AUTH_HEADER_FALLBACK", "1") == "1"
+
+# verified for unknown usernames, so a login takes the same time either way
+_DUMMY_HASH = "$2b$12$rc7uc2IAn6/FvtWJeIFryuoW67agb6Dpcbv4jgvDzEYmzwmNuxRkq"
+
+def get_current_user(
+    authorization: Optional[str] = Header(None),
+    x_user: Optional[str] = Header(None),
+    x_role: Optional[str] = Header(None),
+):
     """
-    Returns a dict with username & role. In production replace with real auth.
+    Returns a dict with username & role.
     """
+    if authorization and authorization.startswith("Bearer "):
+        return auth.principal_from_token(authorization.split(" ", 1)[1])
+    if not AUTH_HEADER_FALLBACK:
+        raise HTTPException(status_code=401, detail="Not authenticated")
     username = x_user or "anonymous"
     role = x_role or "reader"
     return {"username": username, "role": role}
@@ -72,52 +167,246 @@ def require_role(allowed=("admin", "approver")):
         return user
     return checker
 
+@app.post("/api/auth/login")
+async def login(body: schemas.LoginRequest):
+    # async: bcrypt runs in the password pool, no request thread waits on it
+    user = await run_in_threadpool(auth.get_db_user, body.username)
+    try:
+        ok = await passwords.verify_password_async(
+            body.password, user.password_hash if user is not None else _DUMMY_HASH)
+        ok = ok and user is not None
+    except passwords.PasswordBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    if not ok:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    return {
+        "access_token": auth.create_token_for_user(user),
+        "token_type": "bearer",
+        "username": user.username,
+        "role": user.role,
+        "expires_in": auth.ACCESS_EXPIRE_MINUTES * 60,
+    }
+
+@app.post("/api/auth/logout")
+def logout(user=Depends(auth.get_current_user)):
+    """Revokes all tokens of the calling user."""
+    auth.revoke_user_tokens(user["username"])
+    return {"status": "revoked"}
+
+@app.post("/api/auth/revoke/{username}")
+def revoke_tokens(username: str, user=Depends(require_role(("admin",)))):
+    try:
+        version = auth.revoke_user_tokens(username)
+    except KeyError:
+        raise HTTPException(404, "Unknown user")
+    return {"username": username, "token_version": version}
+
 # --- existing endpoints ---
 @app.get("/api/inventory")
 def inventory():
     devs = load_devices()
     return [{"name": k, "mgmt": v.get("host")} for k,v in devs.items()]
 
+def etag_json(request: Request, payload, volatile=()):
+    """
+    JSON response with a content ETag. A client that sends the same tag in
+    If-None-Match gets an empty 304 (frontend IndexedDB cache revalidation).
+    Top-level keys in `volatile` (e.g. "age") don't count for the tag.
+    """
+    body = json.dumps(payload, default=str, separators=(",", ":")).encode()
+    tagged = body
+    if volatile:
+        stable = {k: v for k, v in payload.items() if k not in volatile}
+        tagged = json.dumps(stable, default=str, separators=(",", ":")).encode()
+    tag = 'W/"' + hashlib.sha1(tagged).hexdigest() + '"'
+    headers = {"ETag": tag, "Cache-Control": "no-cache"}
+    if tag in (request.headers.get("if-none-match") or ""):
+        metrics.cache_hit("etag")
+        return Response(status_code=304, headers=headers)
+    metrics.cache_miss("etag")
+    return Response(body, media_type="application/json", headers=headers)
+
 @app.get("/api/switches")
-def switches_list():
+def switches_list(request: Request):
     devs = load_devices()
-    return [{"name": k} for k in devs.keys()]
+    return etag_json(request, [{"name": k} for k in devs.keys()])
 
 @app.get("/api/switches/{device}/ping")
 def ping_device(device: str):
     try:
-        dev = get_device(device)
+        get_device(device)
     except KeyError:
         raise HTTPException(404, "Unknown device")
     try:
-        with netconf.connect(dev):
+        with netconf.connect(device):
             return {"ok": True}
+    except health.DeviceUnavailable:
+        raise
     except Exception:
         raise HTTPException(503, "NETCONF unreachable")
 
-@app.get("/api/switches/{device}/interfaces")
-def interfaces(device: str, db: Session = Depends(get_db)):
-    data = netconf.get_interfaces_cached(device, db)
+@app.get("/api/health")
+def device_health():
+    """Circuit breaker state per device (this worker)."""
+    return [health.status(name) for name in load_devices()]
 
-    return {
+@app.post("/api/health/{device}/reset")
+def reset_device_health(device: str, user=Depends(require_role(("admin",)))):
+    health.reset(device)
+    return health.status(device)
+
+@app.get("/api/switches/{device}/capabilities")
+def device_capabilities(device: str):
+    """Hello capabilities + learned RPC variants (filters, vc-port, ...)."""
+    return capabilities.profile(device)
+
+@app.delete("/api/switches/{device}/capabilities")
+def forget_device_capabilities(device: str, user=Depends(require_role(("admin",)))):
+    capabilities.forget(device)
+    return {"ok": True}
+
+# freshness policy per endpoint (soft_ttl, hard_ttl), see netconf.get_interfaces_cached
+FRESHNESS = {
+    "interfaces": (netconf.INTERFACES_SOFT_TTL, netconf.INTERFACES_HARD_TTL),
+}
+
+@app.get("/api/switches/{device}/interfaces")
+def interfaces(device: str, request: Request, max_age: Optional[float] = None,
+               db: Session = Depends(get_db)):
+    """Cached interfaces; `max_age` (s) makes the call wait for data at most that old."""
+    soft, hard = FRESHNESS["interfaces"]
+    if max_age is not None:
+        hard = max(max_age, 1.0)
+    data = netconf.get_interfaces_cached(device, db, soft_ttl=soft, hard_ttl=hard)
+
+    return etag_json(request, {
         "device": device,
         "source": data.get("source", "cache"),
         "retrieved_at": data["timestamp"],
+        "age": data["age"],
+        "refresh": data["refresh"],
+        "stale": health.is_stale(device),
+        "health": health.status(device)["state"],
         "interfaces": data["interfaces"]
-    }
+    }, volatile=("age",))
+
+@app.get("/api/switches/{device}/topology")
+def vc_topology(device: str, request: Request, refresh: bool = False):
+    """VC members + VC ports (long-lived cache; status kept current by the oper poller)."""
+    return etag_json(request, netconf.get_vc_topology(device, refresh=refresh))
+
+def _interface_matches(p, oper_up=None, mode=None, vlan=None, description=None):
+    """Server-side filter for the bulk interface endpoint."""
+    if oper_up is not None and bool(p.get("oper_up")) != oper_up:
+        return False
+    if mode and p.get("mode") != mode:
+        return False
+    if vlan:
+        vlans = [p.get("access_vlan"), p.get("native_vlan"), *(p.get("trunk_vlans") or [])]
+        if vlan not in [str(v) for v in vlans if v is not None]:
+            return False
+    if description and description.lower() not in (p.get("description") or "").lower():
+        return False
+    return True
+
+@app.get("/api/interfaces")
+def interfaces_bulk(
+    devices: Optional[str] = None,
+    oper_up: Optional[bool] = None,
+    mode: Optional[str] = None,
+    vlan: Optional[str] = None,
+    description: Optional[str] = None,
+):
+    """
+    Cached interfaces for many switches in one request.
+    `devices` is a comma separated list (omit or "all" for the whole fleet).
+    All cache rows are read with a single query and streamed per device.
+    """
+    names = [d.strip() for d in (devices or "").split(",") if d.strip()]
+    if not names or names == ["all"]:
+        names = list(load_devices().keys())
+
+    def generate():
+        db = SessionLocal()
+        try:
+            rows = (
+                db.query(InterfaceCache)
+                  .filter(InterfaceCache.device.in_(names))
+                  .yield_per(50)
+            )
+            seen = set()
+            yield '{"devices": ['
+            for row in rows:
+                ports = [
+                    p for p in (row.data or [])
+                    if _interface_matches(p, oper_up, mode, vlan, description)
+                ]
+                for p in ports:
+                    p.setdefault("_source", "cache")
+                chunk = json.dumps({
+                    "device": row.device,
+                    "source": "cache",
+                    "retrieved_at": row.updated_at.isoformat() if row.updated_at else None,
+                    "interfaces": ports,
+                }, default=str)
+                yield ("," if seen else "") + chunk
+                seen.add(row.device)
+            missing = [n for n in names if n not in seen]
+            yield '], "missing": ' + json.dumps(missing) + "}"
+        finally:
+            db.close()
+
+    return StreamingResponse(generate(), media_type="application/json")
+
+@app.get("/api/search")
+def search_interfaces(
+    q: str = Query(..., min_length=1),
+    device: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    db: Session = Depends(get_db),
+):
+    """
+    Ranked fleet-wide port search on name, description, VLAN and bundle.
+    Terms are AND-ed; prefix a term with vlan:, bundle:, desc: or name:
+    to restrict it to one field.
+    """
+    search.sync(db)
+    results = search.search(q, limit=limit, device=device)
+    return {"query": q, "count": len(results), "results": results}
 
-@app.get("/api/switches/{device}/interface/{ifname}/live")
+@app.get("/api/switches/{device}/interface/{ifname:path}/live")
 def interface_live(device: str, ifname: str):
     try:
         return netconf.get_interface_live_cached(device, ifname)
     except KeyError:
         raise HTTPException(404, "Unknown device")
+    except health.DeviceUnavailable:
+        raise
     except Exception as e:
         traceback.print_exc()
         raise HTTPException(500, str(e))
 
+@app.get("/api/switches/{device}/interface/{ifname:path}/stats")
+def interface_stats(
+    device: str,
+    ifname: str,
+    window: int = Query(900, ge=10, description="seconds of history"),
+    points: int = Query(60, ge=1, le=500, description="max points (downsampled)"),
+):
+    """Counter rates (bps/pps/errors per s); reading it keeps the port sampled."""
+    try:
+        get_device(device)
+    except KeyError:
+        raise HTTPException(404, "Unknown device")
+    try:
+        return counters.stats(device, ifname, window, points)
+    except KeyError as e:
+        raise HTTPException(404, e.args[0])
+    except ValueError as e:
+        raise HTTPException(400, str(e))
+
 @app.get("/api/switches/{device}/vlans")
-def get_cached_vlans(device: str, db: Session = Depends(get_db)):
+def get_cached_vlans(device: str, request: Request, db: Session = Depends(get_db)):
 
     row = (
         db.query(CachedVlan)
@@ -132,17 +421,46 @@ def get_cached_vlans(device: str, db: Session = Depends(get_db)):
             "cached": False
         }
 
-    return {
+    return etag_json(request, {
         "device": device,
         "vlans": row.data,
         "cached": True,
-        "updated_at": row.updated_at
-    }
+        "updated_at": row.updated_at.isoformat() if row.updated_at else None
+    })
+
+# === Push channel (SSE) ===
+
+@app.get("/api/events")
+async def events_stream(request: Request, devices: Optional[str] = None):
+    """
+    Server-sent events stream.
+    `devices` is a comma separated list of switches to follow (default: all).
+    Event types: interfaces, vlans, health, request, audit, resync.
+    """
+    names = [d.strip() for d in (devices or "").split(",") if d.strip()]
+    topics = ["requests", "audit"] + ([f"device:{d}" for d in names] or ["device:*"])
+    sub = events.subscribe(topics)
+
+    return StreamingResponse(
+        events.stream(sub, request),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",   # nginx: don't buffer the stream
+        },
+    )
 
 # === Change request endpoints ===
 
+def reject_invalid(db, device, interface, config, type="config"):
+    """422 with every problem found against the cached device state (app/validation.py)."""
+    errors = validation.check(db, device, interface, config, type)
+    if errors:
+        raise HTTPException(422, "\n".join(errors))
+
 @app.post("/api/requests", response_model=schemas.ChangeRequestOut, status_code=201)
 def create_request(req: schemas.ChangeRequestCreate, user=Depends(get_current_user), db: Session = Depends(get_db)):
+    reject_invalid(db, req.device, req.interface, req.config)
     # persist request in DB
     cr = models.ChangeRequest(
         device=req.device,
@@ -154,6 +472,7 @@ def create_request(req: schemas.ChangeRequestCreate, user=Depends(get_current_us
     db.add(cr)
     db.commit()
     db.refresh(cr)
+    publish_request(cr)
     return cr
 
 @app.get("/api/requests", response_model=List[schemas.ChangeRequestOut])
@@ -168,6 +487,7 @@ def list_requests(status: Optional[str] = None, db: Session = Depends(get_db), u
     return items
 
 @app.post("/api/requests/{req_id}/approve", status_code=200)
+@tracing.traced()
 def approve_request(
     req_id: int,
     comment: Optional[str] = None,
@@ -181,6 +501,9 @@ def approve_request(
     if req.status != models.RequestStatus.pending:
         raise HTTPException(400, "Request not pending")
 
+    # device state may have moved on since the request was made
+    reject_invalid(db, req.device, req.interface, req.config, req.type or "config")
+
     # mark approved
     req.status = models.RequestStatus.approved
     req.approver = user["username"]
@@ -199,29 +522,19 @@ def approve_request(
     )
 
     db.commit()
+    publish_request(req)
 
     # ----------------------------
     # APPLY
     # ----------------------------
     try:
-        dev = get_device(req.device)
+        get_device(req.device)
 
         # ---- DELETE FLOW ----
         if getattr(req, "type", None) == "delete":
-            with netconf.connect(dev) as nc:
-                xml = f"""
-                <config>
-                  <configuration>
-                    <interfaces>
-                      <interface operation="delete">
-                        <name>{sax.escape(req.interface)}</name>
-                      </interface>
-                    </interfaces>
-                  </configuration>
-                </config>
-                """
-                nc.edit_config(target="candidate", config=xml)
-                nc.commit()
+            with netconf.connect(req.device) as nc:
+                netconf.delete_interface_config(nc, req.interface)
+            rollback.invalidate(db, req.device)
 
             write_audit(
                 db,
@@ -235,12 +548,13 @@ def approve_request(
 
         # ---- MODIFY FLOW ----
         else:
-            with netconf.connect(dev) as nc:
+            with netconf.connect(req.device) as nc:
                 netconf.apply_interface_config(
                     nc,
                     interface=req.interface,
                     config=req.config
                 )
+            rollback.invalidate(db, req.device)
 
             write_audit(
                 db,
@@ -257,7 +571,7 @@ def approve_request(
         # ----------------------------
         from app.jobs.refresh_interfaces import refresh_interfaces_for_device
         try:
-            refresh_interfaces_for_device(req.device)
+            refresh_interfaces_for_device(req.device, reason="commit")
         except Exception as e:
             write_audit(
                 db,
@@ -273,6 +587,7 @@ def approve_request(
         req.status = models.RequestStatus.failed
         req.comment = str(e)
         db.commit()
+        publish_request(req)
 
         write_audit(
             db,
@@ -285,6 +600,8 @@ def approve_request(
             payload={"type": req.type}
         )
 
+        if isinstance(e, health.DeviceUnavailable):
+            raise
         raise HTTPException(500, f"Apply failed: {e}")
 
     db.refresh(req)
@@ -324,8 +641,156 @@ def reject_request(
     )
 
     db.refresh(item)
+    publish_request(item)
     return item
 
+# -------------------------
+# CHANGE SETS (bulk)
+# -------------------------
+
+@app.post("/api/changesets", status_code=201)
+async def create_changeset(request: Request, comment: Optional[str] = None,
+                           user=Depends(get_current_user)):
+    """Many interface changes (JSON or CSV body, see app/changesets.py) as one pending set."""
+    raw = await request.body()
+    try:
+        changes, body_comment = changesets.parse(raw, request.headers.get("content-type", ""))
+    except (ValueError, UnicodeDecodeError) as e:
+        raise HTTPException(400, f"Invalid change set: {e}")
+    return await run_in_threadpool(_create_changeset, changes, comment or body_comment, user)
+
+def _create_changeset(changes, comment, user):
+    db = SessionLocal()
+    try:
+        problems = changesets.validate(db, changes)
+        if problems:
+            raise HTTPException(422, problems)
+        cs, reqs = changesets.create(db, changes, user["username"], comment)
+
+        for device in sorted({r.device for r in reqs}):
+            write_audit(
+                db,
+                actor=user["username"],
+                action="changeset_create",
+                device=device,
+                comment=comment,
+                payload={"changeset": cs.id,
+                         "interfaces": [r.interface for r in reqs if r.device == device]}
+            )
+        for r in reqs:
+            publish_request(r)
+        return changesets.to_dict(cs, reqs)
+    finally:
+        db.close()
+
+@app.get("/api/changesets")
+def list_changesets(status: Optional[str] = None, limit: int = 50,
+                    db: Session = Depends(get_db), user=Depends(get_current_user)):
+    q = db.query(models.ChangeSet)
+    if status:
+        q = q.filter(models.ChangeSet.status == status)
+    if user["role"] not in ("approver", "admin"):
+        q = q.filter(models.ChangeSet.requester == user["username"])
+    sets = q.order_by(models.ChangeSet.id.desc()).limit(limit).all()
+    return [{k: v for k, v in changesets.to_dict(cs, changesets.requests_of(db, cs.id)).items()
+             if k != "requests"} for cs in sets]
+
+@app.get("/api/changesets/{cs_id}")
+def get_changeset(cs_id: int, db: Session = Depends(get_db), user=Depends(get_current_user)):
+    cs = db.get(models.ChangeSet, cs_id)
+    if not cs:
+        raise HTTPException(404, "Change set not found")
+    # same visibility as the list: requesters only see their own sets
+    if user["role"] not in ("approver", "admin") and cs.requester != user["username"]:
+        raise HTTPException(403, "Not allowed")
+    return changesets.to_dict(cs, changesets.requests_of(db, cs_id))
+
+@app.post("/api/changesets/{cs_id}/approve")
+def approve_changeset(
+    cs_id: int,
+    comment: Optional[str] = None,
+    db: Session = Depends(get_db),
+    user = Depends(require_role(("admin", "approver")))
+):
+    """Approve + apply: per switch one edit-config/commit, switches in parallel."""
+    cs = db.get(models.ChangeSet, cs_id)
+    if not cs:
+        raise HTTPException(404, "Change set not found")
+    if cs.status != models.RequestStatus.pending:
+        raise HTTPException(400, "Change set not pending")
+
+    reqs = [r for r in changesets.requests_of(db, cs_id) if r.status == models.RequestStatus.pending]
+    problems = changesets.validate(db, [changesets.as_change(r) for r in reqs])
+    if problems:
+        raise HTTPException(422, problems)
+
+    cs.status = models.RequestStatus.approved
+    cs.approver = user["username"]
+    for r in reqs:
+        r.status = models.RequestStatus.approved
+        r.approver = user["username"]
+        if comment:
+            r.comment = comment
+    db.commit()
+    for r in reqs:
+        publish_request(r)
+
+    results = changesets.apply(reqs)
+    failed = changesets.finish(cs, reqs, results)
+    db.commit()
+
+    for device, res in sorted(results.items()):
+        write_audit(
+            db,
+            actor="system",
+            action="apply_failed" if res["error"] else "apply_success",
+            device=device,
+            comment=res["error"] or res["refresh_error"],
+            payload={"changeset": cs.id,
+                     "interfaces": [r.interface for r in reqs if r.device == device]}
+        )
+    for r in reqs:
+        publish_request(r)
+
+    return {**changesets.to_dict(cs, changesets.requests_of(db, cs_id)),
+            "failed_devices": failed, "results": results}
+
+@app.post("/api/changesets/{cs_id}/reject")
+def reject_changeset(
+    cs_id: int,
+    comment: Optional[str] = None,
+    db: Session = Depends(get_db),
+    user = Depends(require_role(("admin", "approver")))
+):
+    cs = db.get(models.ChangeSet, cs_id)
+    if not cs:
+        raise HTTPException(404, "Change set not found")
+    if cs.status != models.RequestStatus.pending:
+        raise HTTPException(400, "Change set not pending")
+
+    reqs = [r for r in changesets.requests_of(db, cs_id) if r.status == models.RequestStatus.pending]
+    cs.status = models.RequestStatus.rejected
+    cs.approver = user["username"]
+    for r in reqs:
+        r.status = models.RequestStatus.rejected
+        r.approver = user["username"]
+        if comment:
+            r.comment = comment
+    db.commit()
+
+    for device in sorted({r.device for r in reqs}):
+        write_audit(
+            db,
+            actor=user["username"],
+            action="changeset_reject",
+            device=device,
+            comment=comment,
+            payload={"changeset": cs.id}
+        )
+    for r in reqs:
+        publish_request(r)
+    return changesets.to_dict(cs, changesets.requests_of(db, cs_id))
+
 @app.post("/api/switches/{device}/interfaces/retrieve")
 def interfaces_retrieve(device: str, db: Session = Depends(get_db)):
     interfaces = netconf.get_interfaces_raw(device)
@@ -352,15 +817,22 @@ def refresh_vlans(device: str, db: Session = Depends(get_db),
 
     vlans = netconf.get_vlans(device)
 
+    updated_at = datetime.utcnow()
     db.merge(
         CachedVlan(
             device=device,
             data=vlans,
-            updated_at=datetime.utcnow()
+            updated_at=updated_at
         )
     )
     db.commit()
 
+    events.publish(f"device:{device}", "vlans", {
+        "device": device,
+        "updated_at": updated_at.isoformat(),
+        "vlans": vlans,
+    })
+
     return {
         "device": device,
         "count": len(vlans),
@@ -460,6 +932,16 @@ def normalize_interface_cache():
     finally:
         db.close()
 
+@app.on_event("startup")
+def start_counter_collector():
+    if os.getenv("COUNTER_COLLECTOR", "1") == "1":
+        counters.start()
+
+@app.on_event("shutdown")
+def stop_password_pool():
+    passwords.shutdown()
+    counters.stop()
+
 # -------------------------
 # ROLLBACK API (UI TAB)
 # -------------------------
@@ -467,54 +949,33 @@ def normalize_interface_cache():
 @app.get("/api/rollback/{device}")
 def rollback_list(
     device: str,
+    refresh: bool = False,
+    db: Session = Depends(get_db),
     user=Depends(require_role(("admin","approver"))),
 ):
     """
-    Return parsed commit history.
+    Return parsed commit history (cached; ?refresh=true re-reads the device).
     """
     try:
-        dev = get_device(device)
-        txt = netconf.get_rollback_list(dev)
+        get_device(device)
+        return rollback.get_history(db, device, refresh=refresh)
+    except health.DeviceUnavailable:
+        raise
     except Exception as e:
         raise HTTPException(500, f"NETCONF failed: {e}")
 
-    commits = []
-
-    import re
-    line_re = re.compile(
-        r"^\s*(\d+)\s+(\d{4}-\d{2}-\d{2}\s+\d{2}:\d{2}:\d{2}\s+\S+)\s+by\s+(\S+)"
-    )
-
-    current = None
-    for line in txt.splitlines():
-        m = line_re.match(line)
-        if m:
-            if current:
-                commits.append(current)
-
-            current = {
-                "index": int(m.group(1)),
-                "timestamp": m.group(2),
-                "user": m.group(3),
-                "comment": ""
-            }
-
-        elif "comment:" in line and current:
-            current["comment"] = line.split("comment:", 1)[1].strip()
-
-    if current:
-        commits.append(current)
-
-    return commits
-
 @app.get("/api/rollback/{device}/{idx}/diff")
-def rollback_diff(device: str, idx: int):
+def rollback_diff(device: str, idx: int, db: Session = Depends(get_db)):
     try:
-        dev = get_device(device)
-        diff = netconf.get_rollback_diff(dev, idx)
+        get_device(device)
+        diff = rollback.get_diff(db, device, idx)
         
         # 🔥 belangrijk: altijd raw plaintext teruggeven
         return PlainTextResponse(diff if diff else "")
+    except KeyError as e:
+        raise HTTPException(404, str(e))
+    except health.DeviceUnavailable:
+        raise
     except Exception as e:
         raise HTTPException(500, f"NETCONF failed: {e}")
 
@@ -530,10 +991,11 @@ def rollback_apply(
     Apply rollback <idx>.
     """
     try:
-        dev = get_device(device)
+        get_device(device)
 
-        with netconf.connect(dev) as nc:
+        with netconf.connect(device) as nc:
             netconf.apply_rollback(nc, idx)
+        rollback.invalidate(db, device)
 
         # audit log
         write_audit(
@@ -546,11 +1008,112 @@ def rollback_apply(
             payload={"rollback": idx}
         )
 
+        # refresh cache server-side; subscribers get the new ports pushed
+        from app.jobs.refresh_interfaces import refresh_interfaces_for_device
+        try:
+            refresh_interfaces_for_device(device, reason="commit")
+        except Exception as e:
+            write_audit(
+                db,
+                actor="system",
+                action="device_refresh_failed",
+                device=device,
+                comment=str(e)
+            )
+
         return {"status": "ok", "rollback": idx}
 
+    except health.DeviceUnavailable:
+        raise
     except Exception as e:
         raise HTTPException(500, f"NETCONF rollback failed: {e}")
     
+# -------------------------
+# CONFIG SNAPSHOTS
+# -------------------------
+
+def _snapshot_out(s):
+    return {
+        "id": s.id,
+        "device": s.device,
+        "section": s.section,
+        "hash": s.hash,
+        "reason": s.reason,
+        "taken_at": s.taken_at.isoformat(),
+        "last_seen_at": s.last_seen_at.isoformat(),
+    }
+
+def _get_snapshot(db, device, snap_id):
+    s = (
+        db.query(models.ConfigSnapshot)
+          .filter(models.ConfigSnapshot.device == device, models.ConfigSnapshot.id == snap_id)
+          .one_or_none()
+    )
+    if not s:
+        raise HTTPException(404, "Snapshot not found")
+    return s
+
+@app.get("/api/snapshots/{device}")
+def list_snapshots(device: str, section: Optional[str] = None, limit: int = 50,
+                   db: Session = Depends(get_db)):
+    q = db.query(models.ConfigSnapshot).filter(models.ConfigSnapshot.device == device)
+    if section:
+        q = q.filter(models.ConfigSnapshot.section == section)
+    rows = q.order_by(models.ConfigSnapshot.id.desc()).limit(limit).all()
+    return [_snapshot_out(s) for s in rows]
+
+@app.get("/api/snapshots/{device}/diff")
+def diff_snapshots(
+    device: str,
+    a: Optional[int] = None,
+    b: Optional[int] = None,
+    section: str = "interfaces",
+    interface: Optional[str] = None,
+    db: Session = Depends(get_db),
+):
+    """
+    Structural diff a → b (no device access).
+    Defaults: b = latest snapshot of `section`, a = the one before b.
+    `interface` limits the diff to one interface.
+    """
+    if b is not None:
+        new = _get_snapshot(db, device, b)
+    else:
+        new = snapshots.latest(db, device, section)
+        if new is None:
+            raise HTTPException(404, "No snapshots for device")
+    if a is not None:
+        old = _get_snapshot(db, device, a)
+    else:
+        old = (
+            db.query(models.ConfigSnapshot)
+              .filter(models.ConfigSnapshot.device == device,
+                      models.ConfigSnapshot.section == new.section,
+                      models.ConfigSnapshot.id < new.id)
+              .order_by(models.ConfigSnapshot.id.desc())
+              .first()
+        )
+        if old is None:
+            raise HTTPException(404, "No earlier snapshot to compare with")
+    if old.section != new.section:
+        raise HTTPException(400, "Snapshots are from different sections")
+
+    within = f"interfaces interface {interface}" if interface else None
+    changes = [] if old.hash == new.hash else \
+        snapshots.diff(snapshots.load(db, old), snapshots.load(db, new), within=within)
+    return {
+        "device": device,
+        "section": new.section,
+        "from": _snapshot_out(old),
+        "to": _snapshot_out(new),
+        "changes": changes,
+    }
+
+@app.get("/api/snapshots/{device}/{snap_id}")
+def get_snapshot(device: str, snap_id: int, db: Session = Depends(get_db)):
+    s = _get_snapshot(db, device, snap_id)
+    return PlainTextResponse(snapshots.load_bytes(db, s), media_type="application/xml")
+
 @app.post("/api/interface/{device}/{interface}/refresh")
 def refresh_single_interface(device: str, interface: str):
     dev = get_device(device)
@@ -573,6 +1136,7 @@ def request_delete_interface(
     db: Session = Depends(get_db),
     user=Depends(require_role(("admin",)))
 ):
+    reject_invalid(db, body.device, body.interface, None, "delete")
     req = models.ChangeRequest(
         device=body.device,
         interface=body.interface,
@@ -597,4 +1161,6 @@ def request_delete_interface(
         payload={"delete": True}
     )
 
+    db.refresh(req)
+    publish_request(req)
     return req
\ No newline at end of file
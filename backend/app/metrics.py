@@ -0,0 +1,225 @@
+# /app/backend/app/metrics.py
+"""
+Minimal Prometheus-style metrics (no external dependency).
+
+    RPC_SECONDS.observe(0.42, rpc="get-config", device="sw01")
+    with RPC_SECONDS.time(rpc="commit", device="sw01"):
+        ...
+    render()  -> text exposition format for /metrics
+
+Metrics are per process: with several gunicorn workers each worker exposes
+its own counters (the `pid` label on process_info tells them apart).
+"""
+import os
+import time
+import threading
+from contextlib import contextmanager
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+REGISTRY = []
+
+
+def _escape(v):
+    return str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(names, values, extra=None):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs += [f'{n}="{_escape(v)}"' for n, v in extra]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _fmt_value(v):
+    if v == float("inf"):
+        return "+Inf"
+    if float(v).is_integer():
+        return str(int(v))
+    return repr(float(v))
+
+
+class _Metric:
+    type = "untyped"
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labels)
+        self._lock = threading.Lock()
+        self._values = {}
+        REGISTRY.append(self)
+
+    def _key(self, labels):
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type}"]
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self):
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [
+            f"{self.name}{_fmt_labels(self.labelnames, k)} {_fmt_value(v)}" for k, v in items
+        ]
+
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def __init__(self, name, help, labels=(), fn=None):
+        super().__init__(name, help, labels)
+        self._fn = fn   # optional callback: () -> value (unlabelled gauges only)
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    @contextmanager
+    def track(self, **labels):
+        """inc() on enter, dec() on exit (in-flight counts)."""
+        self.inc(**labels)
+        try:
+            yield
+        finally:
+            self.dec(**labels)
+
+    def render(self):
+        if self._fn is not None:
+            return self.header() + [f"{self.name} {_fmt_value(self._fn())}"]
+        with self._lock:
+            items = list(self._values.items())
+        return self.header() + [
+            f"{self.name}{_fmt_labels(self.labelnames, k)} {_fmt_value(v)}" for k, v in items
+        ]
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, b in enumerate(self.buckets):
+                if value <= b:
+                    entry["counts"][i] += 1
+                    break
+            entry["sum"] += value
+            entry["count"] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - t0, **labels)
+
+    def render(self):
+        with self._lock:
+            items = [(k, dict(v, counts=list(v["counts"]))) for k, v in self._values.items()]
+        out = self.header()
+        for key, e in items:
+            cumulative = 0
+            for b, c in zip(self.buckets, e["counts"]):
+                cumulative += c
+                out.append(f"{self.name}_bucket{_fmt_labels(self.labelnames, key, [('le', _fmt_value(b))])} {cumulative}")
+            out.append(f"{self.name}_bucket{_fmt_labels(self.labelnames, key, [('le', '+Inf')])} {e['count']}")
+            out.append(f"{self.name}_sum{_fmt_labels(self.labelnames, key)} {_fmt_value(e['sum'])}")
+            out.append(f"{self.name}_count{_fmt_labels(self.labelnames, key)} {e['count']}")
+        return out
+
+
+def render() -> str:
+    lines = []
+    for m in REGISTRY:
+        lines.extend(m.render())
+    return "\n".join(lines) + "\n"
+
+
+# ---- application metrics ----
+
+PROCESS_INFO = Gauge("process_info", "Worker process serving this scrape", ("pid",))
+PROCESS_INFO.set(1, pid=os.getpid())
+
+NETCONF_HANDSHAKE_SECONDS = Histogram(
+    "netconf_handshake_seconds", "NETCONF SSH connect + hello exchange", ("device",))
+NETCONF_RPC_SECONDS = Histogram(
+    "netconf_rpc_seconds", "NETCONF RPC round-trip time", ("rpc", "device"))
+NETCONF_RPC_ERRORS = Counter(
+    "netconf_rpc_errors_total", "NETCONF RPCs that raised", ("rpc", "device"))
+NETCONF_INFLIGHT = Gauge(
+    "netconf_sessions_inflight", "Open NETCONF sessions per device", ("device",))
+XML_PARSE_SECONDS = Histogram(
+    "netconf_xml_parse_seconds", "Time spent parsing NETCONF replies", ("parser",),
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5))
+
+CACHE_REQUESTS = Counter(
+    "cache_requests_total", "Cache lookups by cache and result (hit/miss)", ("cache", "result"))
+
+DB_COMMIT_SECONDS = Histogram(
+    "db_commit_seconds", "SQLAlchemy session flush + commit time",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5))
+
+PASSWORD_SECONDS = Histogram(
+    "password_hash_seconds", "bcrypt hash/verify time incl. pool queue wait", ("op",))
+PASSWORD_QUEUE = Gauge("password_queue_depth", "bcrypt jobs queued or running in the pool")
+PASSWORD_REJECTED = Counter(
+    "password_rejected_total", "bcrypt jobs refused (queue full) or timed out", ("reason",))
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "API request latency", ("method", "route", "status"))
+
+
+def cache_hit(cache):
+    CACHE_REQUESTS.inc(cache=cache, result="hit")
+
+
+def cache_miss(cache):
+    CACHE_REQUESTS.inc(cache=cache, result="miss")
+
+
+def instrument_sessions(session_factory):
+    """Observe commit latency for every session created by `session_factory`."""
+    from sqlalchemy import event
+    from . import tracing
+
+    @event.listens_for(session_factory, "before_commit")
+    def _before_commit(session):
+        session.info["_commit_t0"] = time.time_ns()
+
+    @event.listens_for(session_factory, "after_commit")
+    def _after_commit(session):
+        t0 = session.info.pop("_commit_t0", None)
+        if t0 is not None:
+            t1 = time.time_ns()
+            DB_COMMIT_SECONDS.observe((t1 - t0) / 1e9)
+            tracing.record("db.commit", t0, t1)
+
+    @event.listens_for(session_factory, "after_rollback")
+    def _after_rollback(session):
+        session.info.pop("_commit_t0", None)
@@ -1,5 +1,5 @@
 # models.py
-from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Text, JSON, ForeignKey, LargeBinary
 from sqlalchemy import Enum as SAEnum
 from datetime import datetime
 from .database import Base
@@ -11,6 +11,16 @@ class RequestStatus(enum.Enum):
     rejected = "rejected"
     failed = "failed"
 
+class User(Base):
+    __tablename__ = "users"
+
+    id = Column(Integer, primary_key=True)
+    username = Column(String(200), unique=True, index=True, nullable=False)
+    password_hash = Column(String, nullable=False)
+    role = Column(String, default="reader", nullable=False)
+    token_version = Column(Integer, default=0, nullable=False)   # bump = revoke all tokens
+    created_at = Column(DateTime, default=datetime.utcnow)
+
 class ChangeRequest(Base):
     __tablename__ = "change_requests"
     id = Column(Integer, primary_key=True, index=True)
@@ -25,6 +35,22 @@ class ChangeRequest(Base):
     comment = Column(Text, nullable=True)
     type = Column(String, default="config")   # "config" | "delete"
 
+class ChangeSet(Base):
+    """Change requests submitted, approved and applied as one unit."""
+    __tablename__ = "change_sets"
+    id = Column(Integer, primary_key=True, index=True)
+    requester = Column(String(200), nullable=False)
+    approver = Column(String(200), nullable=True)
+    status = Column(SAEnum(RequestStatus), default=RequestStatus.pending, index=True)
+    comment = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class ChangeSetItem(Base):
+    __tablename__ = "change_set_items"
+    request_id = Column(Integer, ForeignKey("change_requests.id"), primary_key=True)
+    change_set_id = Column(Integer, ForeignKey("change_sets.id"), index=True, nullable=False)
+
 class InterfaceCache(Base):
     __tablename__ = "interface_cache"
 
@@ -32,6 +58,40 @@ class InterfaceCache(Base):
     data = Column(JSON, nullable=False)
     updated_at = Column(DateTime, default=datetime.utcnow)
     
+class InterfaceCacheHead(Base):
+    """Commit 0 (timestamp) of the device when its interface_cache row was fetched."""
+    __tablename__ = "interface_cache_head"
+
+    device = Column(String, primary_key=True)
+    head = Column(String, nullable=True)
+    checked_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+class InterfaceOperStamp(Base):
+    """Last oper-state patch of an interface_cache row (its updated_at stays the config age)."""
+    __tablename__ = "interface_oper"
+
+    device = Column(String, primary_key=True)
+    patched_at = Column(DateTime, nullable=False)
+
+class VcTopology(Base):
+    """Virtual-chassis members + VC ports; vc_status is patched by the oper poller."""
+    __tablename__ = "vc_topology"
+
+    device = Column(String, primary_key=True)
+    members = Column(JSON, nullable=False)      # [0, 1, ...]
+    ports = Column(JSON, nullable=False)        # [{"name", "member", "vc_status"}]
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)   # topology fetched
+    status_at = Column(DateTime, nullable=True)                              # last status patch
+
+class DeviceCapability(Base):
+    """What a switch accepts: hello capabilities + learned per-feature results."""
+    __tablename__ = "device_capabilities"
+
+    device = Column(String, primary_key=True)
+    hello = Column(JSON, nullable=False)        # server capabilities from the last hello
+    features = Column(JSON, nullable=False)     # {"filter:vlans": {"ok": bool, "at": epoch}}
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
 class Vlan(Base):
     __tablename__ = "vlans"
 
@@ -78,3 +138,39 @@ class AuditLog(Base):
     comment = Column(String, nullable=True)
 
     payload = Column(JSON, nullable=True)
+
+class RollbackHistory(Base):
+    __tablename__ = "rollback_history"
+
+    device = Column(String, primary_key=True)
+    commits = Column(JSON, nullable=False)        # parsed `show system commit`
+    head = Column(String, nullable=True)          # timestamp of commit 0
+    updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+class RollbackDiff(Base):
+    __tablename__ = "rollback_diffs"
+
+    device = Column(String, primary_key=True)
+    idx = Column(Integer, primary_key=True)
+    commit_ts = Column(String, primary_key=True)  # timestamp of commit <idx>
+    diff = Column(Text, nullable=False)           # `rollback compare 0 <idx>`
+    fetched_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+class ConfigBlob(Base):
+    __tablename__ = "config_blobs"
+
+    hash = Column(String(64), primary_key=True)   # sha256 of canonical XML
+    data = Column(LargeBinary, nullable=False)    # zlib-compressed canonical XML
+    size = Column(Integer, nullable=False)        # uncompressed bytes
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+
+class ConfigSnapshot(Base):
+    __tablename__ = "config_snapshots"
+
+    id = Column(Integer, primary_key=True)
+    device = Column(String, index=True, nullable=False)
+    section = Column(String, nullable=False)      # "interfaces" | "vlans"
+    hash = Column(String(64), ForeignKey("config_blobs.hash"), nullable=False)
+    reason = Column(String, nullable=True)        # "retrieve" | "commit"
+    taken_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    last_seen_at = Column(DateTime, default=datetime.utcnow, nullable=False)
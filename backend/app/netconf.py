@@ -2,29 +2,54 @@
 import os
 import json
 import time
-import threading, re
+import re
+import threading
+from contextlib import contextmanager
 from ncclient import manager
 from ncclient.xml_ import to_ele
+from ncclient.operations.errors import TimeoutExpiredError
+from ncclient.transport.errors import TransportError
+from ncclient.operations.rpc import RPCError
 from lxml import etree
+from lxml.builder import E
 from datetime import datetime
 from .models import InterfaceCache
+from . import events, search, metrics, tracing, health, scheduler, snapshots, sharedcache, capabilities
 import xml.sax.saxutils as sax
 
 DEFAULT_PORT = 830
 
-# Simple in-memory caches and locks
-_CACHE_LOCK = threading.Lock()
-_cache_interfaces = {}   # device -> {"ts": float, "data": [...]}
-_cache_live = {}         # (device, ifname) -> {"ts": float, "data": {...}}
-_device_locks = {}       # device -> threading.Lock()
-_cache_ae = {}            # (device, ae_name) -> {"ts": float, "data": dict}
-_CACHE_VC = {}       # device -> { ts, data }
+# Short-lived caches and per-device locks live in app/sharedcache.py
+# (per process, or shared by all workers with CACHE_BACKEND=sqlite):
+#   "live"  "<device>|<ifname>"  -> single interface (INTERFACE_LIVE_TTL)
+#   "ae"    "<device>|<ae>"      -> AE summary (AE_TTL)
+#   "swr"   "<device>"           -> background interface refresh in progress
+#   "vc"    "<device>"           -> VC topology (VC_MEMORY_TTL, backed by vc_topology table)
 
 
 # TTLs (seconds)
 INTERFACES_TTL = float(os.getenv("INTERFACES_TTL", "5"))   # small TTL
 INTERFACE_LIVE_TTL = float(os.getenv("INTERFACE_LIVE_TTL", "3"))
 AE_TTL = float(os.getenv("AE_TTL", "15"))
+VC_TOPOLOGY_TTL = float(os.getenv("VC_TOPOLOGY_TTL", "86400"))   # members / VC ports rarely change
+VC_MEMORY_TTL = float(os.getenv("VC_MEMORY_TTL", "300"))         # picks up poller status patches
+
+# stale-while-revalidate for the interface cache (0 = off)
+#   older than SOFT → served as is + background refresh
+#   older than HARD → caller waits for a live refresh
+INTERFACES_SOFT_TTL = float(os.getenv("INTERFACES_SOFT_TTL", "300"))
+INTERFACES_HARD_TTL = float(os.getenv("INTERFACES_HARD_TTL", "0"))
+
+# socket connect + hello exchange vs. per-RPC reply wait (commits can be slow)
+CONNECT_TIMEOUT = float(os.getenv("NETCONF_CONNECT_TIMEOUT", "10"))
+RPC_TIMEOUT = float(os.getenv("NETCONF_RPC_TIMEOUT", "60"))
+
+# errors that say "device/transport is in trouble" (not an <rpc-error> reply)
+_TRANSPORT_ERRORS = (TimeoutExpiredError, TransportError, OSError, EOFError)
+# <rpc-error>s meaning "this request isn't understood here" (vs. a failure that may pass)
+_UNSUPPORTED_TAGS = {"unknown-element", "bad-element", "unknown-attribute", "bad-attribute",
+                     "unknown-namespace", "operation-not-supported"}
+_UNSUPPORTED_MESSAGES = ("syntax error", "unknown command", "not supported")
 
 def fetch_interfaces(device):
     """
@@ -33,30 +58,126 @@ def fetch_interfaces(device):
     # use the existing "get_interfaces_raw" which returns a list (config+oper)
     return get_interfaces_raw(device)
 
-def _get_device_lock(dev_name):
-    with _CACHE_LOCK:
-        if dev_name not in _device_locks:
-            _device_locks[dev_name] = threading.Lock()
-        return _device_locks[dev_name]
+def _device_name(dev):
+    if isinstance(dev, str):
+        return dev
+    return dev.get("name") or dev.get("host") or "unknown"
 
+@contextmanager
 def connect(dev):
-    """dev may be dict or device-name (string)"""
+    """
+    dev may be dict or device-name (string).
+    Use as `with connect(dev) as m:` — the session is closed on exit.
+    Sessions per device are limited by the scheduler (app/scheduler.py).
+    """
     from .devices import get_device
     if isinstance(dev, str):
-        dev = get_device(dev)
+        dev = {"name": dev, **get_device(dev)}
+    name = _device_name(dev)
     host = dev.get("host")
     port = dev.get("port", DEFAULT_PORT)
     user = dev.get("username")
     pw = dev.get("password")
-    return manager.connect(host=host, port=port, username=user, password=pw,
-                           hostkey_verify=False, allow_agent=False, look_for_keys=False, timeout=60)
 
-def to_ele(response):
+    # fail fast while the device's circuit is open, then wait for a session slot
+    health.check(name)
+    with scheduler.slot(name):
+        health.before_call(name)
+        try:
+            with tracing.span("netconf.handshake", device=name), \
+                    metrics.NETCONF_HANDSHAKE_SECONDS.time(device=name):
+                m = manager.connect(host=host, port=port, username=user, password=pw,
+                                    hostkey_verify=False, allow_agent=False, look_for_keys=False,
+                                    timeout=CONNECT_TIMEOUT, manager_params={"timeout": RPC_TIMEOUT})
+        except Exception as e:
+            metrics.NETCONF_RPC_ERRORS.inc(rpc="connect", device=name)
+            health.record_failure(name, e)
+            raise
+        health.record_success(name)
+        m.device_name = name
+
+        with metrics.NETCONF_INFLIGHT.track(device=name), m:
+            try:
+                capabilities.learn_hello(name, m.server_capabilities)
+            except Exception as e:
+                # best effort: a busy DB must not cost the session
+                print(f"⚠️ {name}: capabilities not saved: {e}")
+            yield m
+
+def _rpc(m, kind, fn, *args, **kwargs):
+    """Run one manager call, recording latency / errors per RPC type and device."""
+    device = getattr(m, "device_name", "unknown")
+    t0 = time.perf_counter()
     try:
-        data_xml = response.data_xml
-    except Exception:
-        data_xml = str(response)
-    return etree.fromstring(data_xml.encode()) if isinstance(data_xml, str) else response
+        with tracing.span(f"netconf.{kind}", device=device):
+            return fn(*args, **kwargs)
+    except Exception as e:
+        metrics.NETCONF_RPC_ERRORS.inc(rpc=kind, device=device)
+        if isinstance(e, _TRANSPORT_ERRORS):
+            health.record_failure(device, e)
+        raise
+    finally:
+        metrics.NETCONF_RPC_SECONDS.observe(time.perf_counter() - t0, rpc=kind, device=device)
+
+def _unsupported(e):
+    """True for an <rpc-error> that rejects the request itself (unknown element, syntax error)."""
+    if not isinstance(e, RPCError):
+        return False
+    for err in e.errlist or [e]:
+        msg = (err.message or "").lower()
+        if err.tag in _UNSUPPORTED_TAGS or any(s in msg for s in _UNSUPPORTED_MESSAGES):
+            return True
+    return False
+
+def _with_capability(m, feature, preferred, fallback):
+    """
+    preferred() unless the device is known to reject `feature`, else
+    fallback(). An <rpc-error> saying the request isn't supported is
+    remembered (app/capabilities.py) so the next call skips straight to the
+    fallback; other errors only use the fallback this once.
+    """
+    device = m.device_name
+    if capabilities.supports(device, feature) is not False:
+        try:
+            result = preferred()
+        except Exception as e:
+            if isinstance(e, _TRANSPORT_ERRORS):
+                raise
+            if _unsupported(e):
+                capabilities.record(device, feature, False)
+            else:
+                print(f"ℹ️ {device}: {feature} failed ({e}), using the fallback")
+        else:
+            capabilities.record(device, feature, True)
+            return result
+    return fallback()
+
+def _get_config(m, feature, criteria):
+    """Subtree-filtered get-config, or the full running config if the filter is rejected."""
+    return _with_capability(
+        m, feature,
+        lambda: _rpc(m, "get-config", m.get_config, source='running', filter=('subtree', criteria)),
+        lambda: _rpc(m, "get-config", m.get_config, source='running'),
+    )
+
+def _vc_port_reply(m):
+    """`show virtual-chassis vc-port` reply, or None for a switch without VC."""
+    if capabilities.supports(m.device_name, "junos") is False:
+        return None
+    rpc = etree.XML('<command format="xml">show virtual-chassis vc-port</command>')
+    return _with_capability(
+        m, "rpc:vc-port",
+        lambda: _rpc(m, "show virtual-chassis vc-port", m.rpc, rpc),
+        lambda: None,
+    )
+
+def to_ele(response):
+    with metrics.XML_PARSE_SECONDS.time(parser="reply"):
+        try:
+            data_xml = response.data_xml
+        except Exception:
+            data_xml = str(response)
+        return etree.fromstring(data_xml.encode()) if isinstance(data_xml, str) else response
 
 # --------------------------
 # (Your existing parsing functions)
@@ -65,14 +186,10 @@ def to_ele(response):
 # --------------------------
 
 def get_configuration(dev):
+    # whole <interfaces> section: snapshots/diffs need more than the parser reads
     with connect(dev) as m:
-        try:
-            criteria = etree.XML('<configuration><interfaces/></configuration>')
-            reply = m.get_config(source='running', filter=('subtree', criteria))
-            return to_ele(reply)
-        except Exception:
-            reply = m.get_config(source='running')
-            return to_ele(reply)
+        criteria = etree.XML('<configuration><interfaces/></configuration>')
+        return to_ele(_get_config(m, "filter:interfaces", criteria))
         
 def _get_interfaces_config_cached_ele(dev_name):
     """
@@ -83,6 +200,10 @@ def _get_interfaces_config_cached_ele(dev_name):
     return cfg
 
 def parse_interfaces_config(cfg_ele):
+    with metrics.XML_PARSE_SECONDS.time(parser="interfaces_config"):
+        return _parse_interfaces_config(cfg_ele)
+
+def _parse_interfaces_config(cfg_ele):
     interfaces = []
     for ifl in cfg_ele.xpath('//*[local-name()="configuration"]/*[local-name()="interfaces"]/*[local-name()="interface"]'):
         # name
@@ -186,14 +307,12 @@ def get_ae_summary_cached(dev_name, ae_name):
     Fast AE lookup WITHOUT live RPC.
     Uses interfaces config only.
     """
-    now = time.time()
-    key = (dev_name, ae_name)
-
-    # cache hit
-    entry = _cache_ae.get(key)
-    if entry and (now - entry["ts"] < AE_TTL):
-        return entry["data"]
+    return sharedcache.get_or_compute(
+        "ae", f"{dev_name}|{ae_name}", AE_TTL,
+        lambda: _ae_summary(dev_name, ae_name),
+    )
 
+def _ae_summary(dev_name, ae_name):
     cfg_ele = _get_interfaces_config_cached_ele(dev_name)
 
     result = {
@@ -239,39 +358,127 @@ def get_ae_summary_cached(dev_name, ae_name):
             result["members"].append(ifname)
 
     result["members"].sort()
-
-    _cache_ae[key] = {"ts": now, "data": result}
     return result
 
+def _terse(m):
+    """{ifname: {admin_up, oper_up}} from `show interfaces terse` on an open session."""
+    rpc = etree.XML('<get-interface-information><terse/></get-interface-information>')
+    res = _rpc(m, "get-interface-information", m.dispatch, rpc)
+    ele = to_ele(res)
+    oper = {}
+    for phy in ele.xpath('//*[local-name()="physical-interface"]'):
+        name_list  = phy.xpath('./*[local-name()="name"]/text()')
+        admin_list = phy.xpath('./*[local-name()="admin-status"]/text()')
+        oper_list  = phy.xpath('./*[local-name()="oper-status"]/text()')
+        name   = name_list[0].strip()  if name_list  else None
+        admin  = admin_list[0].strip() if admin_list else None
+        oper_s = oper_list[0].strip()  if oper_list  else None
+        if not name:
+            continue
+        oper[name] = {'admin_up': (admin == 'up'), 'oper_up': (oper_s == 'up')}
+    return oper
+
 def get_operational(dev):
     with connect(dev) as m:
-        rpc = etree.XML('<get-interface-information><terse/></get-interface-information>')
-        res = m.dispatch(rpc)
-        ele = to_ele(res)
-        oper = {}
-        for phy in ele.xpath('//*[local-name()="physical-interface"]'):
-            name_list  = phy.xpath('./*[local-name()="name"]/text()')
-            admin_list = phy.xpath('./*[local-name()="admin-status"]/text()')
-            oper_list  = phy.xpath('./*[local-name()="oper-status"]/text()')
-            name   = name_list[0].strip()  if name_list  else None
-            admin  = admin_list[0].strip() if admin_list else None
-            oper_s = oper_list[0].strip()  if oper_list  else None
-            if not name:
-                continue
-            oper[name] = {'admin_up': (admin == 'up'), 'oper_up': (oper_s == 'up')}
-        return oper
+        return _terse(m)
+
+_COUNTER_PATHS = {
+    "in_bytes": "./*[local-name()='traffic-statistics']/*[local-name()='input-bytes']",
+    "out_bytes": "./*[local-name()='traffic-statistics']/*[local-name()='output-bytes']",
+    "in_packets": "./*[local-name()='traffic-statistics']/*[local-name()='input-packets']",
+    "out_packets": "./*[local-name()='traffic-statistics']/*[local-name()='output-packets']",
+    "in_errors": "./*[local-name()='input-error-list']/*[local-name()='input-errors']",
+    "out_errors": "./*[local-name()='output-error-list']/*[local-name()='output-errors']",
+}
+
+def _parse_counters(ele):
+    out = {}
+    for phy in ele.xpath('//*[local-name()="physical-interface"]'):
+        name = phy.xpath('./*[local-name()="name"]/text()')
+        if not name:
+            continue
+        c = {}
+        for field, path in _COUNTER_PATHS.items():
+            v = phy.xpath(path + "/text()")
+            c[field] = int(v[0].strip()) if v and v[0].strip().isdigit() else 0
+        out[name[0].strip()] = c
+    return out
+
+def get_interface_counters(dev, ifnames=None):
+    """
+    Traffic/error counters ({ifname: {in_bytes, out_bytes, in_packets,
+    out_packets, in_errors, out_errors}}) via `show interfaces statistics`.
+    Few ports → one RPC per port, otherwise one RPC for the whole switch;
+    always a single session. A port the switch rejects (<rpc-error>) is left
+    out; the other ports still get their counters.
+    """
+    with connect(dev) as m:
+        if ifnames and len(ifnames) <= 8:
+            out = {}
+            for n in ifnames:
+                rpc = etree.XML('<get-interface-information><statistics/><interface-name/></get-interface-information>')
+                rpc.find("interface-name").text = n
+                try:
+                    reply = _rpc(m, "get-interface-information", m.dispatch, rpc)
+                except _TRANSPORT_ERRORS:
+                    raise
+                except Exception as e:
+                    print(f"✖ counters {m.device_name} {n}: {e}")
+                    continue
+                out.update(_parse_counters(to_ele(reply)))
+            return out
+        rpc = etree.XML('<get-interface-information><statistics/></get-interface-information>')
+        out = _parse_counters(to_ele(_rpc(m, "get-interface-information", m.dispatch, rpc)))
+        if ifnames:
+            wanted = set(ifnames)
+            out = {k: v for k, v in out.items() if k in wanted}
+        return out
+
+def get_oper_state(dev):
+    """
+    Oper/admin state + VC port status in one session, no config.
+    Returns (oper, vc) with vc = {ifname: vc_status}.
+    """
+    with connect(dev) as m:
+        oper = _terse(m)
+        res = _vc_port_reply(m)
+        vc = {p["name"]: p.get("vc_status") for p in parse_vc_ports_xml(res)} if res is not None else {}
+        return oper, vc
 
-def get_interfaces_raw(dev):
+def patch_oper_state(ports, oper, vc):
+    """
+    Overlay polled state on cached interface dicts (same rules as
+    get_interfaces_raw). Returns (new list, number of ports changed).
+    """
+    out, changed = [], 0
+    for p in ports:
+        name = p.get("name")
+        new = p
+        if p.get("vc_port") and name in vc:
+            status = vc[name]
+            upd = {"vc_status": status, "oper_up": status == "Up"}
+        elif not p.get("vc_port") and name in oper:
+            upd = oper[name]
+        else:
+            upd = {}
+        if any(p.get(k) != v for k, v in upd.items()):
+            new = {**p, **upd}
+            changed += 1
+        out.append(new)
+    return out, changed
+
+def get_interfaces_raw(dev, snapshot_reason="retrieve"):
     """
     Return merged list of interfaces — but *only*:
       - all configured interfaces (from configuration)
       - VC ports (from `show virtual-chassis vc-port`)
     This avoids returning the entire physical skeleton (48* members).
+    The <interfaces> config is kept in the snapshot store.
     """
     # accept either device-name or device-dict
     from .devices import get_device
     if isinstance(dev, str):
-        dev_info = get_device(dev)
+        dev_info = {"name": dev, **get_device(dev)}
         dev_name = dev
     else:
         dev_info = dev
@@ -279,6 +486,7 @@ def get_interfaces_raw(dev):
 
     # 1) configured interfaces from running config
     cfg_ele = get_configuration(dev_info)
+    snapshots.record(dev_name or _device_name(dev_info), "interfaces", cfg_ele, snapshot_reason)
     cfg_ports = parse_interfaces_config(cfg_ele)  # returns only configured iface entries
 
     # create map by name for quick overlay
@@ -307,8 +515,9 @@ def get_interfaces_raw(dev):
         p["_source"] = p.get("_source", "live")
 
     # 3) VC ports (authoritative for vc-status). These must be included even if not in config.
+    #    From the topology cache: status is kept current by the oper poller.
     try:
-        vc_ports = get_vc_ports_raw(dev_info)
+        vc_ports = get_vc_topology(dev_name or _device_name(dev_info))["ports"]
     except Exception:
         vc_ports = []
 
@@ -378,13 +587,11 @@ def get_interfaces_raw(dev):
     return result
 
 def get_vlans(dev):
+    # whole <vlans> section (snapshotted), see get_configuration
     with connect(dev) as m:
-        try:
-            criteria = etree.XML('<configuration><vlans/></configuration>')
-            reply = m.get_config(source='running', filter=('subtree', criteria))
-        except Exception:
-            reply = m.get_config(source='running')
-        ele = to_ele(reply)
+        criteria = etree.XML('<configuration><vlans/></configuration>')
+        ele = to_ele(_get_config(m, "filter:vlans", criteria))
+        snapshots.record(_device_name(dev), "vlans", ele)
         vlans = []
         for v in ele.xpath('//*[local-name()="configuration"]/*[local-name()="vlans"]/*[local-name()="vlan"]'):
             name_list = v.xpath('./*[local-name()="name"]/text()')
@@ -396,22 +603,22 @@ def get_vlans(dev):
         return vlans
 
 def get_interface_live_raw(dev, if_name):
-    print("LIVE RPC:", if_name)
-
     """Return detailed information for a single interface (talks to device)."""
     try:
         with connect(dev) as m:
+            # only the leaves parse_interfaces_config reads
             criteria = etree.XML(
                 f'<configuration><interfaces><interface>'
-                f'<name>{if_name}</name><unit/><ether-options/><aggregated-ether-options/>'
+                f'<name>{sax.escape(if_name)}</name><description/>'
+                f'<unit><name/><family><ethernet-switching/></family></unit>'
+                f'<ether-options/><aggregated-ether-options/>'
                 f'</interface></interfaces></configuration>'
             )
-            cfg = m.get_config(source='running', filter=('subtree', criteria))
-            cfg_ele = to_ele(cfg)
-            parsed = parse_interfaces_config(cfg_ele)
+            cfg_ele = to_ele(_get_config(m, "filter:interface", criteria))
+            parsed = [p for p in parse_interfaces_config(cfg_ele) if p.get("name") == if_name]
             info = parsed[0] if parsed else {'name': if_name}
             rpc = etree.XML(f'<get-interface-information><interface-name>{if_name}</interface-name><terse/></get-interface-information>')
-            res = m.dispatch(rpc)
+            res = _rpc(m, "get-interface-information", m.dispatch, rpc)
             ele = to_ele(res)
             phy_nodes = ele.xpath('.//*[local-name()="physical-interface"]')
             phy = phy_nodes[0] if phy_nodes else None
@@ -421,10 +628,15 @@ def get_interface_live_raw(dev, if_name):
                 admin = admin_list[0].strip() if admin_list else None
                 oper_s = oper_list[0].strip() if oper_list else None
                 info.update({'admin_up': admin == 'up', 'oper_up': oper_s == 'up'})
-            # TODO: optionally gather byte counters via RPC <get-interface-statistics>
+            # byte/packet counters: see get_interface_counters() / app/counters.py
             info['configured'] = info.get('configured', False) or info.get('type') == 'ae'
             return info
+    except health.DeviceUnavailable:
+        raise
     except Exception:
+        # don't try a second session against a box that just failed to answer
+        if not health.reachable(_device_name(dev)):
+            raise
         oper = get_operational(dev)
         base = {'name': if_name, 'type': if_name.split('-',1)[0] if '-' in if_name else ('ae' if if_name.startswith('ae') else 'ge'),
                 'aggregate': if_name.startswith('ae'), 'bundle': None,
@@ -438,7 +650,60 @@ def get_interface_live_raw(dev, if_name):
 
 # ---- CACHED WRAPPERS ----
 
-def get_interfaces_cached(device: str, db):
+def _refresh_interfaces(device):
+    """Live fetch + store in a session of its own."""
+    from .database import SessionLocal
+    interfaces = get_interfaces_raw(device)
+    for i in interfaces:
+        i["_source"] = "live"
+    db = SessionLocal()
+    try:
+        store_interfaces_cache(db, device, interfaces)
+    finally:
+        db.close()
+    return interfaces
+
+def _background_refresh(device):
+    # non-blocking lock: another thread/worker already refreshing → done
+    try:
+        with sharedcache.lock(f"refresh:{device}", timeout=0):
+            sharedcache.set("swr", device, time.time(), RPC_TIMEOUT + CONNECT_TIMEOUT)
+            try:
+                with scheduler.priority(scheduler.BACKGROUND):
+                    _refresh_interfaces(device)
+            finally:
+                sharedcache.delete("swr", device)
+    except sharedcache.LockTimeout:
+        pass
+    except Exception as e:
+        print(f"✖ background refresh {device} failed: {e}")
+
+def refresh_in_progress(device):
+    return sharedcache.get("swr", device) is not None
+
+def trigger_refresh(device):
+    """Start a deduplicated background refresh; returns the refresh state."""
+    if refresh_in_progress(device):
+        return "refreshing"
+    if not health.reachable(device):
+        return "unavailable"
+    threading.Thread(target=_background_refresh, args=(device,),
+                     name=f"swr-{device}", daemon=True).start()
+    return "refreshing"
+
+def get_interfaces_cached(device: str, db, soft_ttl=None, hard_ttl=None):
+    """
+    Interface snapshot from the DB with a freshness policy.
+    Result carries "age" (seconds) and "refresh":
+      fresh        younger than soft_ttl
+      refreshing   served stale, background refresh running
+      refreshed    was past hard_ttl (or missing): fetched live
+      unavailable  stale, device circuit open → no refresh attempted
+      failed       past hard_ttl, live refresh failed → served stale
+    """
+    soft_ttl = INTERFACES_SOFT_TTL if soft_ttl is None else soft_ttl
+    hard_ttl = INTERFACES_HARD_TTL if hard_ttl is None else hard_ttl
+
     row = (
         db.query(InterfaceCache)
           .filter(InterfaceCache.device == device)
@@ -446,6 +711,30 @@ def get_interfaces_cached(device: str, db):
     )
 
     if row:
+        age = (datetime.utcnow() - row.updated_at).total_seconds()
+
+        if hard_ttl and age > hard_ttl and health.reachable(device):
+            metrics.cache_miss("interface_cache")
+            try:
+                # single-flight: waiters find the row refreshed by the first caller
+                with sharedcache.lock(f"refresh:{device}"):
+                    db.refresh(row)
+                    age = (datetime.utcnow() - row.updated_at).total_seconds()
+                    if age > hard_ttl:
+                        _refresh_interfaces(device)
+                        db.refresh(row)
+                        age = 0.0
+                refresh = "refreshed"
+            except Exception as e:
+                print(f"✖ refresh {device} failed, serving cache: {e}")
+                refresh = "failed"
+        else:
+            metrics.cache_hit("interface_cache")
+            if soft_ttl and age > soft_ttl:
+                refresh = trigger_refresh(device)
+            else:
+                refresh = "refreshing" if refresh_in_progress(device) else "fresh"
+
         interfaces = row.data or []
 
         # ✅ NORMALISEER ouwe records
@@ -455,10 +744,13 @@ def get_interfaces_cached(device: str, db):
         return {
             "timestamp": row.updated_at.isoformat(),
             "interfaces": interfaces,
-            "source": "cache"
+            "source": "cache",
+            "age": round(max(age, 0.0), 1),
+            "refresh": refresh,
         }
 
     # fallback live
+    metrics.cache_miss("interface_cache")
     interfaces = get_interfaces_raw(device)
     for i in interfaces:
         i["_source"] = "live"
@@ -468,23 +760,36 @@ def get_interfaces_cached(device: str, db):
     return {
         "timestamp": datetime.utcnow().isoformat(),
         "interfaces": interfaces,
-        "source": "live"
+        "source": "live",
+        "age": 0.0,
+        "refresh": "refreshed",
     }
+
 def store_interfaces_cache(db, device: str, interfaces: list[dict]):
     """
     Overwrite interface cache for a device with fresh live data.
     This is the single source of truth after retrieve.
     """
 
+    updated_at = datetime.utcnow()
     db.merge(
         InterfaceCache(
             device=device,
             data=interfaces,
-            updated_at=datetime.utcnow()
+            updated_at=updated_at
         )
     )
     db.commit()
 
+    search.update_device(device, interfaces, updated_at)
+
+    # push to subscribed UIs so they don't have to re-fetch
+    events.publish(f"device:{device}", "interfaces", {
+        "device": device,
+        "retrieved_at": updated_at.isoformat(),
+        "interfaces": interfaces,
+    })
+
 
 def get_interface_live_cached(dev_name, if_name):
     """Return dict of single interface with very short TTL."""
@@ -493,167 +798,90 @@ def get_interface_live_cached(dev_name, if_name):
     if if_name.startswith("ae"):
         return get_ae_summary_cached(dev_name, if_name)
 
-    now = time.time()
-    key = (dev_name, if_name)
-    lock = _get_device_lock(dev_name)
-    with lock:
-        entry = _cache_live.get(key)
-        if entry and (now - entry["ts"] < INTERFACE_LIVE_TTL):
-            return entry["data"]
-        data = get_interface_live_raw(dev_name, if_name)
-        _cache_live[key] = {"ts": now, "data": data}
-        return data
+    # one live fetch per device at a time; waiters reuse its result
+    return sharedcache.get_or_compute(
+        "live", f"{dev_name}|{if_name}", INTERFACE_LIVE_TTL,
+        lambda: get_interface_live_raw(dev_name, if_name),
+        lock_name=f"device:{dev_name}",
+    )
 
 
 # Simple cache invalidation helper (call after commit)
 def invalidate_device_cache(dev_name):
-    with _CACHE_LOCK:
-        _cache_interfaces.pop(dev_name, None)
-        _cache_ae_keys = [k for k in _cache_ae if k[0] == dev_name]
-        for k in _cache_ae_keys:
-            _cache_ae.pop(k, None)
-        keys = [k for k in _cache_live.keys() if k[0] == dev_name]
-        for k in keys:
-            _cache_live.pop(k, None)
-
-# Example commit_changes placeholder (safe pattern: candidate + confirmed)
+    for ns in ("ae", "live"):
+        sharedcache.delete(ns, f"{dev_name}|")
+
 def commit_changes(dev, interfaces, config):
     """
-    Apply a config change using candidate + confirm pattern.
-    This function is intentionally conservative; adapt XML templates for your environment.
-    After successful commit or in any exception, it invalidates cache.
+    Replace the same config on several interfaces in one commit.
+    After the commit (or on any exception) the device cache is invalidated.
     """
-    if isinstance(dev, str):
-        from .devices import get_device
-        dev = get_device(dev)
-    with connect(dev) as m:
-        m.lock('candidate')
-        try:
-            # Build your XML 'config' snippet here according to 'config' dict
-            # WARNING: modify appropriately for your production templates
-            template = '<configuration><interfaces/></configuration>'
-            m.edit_config(target='candidate', config=template)
-            m.commit()
-        finally:
-            try:
-                m.unlock('candidate')
-            except Exception:
-                pass
-    # invalidate cache so frontend sees changes after commit
-    if isinstance(dev, dict):
-        devname = dev.get("name")
-    else:
-        # if dev is device dict without name, just clear all caches (safe)
-        devname = None
-    if devname:
+    devname = _device_name(dev)
+    try:
+        with connect(dev) as m:
+            apply_interface_changes(m, [(name, config) for name in interfaces])
+    finally:
         invalidate_device_cache(devname)
-    else:
-        # best effort: clear whole cache
-        with _CACHE_LOCK:
-            _cache_interfaces.clear()
-            _cache_live.clear()
 
-def apply_interface_config(mgr, interface: str, config: dict):
-    """
-    Apply configuration by sending a proper <config><configuration>... XML snippet.
-    - Uses candidate + commit (no confirm)
-    - Increases mgr.timeout to avoid RPC timeout during commit
-    - Escapes user-provided strings
-    """
+# ---- apply engine ----
+# Every change goes out as ONE edit-config: operation="replace" per
+# interface (the block becomes exactly what we send, whether it existed or
+# not) or operation="delete", many interfaces batched into one payload.
+
+def interface_element(interface, config=None):
+    """<interface operation="replace"> for `config`, or operation="delete" when config is None."""
+    if config is None:
+        return E.interface(E.name(interface), operation="delete")
+
     if config.get("vc_port"):
         raise ValueError("VC port configuration is not allowed")
-
-    # Build interface XML
-    desc = config.get("description")
     mode = config.get("mode")
-    access = config.get("access_vlan")
-    trunk = config.get("trunk_vlans") or []
-    native = config.get("native_vlan")
-
-    # Basic validation
     if mode not in ("access", "trunk"):
         raise ValueError("mode must be 'access' or 'trunk'")
 
-    # escape text fields
-    def esc(v):
-        return sax.escape(str(v)) if v is not None else None
-
-    desc_xml = f"<description>{esc(desc)}</description>" if desc else ""
-    # build vlan members XML (multiple <members> entries)
-    vlan_members_xml = ""
-    if mode == "access" and access:
-        vlan_members_xml = f"<vlan><members>{esc(access)}</members></vlan>"
-    elif mode == "trunk" and trunk:
-        # trunk: multiple members entries under vlan
-        members = "".join(f"<members>{esc(v)}</members>" for v in trunk)
-        vlan_members_xml = f"<vlan>{members}</vlan>"
-
-    native_xml = f"<native-vlan-id>{esc(native)}</native-vlan-id>" if native else ""
-
-    # assemble interface XML
-    interface_xml = f"""
-    <interfaces>
-      <interface>
-        <name>{esc(interface)}</name>
-        {desc_xml}
-        <unit>
-          <name>0</name>
-          <family>
-            <ethernet-switching>
-              <interface-mode>{esc(mode)}</interface-mode>
-              {vlan_members_xml}
-              {native_xml}
-            </ethernet-switching>
-          </family>
-        </unit>
-      </interface>
-    </interfaces>
-    """
-
-    # full config wrapper
-    xml_payload = f"<config><configuration>{interface_xml}</configuration></config>"
-
-    # execute: use candidate then commit (increase timeout)
+    esw = E("ethernet-switching", E("interface-mode", mode))
+    if mode == "access":
+        members = [config["access_vlan"]] if config.get("access_vlan") else []
+    else:
+        members = config.get("trunk_vlans") or []
+    if members:
+        esw.append(E.vlan(*[E.members(str(v)) for v in members]))
+    if config.get("native_vlan"):
+        esw.append(E("native-vlan-id", str(config["native_vlan"])))
+
+    el = E.interface(E.name(interface), operation="replace")
+    if config.get("description"):
+        el.append(E.description(str(config["description"])))
+    el.append(E.unit(E.name("0"), E.family(esw)))
+    return el
+
+def build_interfaces_edit(changes):
+    """<config> payload for [(interface, config | None), ...]."""
+    return E.config(E.configuration(E.interfaces(
+        *[interface_element(name, cfg) for name, cfg in changes]
+    )))
+
+def _candidate_commit(mgr, stage):
+    """
+    lock candidate (best effort) → stage(mgr) → commit → unlock.
+    A failed stage/commit discards the candidate so the next change starts clean.
+    """
     prev_timeout = getattr(mgr, "timeout", None)
+    mgr.timeout = 120   # commits can be slow
     try:
-        mgr.timeout = 120  # 2 minutes
         try:
             mgr.lock("candidate")
         except Exception:
-            # best-effort (some boxes don't support candidate)
-            pass
-
-        # Only delete existing interface block when the interface is already configured
-        if config.get("configured", True):
-            delete_xml = f"""
-            <config>
-            <configuration>
-                <interfaces>
-                <interface operation="delete">
-                    <name>{esc(interface)}</name>
-                </interface>
-                </interfaces>
-            </configuration>
-            </config>
-            """
+            pass   # some boxes don't support locking the candidate
+        try:
+            stage(mgr)
+            _rpc(mgr, "commit", mgr.commit)
+        except Exception:
             try:
-                mgr.edit_config(target="candidate", config=delete_xml)
-            except Exception as e:
-                msg = str(e)
-                # Junos: "statement not found: ge-0/0/16"
-                if "statement not found" in msg:
-                    pass  # safe to ignore
-                else:
-                    raise
-
-        # edit-config with full <config> wrapper; use 'merge' to merge with existing config
-        mgr.edit_config(target="candidate", config=xml_payload, default_operation="merge")
-
-        # commit (hard commit)
-        mgr.commit()
-    except Exception as e:
-        # raise a helpful error message upwards
-        raise RuntimeError(f"NETCONF apply failed: {e}")
+                mgr.discard_changes()
+            except Exception:
+                pass
+            raise
     finally:
         try:
             mgr.unlock("candidate")
@@ -662,6 +890,25 @@ def apply_interface_config(mgr, interface: str, config: dict):
         if prev_timeout is not None:
             mgr.timeout = prev_timeout
 
+@tracing.traced()
+def apply_interface_changes(mgr, changes):
+    """Replace/delete many interfaces with one edit-config + one commit."""
+    payload = build_interfaces_edit(changes)   # ValueError before touching the device
+    try:
+        _candidate_commit(mgr, lambda m: _rpc(
+            m, "edit-config", m.edit_config, target="candidate", config=payload,
+            default_operation="merge"))
+    except Exception as e:
+        raise RuntimeError(f"NETCONF apply failed: {e}")
+
+def apply_interface_config(mgr, interface: str, config: dict):
+    """Replace the config block of one interface."""
+    apply_interface_changes(mgr, [(interface, config)])
+
+def delete_interface_config(mgr, interface: str):
+    """Delete the config block of one interface."""
+    apply_interface_changes(mgr, [(interface, None)])
+
 
 def get_vc_ports_raw(dev):
     """
@@ -669,18 +916,88 @@ def get_vc_ports_raw(dev):
     Return: [{"name": "xe-0/2/2", "vc_status": "Up"}, ...]
     """
     with connect(dev) as m:
-        rpc = etree.XML("""
-            <command format="xml">
-                show virtual-chassis vc-port
-            </command>
-        """)
-        res = m.rpc(rpc)
-        return parse_vc_ports_xml(res)
+        res = _vc_port_reply(m)
+        return parse_vc_ports_xml(res) if res is not None else []
     
+def get_vc_topology_raw(dev):
+    """{"members": [..], "ports": [{"name", "member", "vc_status"}]} from the device."""
+    with connect(dev) as m:
+        res = _vc_port_reply(m)
+    if res is None:
+        return {"members": [0], "ports": []}   # standalone switch
+    ports = [{**p, "member": int(p["name"].split("-", 1)[1].split("/")[0])}
+             for p in parse_vc_ports_xml(res)]
+    members = {p["member"] for p in ports}
+    for re_name in to_ele(res).xpath('.//*[local-name()="multi-routing-engine-item"]/*[local-name()="re-name"]/text()'):
+        mm = re.match(r'fpc(\d+)', re_name)
+        if mm:
+            members.add(int(mm.group(1)))
+    return {"members": sorted(members) or [0], "ports": ports}
+
+def _topology_dict(row):
+    return {
+        "device": row.device,
+        "members": row.members,
+        "ports": row.ports,
+        "updated_at": row.updated_at.isoformat(),
+        "status_at": row.status_at.isoformat() if row.status_at else None,
+    }
+
+def get_vc_topology(device, refresh=False):
+    """VC members + ports: memory → vc_topology row (VC_TOPOLOGY_TTL) → device."""
+    from .database import SessionLocal
+    from .models import VcTopology
+
+    if not refresh:
+        hit = sharedcache.get("vc", device)
+        if hit is not None:
+            metrics.cache_hit("vc")
+            return hit
+
+    db = SessionLocal()
+    try:
+        row = db.query(VcTopology).filter(VcTopology.device == device).one_or_none()
+        age = (datetime.utcnow() - row.updated_at).total_seconds() if row else None
+        if row is None or refresh or age > VC_TOPOLOGY_TTL:
+            metrics.cache_miss("vc")
+            raw = get_vc_topology_raw(device)
+            row = db.merge(VcTopology(device=device, members=raw["members"], ports=raw["ports"],
+                                      updated_at=datetime.utcnow(), status_at=datetime.utcnow()))
+            db.commit()
+        else:
+            metrics.cache_hit("vc")
+        topo = _topology_dict(row)
+    finally:
+        db.close()
+
+    sharedcache.set("vc", device, topo, VC_MEMORY_TTL)
+    return topo
+
+def update_vc_status(db, device, vc):
+    """Patch polled {ifname: vc_status} into the topology row (no topology fetch)."""
+    from .models import VcTopology
+    row = db.query(VcTopology).filter(VcTopology.device == device).one_or_none()
+    if row is None:
+        return 0
+    ports, changed = [], 0
+    for p in row.ports or []:
+        status = vc.get(p["name"], p.get("vc_status"))
+        if status != p.get("vc_status"):
+            p = {**p, "vc_status": status}
+            changed += 1
+        ports.append(p)
+    if changed:
+        row.ports = ports
+    row.status_at = datetime.utcnow()
+    db.commit()
+    if changed:
+        sharedcache.delete("vc", device)
+    return changed
+
 def get_rollback_list(dev):
     with connect(dev) as m:
         rpc = etree.XML('<command format="text">show system commit</command>')
-        res = m.rpc(rpc)
+        res = _rpc(m, "show system commit", m.rpc, rpc)
         ele = etree.fromstring(str(res).encode())
         return ele.xpath('string(//*[local-name()="output"])').strip()
 
@@ -693,7 +1010,7 @@ def get_rollback_diff(dev, idx: int):
                 </command>
             """)
 
-            res = m.rpc(rpc)
+            res = _rpc(m, "show system rollback compare", m.rpc, rpc)
 
             #
             # --- Normalize RPCReply into an XML element ---
@@ -735,31 +1052,14 @@ def apply_rollback(mgr, idx: int):
     """
     Apply rollback <idx> using candidate+commit.
     """
-    # lock candidate (best effort)
-    try:
-        mgr.lock("candidate")
-    except:
-        pass
-
-    try:
-        rpc_load = etree.XML(f"""
-        <load-configuration rollback="{idx}" format="text"/>
-        """)
-        mgr.rpc(rpc_load)
-
-        # Hard commit (Junos-style)
-        rpc_commit = etree.XML("""
-        <commit/>
-        """)
-        mgr.rpc(rpc_commit)
-
-    finally:
-        try:
-            mgr.unlock("candidate")
-        except:
-            pass
+    rpc_load = E("load-configuration", rollback=str(int(idx)), format="text")
+    _candidate_commit(mgr, lambda m: _rpc(m, "load-configuration", m.rpc, rpc_load))
 
 def parse_vc_ports_xml(res):
+    with metrics.XML_PARSE_SECONDS.time(parser="vc_ports"):
+        return _parse_vc_ports_xml(res)
+
+def _parse_vc_ports_xml(res):
     ele = to_ele(res)
     ports = []
 
@@ -822,23 +1122,6 @@ def get_single_interface(nc, interface: str):
     </get-configuration>
     """)
 
-    res = nc.rpc(rpc)
+    res = _rpc(nc, "get-configuration", nc.rpc, rpc)
     xml_str = etree.tostring(res, pretty_print=True).decode()
     return xml_str
-
-def delete_interface_config(mgr, interface: str):
-    xml = f"""
-    <config>
-      <configuration>
-        <interfaces>
-          <interface operation="delete">
-            <name>{sax.escape(interface)}</name>
-          </interface>
-        </interfaces>
-      </configuration>
-    </config>
-    """
-    mgr.lock("candidate")
-    mgr.edit_config(target="candidate", config=xml)
-    mgr.commit()
-    mgr.unlock("candidate")
@@ -0,0 +1,154 @@
+# /app/backend/app/passwords.py
+"""
+bcrypt hashing / verification in a bounded process pool.
+
+bcrypt is deliberately slow (~0.25s of CPU per verify at cost 12). It
+releases the GIL, but a login burst on the request threads still ties up
+the threadpool and competes for the same cores as every other endpoint,
+without any bound on how many run at once. Here the work runs in
+PASSWORD_POOL_SIZE worker processes:
+
+  - at most PASSWORD_POOL_SIZE + PASSWORD_QUEUE_MAX jobs are accepted,
+    more → PasswordBusy (login answers 503 + Retry-After)
+  - a job not finished within PASSWORD_TIMEOUT → PasswordBusy
+
+PASSWORD_POOL_SIZE=0 runs inline (old behaviour; async callers get a
+thread so the event loop keeps running). This module stays light
+on imports because pool workers import it.
+"""
+import os
+import time
+import asyncio
+import threading
+import multiprocessing
+import concurrent.futures
+from concurrent.futures.process import BrokenProcessPool
+from passlib.context import CryptContext
+
+PASSWORD_POOL_SIZE = int(os.getenv("PASSWORD_POOL_SIZE", str(os.cpu_count() or 1)))
+PASSWORD_QUEUE_MAX = int(os.getenv("PASSWORD_QUEUE_MAX", "64"))
+PASSWORD_TIMEOUT = float(os.getenv("PASSWORD_TIMEOUT", "10"))
+
+pwd_ctx = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+_lock = threading.Lock()
+_pool = None
+_slots = None
+_size = PASSWORD_POOL_SIZE
+_queue_max = PASSWORD_QUEUE_MAX
+
+
+class PasswordBusy(Exception):
+    """Pool queue full or job timed out."""
+
+
+# ---- worker side ----
+
+def _hash(pw):
+    return pwd_ctx.hash(pw)
+
+def _verify(plain, hashed):
+    return pwd_ctx.verify(plain, hashed)
+
+
+# ---- pool ----
+
+def _metrics():
+    from . import metrics   # lazy: workers never need it
+    return metrics
+
+def configure(size=None, queue_max=None):
+    """(Re)size the pool; existing workers are shut down."""
+    global _pool, _slots, _size, _queue_max
+    with _lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+        _pool = None
+        _slots = None
+        if size is not None:
+            _size = size
+        if queue_max is not None:
+            _queue_max = queue_max
+
+def shutdown():
+    configure()
+
+def _get_pool():
+    global _pool, _slots
+    with _lock:
+        if _pool is None:
+            methods = multiprocessing.get_all_start_methods()
+            ctx = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+            _pool = concurrent.futures.ProcessPoolExecutor(max_workers=_size, mp_context=ctx)
+            _slots = threading.BoundedSemaphore(_size + _queue_max)
+        return _pool, _slots
+
+def _reset_broken(pool):
+    global _pool
+    with _lock:
+        if _pool is pool:
+            _pool = None
+
+def submit(fn, *args):
+    """Queue fn(*args) on the pool; returns a concurrent.futures.Future."""
+    op = fn.__name__.lstrip("_")
+    m = _metrics()
+    if _size <= 0:
+        fut = concurrent.futures.Future()
+        with m.PASSWORD_SECONDS.time(op=op):
+            fut.set_result(fn(*args))
+        return fut
+
+    pool, slots = _get_pool()
+    if not slots.acquire(blocking=False):
+        m.PASSWORD_REJECTED.inc(reason="queue_full")
+        raise PasswordBusy("password queue full")
+    m.PASSWORD_QUEUE.inc()
+    t0 = time.perf_counter()
+
+    def done(_):
+        slots.release()
+        m.PASSWORD_QUEUE.dec()
+        m.PASSWORD_SECONDS.observe(time.perf_counter() - t0, op=op)
+
+    try:
+        fut = pool.submit(fn, *args)
+    except BrokenProcessPool:
+        # a worker died (OOM kill…): start a fresh pool next time
+        _reset_broken(pool)
+        done(None)
+        raise PasswordBusy("password pool restarting")
+    fut.add_done_callback(done)
+    return fut
+
+def run(fn, *args):
+    fut = submit(fn, *args)
+    try:
+        return fut.result(timeout=PASSWORD_TIMEOUT)
+    except concurrent.futures.TimeoutError:
+        fut.cancel()
+        _metrics().PASSWORD_REJECTED.inc(reason="timeout")
+        raise PasswordBusy("password check timed out")
+
+async def run_async(fn, *args):
+    """Await a pool job without tying up a threadpool thread."""
+    if _size <= 0:
+        # inline bcrypt would block the event loop
+        return await asyncio.to_thread(run, fn, *args)
+    fut = submit(fn, *args)
+    try:
+        return await asyncio.wait_for(asyncio.wrap_future(fut), PASSWORD_TIMEOUT)
+    except asyncio.TimeoutError:
+        fut.cancel()
+        _metrics().PASSWORD_REJECTED.inc(reason="timeout")
+        raise PasswordBusy("password check timed out")
+
+
+def hash_password(pw: str) -> str:
+    return run(_hash, pw)
+
+def verify_password(plain: str, hashed: str) -> bool:
+    return run(_verify, plain, hashed)
+
+async def verify_password_async(plain: str, hashed: str) -> bool:
+    return await run_async(_verify, plain, hashed)
@@ -0,0 +1,113 @@
+# /app/backend/app/rollback.py
+"""
+Rollback history cache.
+
+Commit history only changes when somebody commits, so the parsed
+`show system commit` list is kept per device in rollback_history, and
+`show system rollback compare 0 <idx>` output is memoized in
+rollback_diffs keyed by (device, idx, timestamp of commit <idx>).
+
+Every diff is relative to commit 0, so a new commit at index 0
+invalidates all diffs of the device. This happens on:
+  - our own apply / rollback paths (invalidate())
+  - a history refresh that finds a different commit at index 0
+  - ROLLBACK_HISTORY_TTL expiry (catches commits made outside the app)
+"""
+import os
+import re
+from datetime import datetime, timedelta
+
+from . import netconf, metrics
+from .models import RollbackHistory, RollbackDiff
+
+ROLLBACK_HISTORY_TTL = float(os.getenv("ROLLBACK_HISTORY_TTL", "900"))
+
+_COMMIT_LINE_RE = re.compile(
+    r"^\s*(\d+)\s+(\d{4}-\d{2}-\d{2}\s+\d{2}:\d{2}:\d{2}\s+\S+)\s+by\s+(\S+)"
+)
+
+
+def parse_commit_list(txt):
+    """Parse `show system commit` text into [{index, timestamp, user, comment}]."""
+    commits = []
+    current = None
+    for line in txt.splitlines():
+        m = _COMMIT_LINE_RE.match(line)
+        if m:
+            if current:
+                commits.append(current)
+            current = {
+                "index": int(m.group(1)),
+                "timestamp": m.group(2),
+                "user": m.group(3),
+                "comment": ""
+            }
+        elif "comment:" in line and current:
+            current["comment"] = line.split("comment:", 1)[1].strip()
+    if current:
+        commits.append(current)
+    return commits
+
+
+def _head(commits):
+    return commits[0]["timestamp"] if commits else None
+
+
+def _history_row(db, device):
+    return db.query(RollbackHistory).filter(RollbackHistory.device == device).one_or_none()
+
+
+def refresh_history(db, device):
+    """Fetch commit history live; drop memoized diffs when commit 0 changed."""
+    commits = parse_commit_list(netconf.get_rollback_list(device))
+    head = _head(commits)
+
+    row = _history_row(db, device)
+    if row is None or row.head != head:
+        db.query(RollbackDiff).filter(RollbackDiff.device == device).delete()
+    db.merge(RollbackHistory(device=device, commits=commits, head=head,
+                             updated_at=datetime.utcnow()))
+    db.commit()
+    return commits
+
+
+def get_history(db, device, refresh=False):
+    row = _history_row(db, device)
+    fresh = row is not None and datetime.utcnow() - row.updated_at < timedelta(seconds=ROLLBACK_HISTORY_TTL)
+    if fresh and not refresh:
+        metrics.cache_hit("rollback_history")
+        return row.commits
+    metrics.cache_miss("rollback_history")
+    return refresh_history(db, device)
+
+
+def get_diff(db, device, idx):
+    commits = get_history(db, device)
+    entry = next((c for c in commits if c["index"] == idx), None)
+    if entry is None:
+        raise KeyError(f"rollback {idx} not in commit history of {device}")
+
+    row = (
+        db.query(RollbackDiff)
+          .filter(RollbackDiff.device == device,
+                  RollbackDiff.idx == idx,
+                  RollbackDiff.commit_ts == entry["timestamp"])
+          .one_or_none()
+    )
+    if row is not None:
+        metrics.cache_hit("rollback_diff")
+        return row.diff
+    metrics.cache_miss("rollback_diff")
+
+    diff = netconf.get_rollback_diff(device, idx) or ""
+    db.merge(RollbackDiff(device=device, idx=idx, commit_ts=entry["timestamp"],
+                          diff=diff, fetched_at=datetime.utcnow()))
+    db.commit()
+    return diff
+
+
+def invalidate(db, device):
+    """Forget history + diffs after we committed to the device."""
+    db.query(RollbackDiff).filter(RollbackDiff.device == device).delete()
+    db.query(RollbackHistory).filter(RollbackHistory.device == device).delete()
+    db.commit()
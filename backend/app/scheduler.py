@@ -0,0 +1,220 @@
+# /app/backend/app/scheduler.py
+"""
+Session scheduler in front of netconf.connect().
+
+    with scheduler.slot("sw01"):          # blocks until the device has room
+        ...open NETCONF session...
+
+    with scheduler.priority(scheduler.BACKGROUND):   # jobs
+        refresh()
+
+Limits:
+  NETCONF_MAX_PER_DEVICE  concurrent sessions per switch (Junos slows down
+                          badly with overlapping get-config). With the
+                          shared (sqlite) cache backend this holds across
+                          processes: gunicorn workers, nightly refresh and
+                          oper poller share lease slots per switch
+                          (sharedcache.acquire_slot); the in-process count
+                          is only the fast path in front of it.
+  NETCONF_MAX_TOTAL       concurrent sessions for the whole process
+
+When a slot frees up the next waiter is chosen by:
+  1. priority class   (interactive before background)
+  2. device fairness  (least recently served device first, so one busy
+                       switch can't starve the others under the global cap)
+  3. arrival order    (FIFO within a device)
+
+Nested slots for the same device in one context count like any other
+session; nesting deeper than NETCONF_MAX_PER_DEVICE is a RuntimeError
+instead of a self-deadlock. Across processes, an interactive caller that
+has to wait for a lease registers as a waiter; background callers in any
+process don't take a lease of that switch until it is served.
+"""
+import os
+import time
+import itertools
+import socket
+import threading
+import contextvars
+from contextlib import contextmanager
+
+from . import metrics, tracing, sharedcache
+from .health import DeviceUnavailable
+
+MAX_PER_DEVICE = int(os.getenv("NETCONF_MAX_PER_DEVICE", "2"))
+MAX_TOTAL = int(os.getenv("NETCONF_MAX_TOTAL", "32"))
+QUEUE_TIMEOUT = float(os.getenv("NETCONF_QUEUE_TIMEOUT", "120"))
+
+INTERACTIVE, BACKGROUND = "interactive", "background"
+_RANK = {INTERACTIVE: 0, BACKGROUND: 1}
+
+_priority = contextvars.ContextVar("netconf_priority", default=INTERACTIVE)
+_held = contextvars.ContextVar("netconf_held", default=())   # devices held by this context
+
+_cond = threading.Condition()
+_waiters = []           # pending _Waiter objects
+_inflight = {}          # device -> granted slots
+_total = 0
+_last_served = {}       # device -> grant sequence number (fairness)
+_seq = itertools.count()
+
+QUEUE_DEPTH = metrics.Gauge(
+    "netconf_queue_depth", "Callers waiting for a NETCONF session slot", ("device", "priority"))
+QUEUE_WAIT_SECONDS = metrics.Histogram(
+    "netconf_queue_wait_seconds", "Time spent waiting for a NETCONF session slot", ("priority",))
+QUEUE_TIMEOUTS = metrics.Counter(
+    "netconf_queue_timeouts_total", "Callers that gave up waiting for a slot", ("device", "priority"))
+
+
+class DeviceBusy(DeviceUnavailable):
+    """No session slot became free within NETCONF_QUEUE_TIMEOUT."""
+
+    def __init__(self, device, waited):
+        self.device = device
+        self.retry_after = 5
+        self.last_error = None
+        Exception.__init__(self, f"{device} busy: no NETCONF session slot after {waited:.0f}s")
+
+
+class _Waiter:
+    __slots__ = ("device", "priority", "seq", "granted")
+
+    def __init__(self, device, priority):
+        self.device = device
+        self.priority = priority
+        self.seq = next(_seq)
+        self.granted = False
+
+
+@contextmanager
+def priority(level):
+    """Run the block (and NETCONF calls inside it) at the given priority."""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority():
+    return _priority.get()
+
+
+def _dispatch():
+    """Grant free slots to the best eligible waiters. Caller holds _cond."""
+    global _total
+    granted = False
+    while _waiters and _total < MAX_TOTAL:
+        best = None
+        for w in _waiters:
+            if _inflight.get(w.device, 0) >= MAX_PER_DEVICE:
+                continue
+            key = (_RANK.get(w.priority, 0), _last_served.get(w.device, -1), w.seq)
+            if best is None or key < best[0]:
+                best = (key, w)
+        if best is None:
+            break
+        w = best[1]
+        _waiters.remove(w)
+        w.granted = True
+        _inflight[w.device] = _inflight.get(w.device, 0) + 1
+        _total += 1
+        _last_served[w.device] = next(_seq)
+        QUEUE_DEPTH.dec(device=w.device, priority=w.priority)
+        granted = True
+    if granted:
+        _cond.notify_all()
+
+
+def _release(device):
+    global _total
+    with _cond:
+        _inflight[device] -= 1
+        if not _inflight[device]:
+            del _inflight[device]
+        _total -= 1
+        _dispatch()
+
+
+def _wait_shared(name, device, owner, deadline, prio, t0):
+    """Take a cross-process lease slot for `device` (polling with backoff)."""
+    background = _RANK.get(prio, 0) > _RANK[INTERACTIVE]
+    if not background:
+        sharedcache.add_slot_waiter(name, owner)
+    try:
+        delay = 0.01
+        while not sharedcache.acquire_slot(name, MAX_PER_DEVICE, owner, yield_to_waiters=background):
+            if time.monotonic() >= deadline:
+                QUEUE_TIMEOUTS.inc(device=device, priority=prio)
+                raise DeviceBusy(device, time.perf_counter() - t0)
+            time.sleep(min(delay, max(0.0, deadline - time.monotonic())))
+            delay = min(delay * 2, 0.25)
+    finally:
+        if not background:
+            sharedcache.remove_slot_waiter(name, owner)
+
+
+@contextmanager
+def slot(device, timeout=None):
+    """Hold one session slot for `device` for the duration of the block."""
+    if _held.get().count(device) >= MAX_PER_DEVICE:
+        # every slot of this switch is held by this call chain: waiting can't end
+        raise RuntimeError(f"nested NETCONF sessions to {device} exceed NETCONF_MAX_PER_DEVICE")
+
+    prio = _priority.get()
+    timeout = QUEUE_TIMEOUT if timeout is None else timeout
+    t0 = time.perf_counter()
+    deadline = time.monotonic() + timeout
+    w = _Waiter(device, prio)
+    owner = f"{socket.gethostname()}:{os.getpid()}:{w.seq}"
+
+    with _cond:
+        _waiters.append(w)
+        QUEUE_DEPTH.inc(device=device, priority=prio)
+        _dispatch()
+        if not w.granted:
+            with tracing.span("netconf.queue", device=device, priority=prio):
+                while not w.granted:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        _waiters.remove(w)
+                        QUEUE_DEPTH.dec(device=device, priority=prio)
+                        QUEUE_TIMEOUTS.inc(device=device, priority=prio)
+                        raise DeviceBusy(device, time.perf_counter() - t0)
+                    _cond.wait(remaining)
+
+    shared = f"netconf:{device}" if sharedcache.shared() else None
+    try:
+        if shared and not sharedcache.acquire_slot(shared, MAX_PER_DEVICE, owner,
+                                                   yield_to_waiters=_RANK.get(prio, 0) > _RANK[INTERACTIVE]):
+            with tracing.span("netconf.queue", device=device, priority=prio, shared=True):
+                _wait_shared(shared, device, owner, deadline, prio, t0)
+    except BaseException:
+        _release(device)
+        raise
+    QUEUE_WAIT_SECONDS.observe(time.perf_counter() - t0, priority=prio)
+
+    token = _held.set(_held.get() + (device,))
+    try:
+        yield
+    finally:
+        _held.reset(token)
+        if shared:
+            sharedcache.release_slot(shared, owner)
+        _release(device)
+
+
+def stats():
+    with _cond:
+        queued = {}
+        for w in _waiters:
+            q = queued.setdefault(w.device, {INTERACTIVE: 0, BACKGROUND: 0})
+            q[w.priority] = q.get(w.priority, 0) + 1
+        return {
+            "max_per_device": MAX_PER_DEVICE,
+            "max_total": MAX_TOTAL,
+            "shared": sharedcache.shared(),
+            "inflight_total": _total,
+            "inflight": dict(_inflight),
+            "queued": queued,
+        }
@@ -30,3 +30,7 @@ class ChangeRequestOut(BaseModel):
     comment: Optional[str]
     type: Optional[str] = None   #  ← toevoegen!
 
+
+class LoginRequest(BaseModel):
+    username: str
+    password: str
@@ -0,0 +1,244 @@
+# /app/backend/app/search.py
+"""
+Fleet-wide interface search.
+
+In-process inverted index over:
+  - interface names        (ge-0/0/12, ae1)
+  - description tokens     ("LACP to BRB2-CORE-SW01" -> lacp, to, brb2-core-sw01, brb2, core, sw01)
+  - VLAN membership        (access / native / trunk members)
+  - bundle membership      (ge-0/0/1 is in ae1)
+
+The index is updated by store_interfaces_cache(). Because other processes
+(nightly job, other gunicorn workers) also write InterfaceCache, sync() compares
+the cheap (device, updated_at) columns against what was indexed and only
+re-reads rows that changed. The oper poller leaves updated_at alone, so its
+interface_oper.patched_at counts too: the indexed version is the newer of both.
+"""
+import re
+import bisect
+import threading
+
+from .models import InterfaceCache, InterfaceOperStamp
+
+FIELD_WEIGHTS = {
+    "name": 3.0,
+    "bundle": 2.5,
+    "vlan": 2.0,
+    "description": 1.0,
+}
+# query prefixes: "vlan:v201", "bundle:ae1", "desc:core", "name:ge-0/0"
+FIELD_ALIASES = {"name": "name", "if": "name", "bundle": "bundle", "ae": "bundle",
+                 "vlan": "vlan", "desc": "description", "description": "description"}
+PREFIX_FACTOR = 0.5   # partial (prefix) token matches score half
+
+_LOCK = threading.Lock()
+_postings = {}        # token -> {(device, ifname): set(fields)}
+_docs = {}            # (device, ifname) -> summary dict
+_device_keys = {}     # device -> {key: [tokens]}
+_versions = {}        # device -> version() that is indexed
+_sorted_tokens = []   # for prefix lookups (rebuilt lazily)
+_tokens_dirty = False
+
+_split_re = re.compile(r"[\s,;:()\[\]\"']+")
+_part_re = re.compile(r"[-_./]+")
+
+
+def _words(text):
+    out = []
+    for w in _split_re.split((text or "").lower()):
+        if not w:
+            continue
+        out.append(w)
+        parts = [p for p in _part_re.split(w) if p]
+        if len(parts) > 1:
+            out.extend(parts)
+    return out
+
+
+def _doc_tokens(p):
+    """Return [(token, field)] for one interface dict."""
+    toks = []
+    name = (p.get("name") or "").lower()
+    if name:
+        toks.append((name, "name"))
+    for w in _words(p.get("description")):
+        toks.append((w, "description"))
+    if p.get("bundle"):
+        toks.append((str(p["bundle"]).lower(), "bundle"))
+    vlans = [p.get("access_vlan"), p.get("native_vlan"), *(p.get("trunk_vlans") or [])]
+    for v in vlans:
+        if v is not None and v != "":
+            toks.append((str(v).lower(), "vlan"))
+    return toks
+
+
+def _summary(device, p):
+    vlans = [p.get("access_vlan"), *(p.get("trunk_vlans") or [])]
+    return {
+        "device": device,
+        "name": p.get("name"),
+        "description": p.get("description"),
+        "mode": p.get("mode"),
+        "bundle": p.get("bundle"),
+        "vlans": [v for v in vlans if v],
+        "oper_up": p.get("oper_up"),
+        "vc_port": p.get("vc_port", False),
+    }
+
+
+def _remove_device_locked(device):
+    global _tokens_dirty
+    for key, toks in _device_keys.pop(device, {}).items():
+        _docs.pop(key, None)
+        for t in toks:
+            post = _postings.get(t)
+            if post is None:
+                continue
+            post.pop(key, None)
+            if not post:
+                del _postings[t]
+                _tokens_dirty = True
+
+
+def update_device(device, interfaces, version=None):
+    """(Re)index all interfaces of one device."""
+    global _tokens_dirty
+    with _LOCK:
+        _remove_device_locked(device)
+        keys = {}
+        for p in interfaces or []:
+            if not p.get("name"):
+                continue
+            key = (device, p["name"])
+            _docs[key] = _summary(device, p)
+            toks = []
+            for tok, field in _doc_tokens(p):
+                post = _postings.get(tok)
+                if post is None:
+                    post = _postings[tok] = {}
+                    _tokens_dirty = True
+                post.setdefault(key, set()).add(field)
+                toks.append(tok)
+            keys[key] = toks
+        _device_keys[device] = keys
+        _versions[device] = version
+
+
+def remove_device(device):
+    with _LOCK:
+        _remove_device_locked(device)
+        _versions.pop(device, None)
+
+
+def version(updated_at, patched_at=None):
+    """Index version of a row: config fetch or oper patch, whichever is newer."""
+    return max(updated_at, patched_at) if patched_at and updated_at else updated_at
+
+
+def sync(db):
+    """Re-index devices whose InterfaceCache row changed since last index."""
+    current = {
+        d: version(ts, pt) for d, ts, pt in
+        db.query(InterfaceCache.device, InterfaceCache.updated_at, InterfaceOperStamp.patched_at)
+          .outerjoin(InterfaceOperStamp, InterfaceOperStamp.device == InterfaceCache.device)
+    }
+    with _LOCK:
+        stale = [d for d, ts in current.items() if _versions.get(d, False) != ts]
+        gone = [d for d in _versions if d not in current]
+    for d in gone:
+        remove_device(d)
+    if not stale:
+        return 0
+    for row in db.query(InterfaceCache).filter(InterfaceCache.device.in_(stale)):
+        update_device(row.device, row.data or [], current[row.device])
+    return len(stale)
+
+
+def _lookup_locked(token):
+    """Yield (postings, factor) for exact + prefix matches of one query token."""
+    global _sorted_tokens, _tokens_dirty
+    exact = _postings.get(token)
+    if exact:
+        yield exact, 1.0
+    if _tokens_dirty:
+        _sorted_tokens = sorted(_postings)
+        _tokens_dirty = False
+    i = bisect.bisect_right(_sorted_tokens, token)
+    while i < len(_sorted_tokens) and _sorted_tokens[i].startswith(token):
+        yield _postings[_sorted_tokens[i]], PREFIX_FACTOR
+        i += 1
+
+
+def search(query, limit=50, device=None):
+    """
+    AND-search over all query terms; each term may be prefixed with a field
+    (vlan:, bundle:, desc:, name:). Results are ranked by summed field weight.
+    """
+    terms = []
+    for raw in (query or "").lower().split():
+        field = None
+        if ":" in raw:
+            f, rest = raw.split(":", 1)
+            if f in FIELD_ALIASES and rest:
+                field, raw = FIELD_ALIASES[f], rest
+        terms.append((raw, field))
+    if not terms:
+        return []
+
+    with _LOCK:
+        # expand every term first, then intersect starting with the rarest
+        expanded = []
+        for tok, field in terms:
+            exp = list(_lookup_locked(tok))
+            size = sum(len(post) for post, _ in exp)
+            if not size:
+                return []
+            expanded.append((size, field, exp))
+        expanded.sort(key=lambda e: e[0])
+
+        scores = None
+        matched = {}
+
+        def add(term_scores, key, fields, factor, field):
+            if device and key[0] != device:
+                return
+            use = fields if field is None else fields & {field}
+            if not use:
+                return
+            s = factor * sum(FIELD_WEIGHTS[f] for f in use)
+            if s > term_scores.get(key, 0):
+                term_scores[key] = s
+            matched.setdefault(key, set()).update(use)
+
+        for size, field, exp in expanded:
+            term_scores = {}
+            if scores is not None and len(scores) * len(exp) < size:
+                # few candidates left: probe them instead of scanning postings
+                for key in scores:
+                    for post, factor in exp:
+                        fields = post.get(key)
+                        if fields:
+                            add(term_scores, key, fields, factor, field)
+            else:
+                for post, factor in exp:
+                    for key, fields in post.items():
+                        if scores is None or key in scores:
+                            add(term_scores, key, fields, factor, field)
+
+            if scores is None:
+                scores = term_scores
+            else:
+                scores = {k: v + term_scores[k] for k, v in scores.items() if k in term_scores}
+            if not scores:
+                return []
+
+        ranked = sorted(scores.items(), key=lambda kv: (-kv[1], kv[0]))[:limit]
+        return [
+            {**_docs[key], "score": round(score, 3), "matched": sorted(matched[key])}
+            for key, score in ranked
+        ]
+
+
+def stats():
+    with _LOCK:
+        return {"devices": len(_device_keys), "interfaces": len(_docs), "tokens": len(_postings)}
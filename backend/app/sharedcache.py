@@ -0,0 +1,452 @@
+# /app/backend/app/sharedcache.py
+"""
+TTL cache + named locks, shareable between gunicorn workers.
+
+    sharedcache.get("live", "sw01|ge-0/0/1")
+    sharedcache.set("live", "sw01|ge-0/0/1", data, ttl=3)
+    sharedcache.get_or_compute("ae", "sw01|ae0", 15, fn, lock_name="device:sw01")
+    with sharedcache.lock("device:sw01"):
+        ...
+
+CACHE_BACKEND selects the implementation:
+  memory  dicts + threading locks, per process (old behaviour, default)
+  sqlite  one SQLite file (WAL) on the local host: every worker sees the
+          same entries and a lock held by one worker blocks the others.
+          Locks are leases (SHARED_LOCK_LEASE seconds), renewed by a
+          background thread while held, so a killed worker can't keep a
+          device locked forever and a slow holder doesn't lose its lock.
+
+Counting semaphores (acquire_slot/release_slot) cap concurrent holders of a
+name across processes, e.g. NETCONF sessions per switch (app/scheduler.py).
+Slots are leases too, renewed by a background thread while held. A
+priority caller that has to wait registers itself (add_slot_waiter); callers
+that pass yield_to_waiters=True don't take a slot while one is registered.
+
+The sqlite backend also carries an event log (append_event/events_since)
+that app/events.py tails, so SSE subscribers in one worker see events
+published by the other workers and by the job containers. With the memory
+backend there is nothing to share and the log is a no-op.
+
+Values must be picklable. get_or_compute is single-flight: concurrent
+misses for the same key (in any worker) run fn once, the rest wait for the
+lock and then read the fresh entry.
+"""
+import os
+import time
+import pickle
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from . import metrics
+
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory")
+SHARED_CACHE_PATH = os.getenv(
+    "SHARED_CACHE_PATH",
+    os.path.join(os.path.dirname(os.getenv("APP_DB_PATH", "/app/backend/data/app.db")), "shared-cache.db"),
+)
+SHARED_LOCK_LEASE = float(os.getenv("SHARED_LOCK_LEASE", "120"))
+SHARED_LOCK_TIMEOUT = float(os.getenv("SHARED_LOCK_TIMEOUT", "180"))
+SHARED_EVENTS_KEEP = float(os.getenv("SHARED_EVENTS_KEEP", "600"))   # seconds of event log
+
+LOCK_WAIT_SECONDS = metrics.Histogram(
+    "shared_lock_wait_seconds", "Time spent waiting for a shared cache lock", ("backend",))
+
+
+class LockTimeout(Exception):
+    """Named lock not acquired within the timeout."""
+
+
+class MemoryBackend:
+    """Per-process dicts (what netconf.py used before)."""
+
+    name = "memory"
+    shared = False
+
+    def __init__(self):
+        self._mu = threading.Lock()
+        self._data = {}     # (ns, key) -> (expires, value)
+        self._locks = {}    # name -> threading.Lock
+
+    def get(self, ns, key):
+        entry = self._data.get((ns, key))
+        if entry is None:
+            return None
+        if entry[0] <= time.time():
+            self._data.pop((ns, key), None)
+            return None
+        return entry[1]
+
+    def set(self, ns, key, value, ttl):
+        self._data[(ns, key)] = (time.time() + ttl, value)
+
+    def delete(self, ns, prefix=""):
+        with self._mu:
+            for k in [k for k in self._data if k[0] == ns and k[1].startswith(prefix)]:
+                self._data.pop(k, None)
+
+    def clear(self):
+        with self._mu:
+            self._data.clear()
+
+    @contextmanager
+    def lock(self, name, timeout):
+        with self._mu:
+            lk = self._locks.setdefault(name, threading.Lock())
+        if not lk.acquire(timeout=timeout):
+            raise LockTimeout(name)
+        try:
+            yield
+        finally:
+            lk.release()
+
+    # nothing to share between processes: the caller's own counters are the limit
+    def acquire_slot(self, name, limit, owner, yield_to_waiters=False):
+        return True
+
+    def release_slot(self, name, owner):
+        pass
+
+    def renew_slots(self, owners):
+        pass
+
+    def renew_locks(self, owners):
+        pass
+
+    def add_slot_waiter(self, name, owner):
+        pass
+
+    def remove_slot_waiter(self, name, owner):
+        pass
+
+    def renew_waiters(self, owners):
+        pass
+
+    def append_event(self, origin, payload):
+        return None
+
+    def events_since(self, after_id, limit=500):
+        return []
+
+    def last_event_id(self):
+        return 0
+
+
+class SqliteBackend:
+    """Cache table + lease locks in a SQLite file shared by all workers."""
+
+    name = "sqlite"
+    shared = True
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._mu = threading.Lock()
+        self._thread_locks = {}   # name -> threading.Lock (same-process waiters)
+        self._owner = f"{os.getpid()}"
+        self._last_purge = 0.0
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""CREATE TABLE IF NOT EXISTS cache (
+                            ns TEXT, key TEXT, value BLOB, expires REAL,
+                            PRIMARY KEY (ns, key))""")
+        conn.execute("""CREATE TABLE IF NOT EXISTS locks (
+                            name TEXT PRIMARY KEY, owner TEXT, expires REAL)""")
+        conn.execute("""CREATE TABLE IF NOT EXISTS slots (
+                            name TEXT, owner TEXT, expires REAL,
+                            PRIMARY KEY (name, owner))""")
+        conn.execute("""CREATE TABLE IF NOT EXISTS slot_waiters (
+                            name TEXT, owner TEXT, expires REAL,
+                            PRIMARY KEY (name, owner))""")
+        conn.execute("""CREATE TABLE IF NOT EXISTS events (
+                            id INTEGER PRIMARY KEY AUTOINCREMENT,
+                            origin TEXT, payload TEXT, ts REAL)""")
+        self._last_event_purge = 0.0
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or getattr(self._local, "pid", None) != os.getpid():
+            # new thread, or a fork after import: never share a connection
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None,
+                                   check_same_thread=False)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, ns, key):
+        row = self._conn().execute(
+            "SELECT value FROM cache WHERE ns=? AND key=? AND expires>?",
+            (ns, key, time.time())).fetchone()
+        return pickle.loads(row[0]) if row else None
+
+    def set(self, ns, key, value, ttl):
+        now = time.time()
+        conn = self._conn()
+        conn.execute("INSERT OR REPLACE INTO cache (ns, key, value, expires) VALUES (?, ?, ?, ?)",
+                     (ns, key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), now + ttl))
+        if now - self._last_purge > 60:
+            self._last_purge = now
+            conn.execute("DELETE FROM cache WHERE expires<=?", (now,))
+
+    def delete(self, ns, prefix=""):
+        # escape LIKE wildcards; device names may contain "_"
+        esc = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+        self._conn().execute("DELETE FROM cache WHERE ns=? AND key LIKE ? ESCAPE '\\'",
+                             (ns, esc + "%"))
+
+    def clear(self):
+        self._conn().execute("DELETE FROM cache")
+
+    def _try_acquire(self, name, owner):
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT expires FROM locks WHERE name=?", (name,)).fetchone()
+            if row is not None and row[0] > now:
+                return False
+            conn.execute("INSERT OR REPLACE INTO locks (name, owner, expires) VALUES (?, ?, ?)",
+                         (name, owner, now + SHARED_LOCK_LEASE))
+            return True
+        finally:
+            conn.execute("COMMIT")
+
+    @contextmanager
+    def lock(self, name, timeout):
+        # threads of this process queue on a local lock first, so only one
+        # of them polls the database
+        with self._mu:
+            lk = self._thread_locks.setdefault(name, threading.Lock())
+        deadline = time.monotonic() + timeout
+        if not lk.acquire(timeout=timeout):
+            raise LockTimeout(name)
+        try:
+            owner = f"{self._owner}:{threading.get_ident()}"
+            delay = 0.005
+            while not self._try_acquire(name, owner):
+                if time.monotonic() >= deadline:
+                    raise LockTimeout(name)
+                time.sleep(delay)
+                delay = min(delay * 2, 0.1)
+            _hold("locks", name, owner)
+            try:
+                yield
+            finally:
+                _drop("locks", name, owner)
+                self._conn().execute("DELETE FROM locks WHERE name=? AND owner=?", (name, owner))
+        finally:
+            lk.release()
+
+
+    def acquire_slot(self, name, limit, owner, yield_to_waiters=False):
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("DELETE FROM slots WHERE name=? AND expires<=?", (name, now))
+            held = conn.execute("SELECT COUNT(*) FROM slots WHERE name=?", (name,)).fetchone()[0]
+            if held >= limit:
+                return False
+            if yield_to_waiters and conn.execute(
+                    "SELECT 1 FROM slot_waiters WHERE name=? AND expires>? LIMIT 1",
+                    (name, now)).fetchone():
+                return False
+            conn.execute("INSERT OR REPLACE INTO slots (name, owner, expires) VALUES (?, ?, ?)",
+                         (name, owner, now + SHARED_LOCK_LEASE))
+            return True
+        finally:
+            conn.execute("COMMIT")
+
+    def release_slot(self, name, owner):
+        self._conn().execute("DELETE FROM slots WHERE name=? AND owner=?", (name, owner))
+
+    def renew_slots(self, owners):
+        expires = time.time() + SHARED_LOCK_LEASE
+        self._conn().executemany("UPDATE slots SET expires=? WHERE name=? AND owner=?",
+                                 [(expires, name, owner) for name, owner in owners])
+
+    def renew_locks(self, owners):
+        expires = time.time() + SHARED_LOCK_LEASE
+        self._conn().executemany("UPDATE locks SET expires=? WHERE name=? AND owner=?",
+                                 [(expires, name, owner) for name, owner in owners])
+
+    def add_slot_waiter(self, name, owner):
+        self._conn().execute("INSERT OR REPLACE INTO slot_waiters (name, owner, expires) VALUES (?, ?, ?)",
+                             (name, owner, time.time() + SHARED_LOCK_LEASE))
+
+    def remove_slot_waiter(self, name, owner):
+        self._conn().execute("DELETE FROM slot_waiters WHERE name=? AND owner=?", (name, owner))
+
+    def renew_waiters(self, owners):
+        expires = time.time() + SHARED_LOCK_LEASE
+        self._conn().executemany("UPDATE slot_waiters SET expires=? WHERE name=? AND owner=?",
+                                 [(expires, name, owner) for name, owner in owners])
+
+    def append_event(self, origin, payload):
+        now = time.time()
+        conn = self._conn()
+        cur = conn.execute("INSERT INTO events (origin, payload, ts) VALUES (?, ?, ?)",
+                           (origin, payload, now))
+        if now - self._last_event_purge > 60:
+            self._last_event_purge = now
+            conn.execute("DELETE FROM events WHERE ts<?", (now - SHARED_EVENTS_KEEP,))
+        return cur.lastrowid
+
+    def events_since(self, after_id, limit=500):
+        return self._conn().execute(
+            "SELECT id, origin, payload FROM events WHERE id>? ORDER BY id LIMIT ?",
+            (after_id, limit)).fetchall()
+
+    def last_event_id(self):
+        row = self._conn().execute("SELECT MAX(id) FROM events").fetchone()
+        return row[0] or 0
+
+
+def _make_backend(kind):
+    if kind == "sqlite":
+        return SqliteBackend(SHARED_CACHE_PATH)
+    if kind == "memory":
+        return MemoryBackend()
+    raise ValueError(f"unknown CACHE_BACKEND {kind!r} (memory|sqlite)")
+
+
+_backend = _make_backend(CACHE_BACKEND)
+
+
+def configure(kind, path=None):
+    """Switch backend at runtime (benchmarks / scripts)."""
+    global _backend, SHARED_CACHE_PATH
+    if path:
+        SHARED_CACHE_PATH = path
+    _backend = _make_backend(kind)
+    return _backend
+
+
+def backend():
+    return _backend
+
+
+def get(ns, key):
+    return _backend.get(ns, key)
+
+
+def set(ns, key, value, ttl):
+    _backend.set(ns, key, value, ttl)
+
+
+def delete(ns, prefix=""):
+    """Drop all entries of `ns` whose key starts with `prefix`."""
+    _backend.delete(ns, prefix)
+
+
+def clear():
+    _backend.clear()
+
+
+_leases_held = {}             # ("slots" | "locks" | "waiters", name, owner) -> True, renewed while held
+_leases_mu = threading.Lock()
+_renewer = {"pid": None}
+
+
+def _renew_loop():
+    while True:
+        time.sleep(SHARED_LOCK_LEASE / 3)
+        with _leases_mu:
+            held = list(_leases_held)
+        for kind in ("slots", "locks", "waiters"):
+            owners = [(name, owner) for k, name, owner in held if k == kind]
+            if not owners:
+                continue
+            try:
+                getattr(_backend, f"renew_{kind}")(owners)
+            except Exception as e:
+                print(f"⚠️ {kind} lease renewal failed: {e}")
+
+
+def _hold(kind, name, owner):
+    with _leases_mu:
+        _leases_held[(kind, name, owner)] = True
+        if _renewer["pid"] != os.getpid():
+            _renewer["pid"] = os.getpid()
+            threading.Thread(target=_renew_loop, name="lease-renew", daemon=True).start()
+
+
+def _drop(kind, name, owner):
+    with _leases_mu:
+        _leases_held.pop((kind, name, owner), None)
+
+
+def acquire_slot(name, limit, owner, yield_to_waiters=False):
+    """
+    Take one of `limit` slots of `name` (non-blocking); True when granted.
+    yield_to_waiters: also False while a registered waiter (add_slot_waiter)
+    is queued for `name`, so low-priority callers let it go first.
+    """
+    if not _backend.acquire_slot(name, limit, owner, yield_to_waiters):
+        return False
+    _hold("slots", name, owner)
+    return True
+
+
+def add_slot_waiter(name, owner):
+    """Register `owner` as waiting for a slot of `name` until remove_slot_waiter."""
+    _backend.add_slot_waiter(name, owner)
+    _hold("waiters", name, owner)
+
+
+def remove_slot_waiter(name, owner):
+    _drop("waiters", name, owner)
+    _backend.remove_slot_waiter(name, owner)
+
+
+def release_slot(name, owner):
+    _drop("slots", name, owner)
+    _backend.release_slot(name, owner)
+
+
+def shared():
+    """True when other processes see the same cache / locks / event log."""
+    return _backend.shared
+
+
+def append_event(origin, payload):
+    """Add a (JSON) event to the shared log; returns its id, None without a shared backend."""
+    return _backend.append_event(origin, payload)
+
+
+def events_since(after_id, limit=500):
+    """[(id, origin, payload), ...] appended after `after_id`."""
+    return _backend.events_since(after_id, limit)
+
+
+def last_event_id():
+    return _backend.last_event_id()
+
+
+@contextmanager
+def lock(name, timeout=None):
+    t0 = time.perf_counter()
+    with _backend.lock(name, SHARED_LOCK_TIMEOUT if timeout is None else timeout):
+        LOCK_WAIT_SECONDS.observe(time.perf_counter() - t0, backend=_backend.name)
+        yield
+
+
+def get_or_compute(ns, key, ttl, fn, lock_name=None):
+    """
+    Cached value of `fn()`; on a miss only one caller (across workers with
+    the sqlite backend) runs fn, holding `lock_name` (default ns|key).
+    """
+    value = _backend.get(ns, key)
+    if value is not None:
+        metrics.cache_hit(ns)
+        return value
+    with lock(lock_name or f"{ns}|{key}"):
+        value = _backend.get(ns, key)
+        if value is not None:
+            metrics.cache_hit(ns)
+            return value
+        metrics.cache_miss(ns)
+        value = fn()
+        _backend.set(ns, key, value, ttl)
+        return value
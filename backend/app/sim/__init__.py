@@ -0,0 +1 @@
+# makes this a package
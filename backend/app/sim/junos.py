@@ -0,0 +1,444 @@
+# /app/backend/app/sim/junos.py
+"""
+Simulated Junos EX / Virtual Chassis device for load testing.
+
+Holds a running + candidate <configuration> tree, a commit history (for
+`show system commit` / rollback) and operational state, and renders the
+same replies app/netconf.py parses:
+
+  - get-config (subtree filtered) for <interfaces> / <vlans>
+  - <get-interface-information><terse/> and <statistics/> (counters grow over time)
+  - <command>show virtual-chassis vc-port</command>
+  - <command>show system commit</command>
+  - <command>show system rollback compare 0 N</command>
+  - edit-config (merge / replace / delete), commit, load-configuration rollback
+
+Config is either synthetic (build_config) or loaded from a recorded
+`<configuration>` dump.
+"""
+import copy
+import time
+import random
+import difflib
+import threading
+from datetime import datetime, timedelta
+from lxml import etree
+
+NC_NS = "urn:ietf:params:xml:ns:netconf:base:1.0"
+LIST_LEAVES = {"members"}      # leaf-lists: merge appends instead of replacing
+HISTORY_MAX = 50
+
+
+class RPCError(Exception):
+    pass
+
+
+def local(el):
+    return etree.QName(el).localname
+
+
+def _sub(parent, tag, text=None):
+    el = etree.SubElement(parent, tag)
+    if text is not None:
+        el.text = str(text)
+    return el
+
+
+# --------------------------
+# synthetic config
+# --------------------------
+
+def build_config(members=2, ports=48, vlans=40, seed=0):
+    """
+    Build a plausible EX access-switch <configuration>:
+      - ge-M/0/P access / trunk ports (~80% configured)
+      - last two ge ports of every member bundled into ae1
+      - xe-M/2/0..1 are VC ports (not configured), xe-M/2/2 uplink trunk
+    """
+    rnd = random.Random(seed)
+    vlan_names = [f"v{100 + i}" for i in range(vlans)]
+
+    cfg = etree.Element("configuration")
+    ifs = _sub(cfg, "interfaces")
+
+    def esw(parent, mode, members_, native=None):
+        unit = _sub(parent, "unit")
+        _sub(unit, "name", 0)
+        fam = _sub(_sub(unit, "family"), "ethernet-switching")
+        _sub(fam, "interface-mode", mode)
+        vl = _sub(fam, "vlan")
+        for v in members_:
+            _sub(vl, "members", v)
+        if native:
+            _sub(fam, "native-vlan-id", native)
+
+    for m in range(members):
+        for p in range(ports):
+            name = f"ge-{m}/0/{p}"
+            if p >= ports - 2:
+                ifl = _sub(ifs, "interface")
+                _sub(ifl, "name", name)
+                _sub(ifl, "description", f"LACP member ae1 ({m}/{p})")
+                eo = _sub(ifl, "ether-options")
+                _sub(_sub(eo, "ieee-802.3ad"), "bundle", "ae1")
+                continue
+            r = rnd.random()
+            if r < 0.2:
+                continue   # unconfigured
+            ifl = _sub(ifs, "interface")
+            _sub(ifl, "name", name)
+            if r < 0.3:
+                _sub(ifl, "description", f"AP room {rnd.randint(1, 400)}")
+                esw(ifl, "trunk", rnd.sample(vlan_names, 4), native=rnd.choice(vlan_names)[1:])
+            else:
+                _sub(ifl, "description", f"user desk {m}.{p}")
+                esw(ifl, "access", [rnd.choice(vlan_names)])
+
+        up = _sub(ifs, "interface")
+        _sub(up, "name", f"xe-{m}/2/2")
+        _sub(up, "description", "uplink core")
+        esw(up, "trunk", vlan_names[:8])
+
+    ae = _sub(ifs, "interface")
+    _sub(ae, "name", "ae1")
+    _sub(ae, "description", "LACP to CORE-SW01")
+    agg = _sub(ae, "aggregated-ether-options")
+    _sub(_sub(agg, "lacp"), "active")
+    esw(ae, "trunk", vlan_names)
+
+    vl = _sub(cfg, "vlans")
+    for v in vlan_names:
+        vlan = _sub(vl, "vlan")
+        _sub(vlan, "name", v)
+        _sub(vlan, "vlan-id", v[1:])
+
+    return cfg
+
+
+def _strip_ns(el):
+    for e in el.iter():
+        if isinstance(e.tag, str) and e.tag.startswith("{"):
+            e.tag = local(e)
+    etree.cleanup_namespaces(el)
+    return el
+
+
+def load_recorded_config(path):
+    """Load a recorded get-config reply or <configuration> dump."""
+    root = etree.parse(path).getroot()
+    _strip_ns(root)
+    cfg = root if root.tag == "configuration" else root.find(".//configuration")
+    if cfg is None:
+        raise ValueError(f"no <configuration> in {path}")
+    return copy.deepcopy(cfg)
+
+
+# --------------------------
+# subtree filtering / editing
+# --------------------------
+
+def subtree_filter(data, flt):
+    """
+    RFC 6241 subtree filtering (containment, selection and content-match
+    nodes). Returns a filtered copy of `data` or None when it does not match.
+    """
+    children = [c for c in flt if isinstance(c.tag, str)]
+    if not children:
+        return copy.deepcopy(data)
+
+    content = [c for c in children if len(c) == 0 and (c.text or "").strip()]
+    for c in content:
+        match = [d for d in data if local(d) == local(c) and (d.text or "").strip() == c.text.strip()]
+        if not match:
+            return None
+
+    selection = [c for c in children if c not in content]
+    if not selection:
+        return copy.deepcopy(data)
+
+    out = etree.Element(local(data))
+    for c in content:
+        _sub(out, local(c), c.text.strip())
+    for sel in selection:
+        for d in data:
+            if isinstance(d.tag, str) and local(d) == local(sel):
+                r = subtree_filter(d, sel)
+                if r is not None:
+                    out.append(r)
+    return out
+
+
+def _find_configuration(el):
+    if local(el) == "configuration":
+        return el
+    found = el.xpath('.//*[local-name()="configuration"]')
+    return found[0] if found else None
+
+
+def _operation(el):
+    return el.get(f"{{{NC_NS}}}operation") or el.get("operation")
+
+
+def _clean(el):
+    el = copy.deepcopy(el)
+    for e in el.iter():
+        for a in (f"{{{NC_NS}}}operation", "operation"):
+            if a in e.attrib:
+                del e.attrib[a]
+    return _strip_ns(el)
+
+
+def _key(el):
+    n = el.find("name")
+    return (local(el), n.text.strip() if n is not None and n.text else None)
+
+
+def _find_same(parent, el):
+    k = _key(el)
+    for c in parent:
+        if isinstance(c.tag, str) and _key(c) == k:
+            return c
+    return None
+
+
+def apply_edit(target, new, default_op="merge"):
+    """Apply one edit-config element `new` below `target` (same level)."""
+    for child in new:
+        if not isinstance(child.tag, str):
+            continue
+        op = _operation(child) or default_op
+        existing = _find_same(target, child)
+
+        if op in ("delete", "remove"):
+            if existing is None:
+                if op == "delete":
+                    name = _key(child)[1] or local(child)
+                    raise RPCError(f"statement not found: {name}")
+                continue
+            target.remove(existing)
+        elif op == "replace":
+            if existing is not None:
+                idx = list(target).index(existing)
+                target.remove(existing)
+                target.insert(idx, _clean(child))
+            else:
+                target.append(_clean(child))
+        elif op == "create" and existing is not None:
+            raise RPCError(f"statement exists: {_key(child)[1] or local(child)}")
+        else:   # merge / create / none
+            is_leaf = len(child) == 0
+            if is_leaf and local(child) in LIST_LEAVES:
+                if not any(local(c) == local(child) and c.text == child.text for c in target):
+                    target.append(_clean(child))
+            elif is_leaf:
+                if existing is not None:
+                    existing.text = child.text
+                else:
+                    target.append(_clean(child))
+            elif existing is None:
+                if op == "none":
+                    continue
+                target.append(_clean(child))
+            else:
+                apply_edit(existing, child, default_op if op == "none" else "merge")
+
+
+def _set_lines(cfg, prefix=""):
+    """Flatten a config tree into 'set'-style lines (for rollback compare)."""
+    lines = []
+    for c in cfg:
+        if not isinstance(c.tag, str) or local(c) == "name":
+            continue
+        name = c.find("name")
+        label = local(c) + (f" {name.text}" if name is not None and name.text else "")
+        if len(c) == 0 or (name is not None and len(c) == 1):
+            lines.append(f"{prefix}{label}" + (f" {c.text.strip()}" if (c.text or "").strip() else ""))
+        else:
+            lines.extend(_set_lines(c, f"{prefix}{label} "))
+    return lines
+
+
+# --------------------------
+# device
+# --------------------------
+
+class SimDevice:
+    def __init__(self, name, members=2, ports=48, vlans=40, seed=None, config=None,
+                 vc_reply=None):
+        self.name = name
+        self.lock = threading.Lock()
+        self.members = members
+        self.running = config if config is not None else build_config(
+            members, ports, vlans, seed=seed if seed is not None else name)
+        self.candidate = None
+        self.vc_reply = vc_reply     # recorded vc-port reply (bytes) if any
+        self.rnd = random.Random(f"{name}-oper")
+
+        start = datetime(2024, 1, 1) + timedelta(minutes=self.rnd.randint(0, 500000))
+        self.history = [{
+            "ts": start, "user": "automation", "client": "netconf",
+            "comment": None, "config": copy.deepcopy(self.running),
+        }]
+        self.oper = {}
+        for ifname in self.interface_names():
+            self.oper[ifname] = {"admin": "up", "oper": "up" if self.rnd.random() < 0.6 else "down"}
+        self.vc_ports = [(m, 2, p, "Up") for m in range(members) for p in (0, 1)] if members > 1 else []
+        # traffic counters: per port a fixed rate while oper up
+        self.counters = {}      # ifname -> [in_bytes, out_bytes, in_pkts, out_pkts, in_err, out_err]
+        self.rates = {}         # ifname -> bytes/s (in); out is a fraction of it
+        self.counters_at = time.time()
+
+    # ---- state helpers ----
+
+    def interface_names(self):
+        return [n.text for n in self.running.findall("interfaces/interface/name")]
+
+    def flap(self, ratio=0.05):
+        """Randomly toggle oper state of a fraction of ports."""
+        with self.lock:
+            for ifname, st in self.oper.items():
+                if self.rnd.random() < ratio:
+                    st["oper"] = "down" if st["oper"] == "up" else "up"
+
+    def _advance_counters(self):
+        """Grow counters of up ports by their rate since the last call. Caller holds lock."""
+        now = time.time()
+        dt = now - self.counters_at
+        self.counters_at = now
+        for n, st in self.oper.items():
+            c = self.counters.setdefault(n, [0, 0, 0, 0, 0, 0])
+            if st["oper"] != "up":
+                continue
+            rate = self.rates.setdefault(n, self.rnd.choice((1e4, 1e5, 1e6, 1e7)))
+            c[0] += int(rate * dt)
+            c[1] += int(rate * 0.4 * dt)
+            c[2] += int(rate * dt / 800)
+            c[3] += int(rate * 0.4 * dt / 800)
+            if self.rnd.random() < 0.01:
+                c[4] += 1
+
+    def _candidate(self):
+        if self.candidate is None:
+            self.candidate = copy.deepcopy(self.running)
+        return self.candidate
+
+    # ---- config ops ----
+
+    def get_config(self, flt=None):
+        with self.lock:
+            fcfg = _find_configuration(flt) if flt is not None else None
+            if fcfg is None:
+                return copy.deepcopy(self.running)
+            return subtree_filter(self.running, fcfg)
+
+    def edit_config(self, config_el, default_op="merge"):
+        cfg = _find_configuration(config_el)
+        if cfg is None:
+            raise RPCError("edit-config without <configuration>")
+        with self.lock:
+            apply_edit(self._candidate(), cfg, default_op)
+
+    def discard(self):
+        with self.lock:
+            self.candidate = None
+
+    def commit(self, user="automation", comment=None):
+        with self.lock:
+            if self.candidate is None:
+                return
+            self.running = self.candidate
+            self.candidate = None
+            for ifname in self.interface_names():
+                self.oper.setdefault(ifname, {"admin": "up", "oper": "down"})
+            self.history.insert(0, {
+                "ts": datetime.utcnow().replace(microsecond=0), "user": user,
+                "client": "netconf", "comment": comment,
+                "config": copy.deepcopy(self.running),
+            })
+            del self.history[HISTORY_MAX:]
+
+    def load_rollback(self, idx):
+        with self.lock:
+            if idx < 0 or idx >= len(self.history):
+                raise RPCError(f"rollback {idx} does not exist")
+            self.candidate = copy.deepcopy(self.history[idx]["config"])
+
+    # ---- replies ----
+
+    def terse_xml(self, ifname=None):
+        root = etree.Element("interface-information")
+        with self.lock:
+            names = [ifname] if ifname else sorted(self.oper)
+            for n in names:
+                st = self.oper.get(n)
+                if st is None:
+                    continue
+                phy = _sub(root, "physical-interface")
+                _sub(phy, "name", n)
+                _sub(phy, "admin-status", st["admin"])
+                _sub(phy, "oper-status", st["oper"])
+        return root
+
+    def statistics_xml(self, ifname=None):
+        """`show interfaces statistics` (traffic + error counters)."""
+        root = etree.Element("interface-information")
+        with self.lock:
+            self._advance_counters()
+            if ifname and ifname not in self.oper:
+                raise RPCError(f"device {ifname} not found")   # like Junos
+            for n in [ifname] if ifname else sorted(self.oper):
+                st = self.oper[n]
+                c = self.counters[n]
+                phy = _sub(root, "physical-interface")
+                _sub(phy, "name", n)
+                _sub(phy, "admin-status", st["admin"])
+                _sub(phy, "oper-status", st["oper"])
+                ts = _sub(phy, "traffic-statistics")
+                _sub(ts, "input-bytes", str(c[0]))
+                _sub(ts, "output-bytes", str(c[1]))
+                _sub(ts, "input-packets", str(c[2]))
+                _sub(ts, "output-packets", str(c[3]))
+                _sub(_sub(phy, "input-error-list"), "input-errors", str(c[4]))
+                _sub(_sub(phy, "output-error-list"), "output-errors", str(c[5]))
+        return root
+
+    def vc_port_xml(self):
+        if self.vc_reply is not None:
+            return etree.fromstring(self.vc_reply)
+        root = etree.Element("multi-routing-engine-results")
+        by_member = {}
+        for m, pic, port, status in self.vc_ports:
+            by_member.setdefault(m, []).append((pic, port, status))
+        for m in range(self.members):
+            item = _sub(root, "multi-routing-engine-item")
+            _sub(item, "re-name", f"fpc{m}")
+            info = _sub(item, "virtual-chassis-port-information")
+            plist = _sub(info, "port-list")
+            for pic, port, status in by_member.get(m, []):
+                pi = _sub(plist, "port-information")
+                _sub(pi, "port-name", f"{pic}/{port}")
+                _sub(pi, "port-status", status)
+        return root
+
+    def commit_list_text(self):
+        lines = []
+        with self.lock:
+            for i, h in enumerate(self.history):
+                lines.append(f"{i}   {h['ts']:%Y-%m-%d %H:%M:%S} UTC by {h['user']} via {h['client']}")
+                if h["comment"]:
+                    lines.append(f"    {h['comment']}")
+        return "\n".join(lines) + "\n"
+
+    def rollback_compare_text(self, a, b):
+        with self.lock:
+            if max(a, b) >= len(self.history):
+                raise RPCError(f"rollback {max(a, b)} does not exist")
+            # what changes when going from rollback a to rollback b
+            old = _set_lines(self.history[a]["config"])
+            new = _set_lines(self.history[b]["config"])
+        out = []
+        for line in difflib.unified_diff(old, new, lineterm="", n=0):
+            if line.startswith(("---", "+++", "@@")):
+                continue
+            out.append(f"{line[0]}   {line[1:]};")
+        return "\n".join(out)
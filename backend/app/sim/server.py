@@ -0,0 +1,361 @@
+# /app/backend/app/sim/server.py
+"""
+Local NETCONF-over-SSH stand-in for a fleet of Junos switches.
+
+One SSH listener serves all simulated devices; the SSH username selects the
+device (sim-0000, sim-0001, ...). Point the backend at the generated
+devices.json to load-test refreshes, approvals and caches on a laptop:
+
+    python -m app.sim.server --devices 200 --port 8830 \\
+        --latency 0.05 --commit-time 2 --write-devices /tmp/sim-devices.json
+    NETCONF_DEVICES_JSON=/tmp/sim-devices.json uvicorn app.main:app
+
+Recorded replies: --recorded DIR with DIR/<device>/config.xml (a get-config
+dump) and optionally DIR/<device>/vc-port.xml.
+
+Speaks NETCONF 1.0 (]]>]]> framing), which ncclient falls back to.
+"""
+import os
+import json
+import time
+import random
+import socket
+import argparse
+import threading
+
+import paramiko
+from lxml import etree
+
+from .junos import SimDevice, RPCError, load_recorded_config, local, _strip_ns
+
+NC_NS = "urn:ietf:params:xml:ns:netconf:base:1.0"
+EOM = b"]]>]]>"
+
+CAPABILITIES = [
+    "urn:ietf:params:netconf:base:1.0",
+    "urn:ietf:params:netconf:capability:candidate:1.0",
+    "urn:ietf:params:netconf:capability:confirmed-commit:1.0",
+    "urn:ietf:params:netconf:capability:validate:1.0",
+    "urn:ietf:params:xml:ns:netconf:base:1.0",
+    "urn:ietf:params:xml:ns:netconf:capability:candidate:1.0",
+    "http://xml.juniper.net/netconf/junos/1.0",
+    "http://xml.juniper.net/dmi/system/1.0",
+]
+
+
+class _SSHServer(paramiko.ServerInterface):
+    def __init__(self, sim):
+        self.sim = sim
+        self.username = None
+        self.subsystem = threading.Event()
+
+    def check_auth_password(self, username, password):
+        if username in self.sim.devices and username not in self.sim.dead:
+            self.username = username
+            return paramiko.AUTH_SUCCESSFUL
+        return paramiko.AUTH_FAILED
+
+    def get_allowed_auths(self, username):
+        return "password"
+
+    def check_channel_request(self, kind, chanid):
+        if kind == "session":
+            return paramiko.OPEN_SUCCEEDED
+        return paramiko.OPEN_FAILED_ADMINISTRATIVELY_PROHIBITED
+
+    def check_channel_subsystem_request(self, channel, name):
+        if name == "netconf":
+            self.subsystem.set()
+            return True
+        return False
+
+
+class SimServer:
+    """
+    devices: {name: SimDevice}
+    latency / jitter: seconds added to every RPC
+    commit_time: extra seconds a commit takes
+    hang: device names that accept SSH but never send <hello> (dead box)
+    dead: device names that refuse authentication
+    """
+
+    def __init__(self, devices, host="127.0.0.1", port=8830, latency=0.0, jitter=0.0,
+                 commit_time=0.0, hang=(), dead=(), host_key=None):
+        self.devices = devices
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.jitter = jitter
+        self.commit_time = commit_time
+        self.hang = set(hang)
+        self.dead = set(dead)
+        self.host_key = host_key or paramiko.RSAKey.generate(2048)
+        self.sessions = 0
+        self.rpc_count = 0
+        self._stats_lock = threading.Lock()
+        self._sock = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    # ---- lifecycle ----
+
+    def start(self):
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.bind((self.host, self.port))
+        self.port = self._sock.getsockname()[1]
+        self._sock.listen(512)
+        self._sock.settimeout(0.5)
+        self._thread = threading.Thread(target=self._accept_loop, name="sim-accept", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+        if self._sock:
+            self._sock.close()
+
+    def devices_json(self, password="sim"):
+        return {
+            name: {"name": name, "site": "SIM", "host": self.host, "port": self.port,
+                   "username": name, "password": password, "mgmt_ip": self.host}
+            for name in self.devices
+        }
+
+    def _accept_loop(self):
+        while not self._stop.is_set():
+            try:
+                client, _ = self._sock.accept()
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            threading.Thread(target=self._handle_client, args=(client,), daemon=True).start()
+
+    # ---- SSH / NETCONF session ----
+
+    def _handle_client(self, client):
+        transport = paramiko.Transport(client)
+        transport.add_server_key(self.host_key)
+        server = _SSHServer(self)
+        try:
+            transport.start_server(server=server)
+            chan = transport.accept(30)
+            if chan is None or not server.subsystem.wait(10):
+                return
+            device = self.devices[server.username]
+            if server.username in self.hang:
+                while not self._stop.is_set() and transport.is_active():
+                    time.sleep(0.5)
+                return
+            with self._stats_lock:
+                self.sessions += 1
+            self._serve(chan, device)
+        except Exception:
+            pass
+        finally:
+            transport.close()
+
+    def _send(self, chan, xml_bytes):
+        chan.sendall(xml_bytes + EOM)
+
+    def _serve(self, chan, device):
+        hello = etree.Element(f"{{{NC_NS}}}hello", nsmap={None: NC_NS})
+        caps = etree.SubElement(hello, f"{{{NC_NS}}}capabilities")
+        for c in CAPABILITIES:
+            etree.SubElement(caps, f"{{{NC_NS}}}capability").text = c
+        etree.SubElement(hello, f"{{{NC_NS}}}session-id").text = str(random.randint(1000, 65000))
+        self._send(chan, etree.tostring(hello))
+
+        buf = b""
+        while True:
+            data = chan.recv(65536)
+            if not data:
+                return
+            buf += data
+            while EOM in buf:
+                msg, buf = buf.split(EOM, 1)
+                msg = msg.strip()
+                if not msg:
+                    continue
+                root = etree.fromstring(msg)
+                if local(root) == "hello":
+                    continue
+                reply, close = self._handle_rpc(device, root)
+                self._send(chan, reply)
+                if close:
+                    return
+
+    # ---- RPC dispatch ----
+
+    def _reply(self, rpc, body=None, ok=False, error=None):
+        attrs = {k: v for k, v in rpc.attrib.items()}
+        reply = etree.Element(f"{{{NC_NS}}}rpc-reply", attrs, nsmap={None: NC_NS})
+        if error is not None:
+            err = etree.SubElement(reply, f"{{{NC_NS}}}rpc-error")
+            etree.SubElement(err, f"{{{NC_NS}}}error-type").text = "application"
+            etree.SubElement(err, f"{{{NC_NS}}}error-tag").text = "operation-failed"
+            etree.SubElement(err, f"{{{NC_NS}}}error-severity").text = "error"
+            etree.SubElement(err, f"{{{NC_NS}}}error-message").text = str(error)
+        elif ok:
+            etree.SubElement(reply, f"{{{NC_NS}}}ok")
+        elif body is not None:
+            reply.append(body)
+        return etree.tostring(reply)
+
+    def _delay(self, extra=0.0):
+        d = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0) + extra
+        if d > 0:
+            time.sleep(d)
+
+    def _handle_rpc(self, device, rpc):
+        with self._stats_lock:
+            self.rpc_count += 1
+        op = next((c for c in rpc if isinstance(c.tag, str)), None)
+        if op is None:
+            return self._reply(rpc, error="empty rpc"), False
+        name = local(op)
+
+        try:
+            if name == "close-session":
+                return self._reply(rpc, ok=True), True
+            if name in ("lock", "unlock", "validate"):
+                return self._reply(rpc, ok=True), False
+            if name == "discard-changes":
+                device.discard()
+                return self._reply(rpc, ok=True), False
+
+            self._delay()
+            _strip_ns(op)
+
+            if name in ("get-config", "get-configuration"):
+                flt = op.find("filter")
+                if flt is None and name == "get-configuration":
+                    flt = op
+                cfg = device.get_config(flt)
+                if name == "get-configuration":
+                    return self._reply(rpc, cfg if cfg is not None else etree.Element("configuration")), False
+                data = etree.Element(f"{{{NC_NS}}}data")
+                if cfg is not None:
+                    data.append(cfg)
+                return self._reply(rpc, data), False
+
+            if name == "edit-config":
+                default_op = (op.findtext("default-operation") or "merge").strip()
+                cfg = op.find("config")
+                if cfg is None:
+                    raise RPCError("edit-config without <config>")
+                device.edit_config(cfg, default_op)
+                return self._reply(rpc, ok=True), False
+
+            if name == "commit":
+                self._delay(self.commit_time)
+                device.commit(comment=op.findtext("log"))
+                return self._reply(rpc, ok=True), False
+
+            if name == "load-configuration":
+                idx = op.get("rollback")
+                if idx is None:
+                    raise RPCError("only rollback loads are simulated")
+                device.load_rollback(int(idx))
+                return self._reply(rpc, etree.Element("load-configuration-results")), False
+
+            if name == "get-interface-information":
+                ifname = op.findtext("interface-name")
+                if op.find("statistics") is not None or op.find("extensive") is not None:
+                    return self._reply(rpc, device.statistics_xml(ifname)), False
+                return self._reply(rpc, device.terse_xml(ifname)), False
+
+            if name == "command":
+                return self._reply(rpc, self._command(device, " ".join((op.text or "").split()))), False
+
+            raise RPCError(f"syntax error: {name}")
+        except RPCError as e:
+            return self._reply(rpc, error=e), False
+
+    def _command(self, device, cmd):
+        if cmd == "show virtual-chassis vc-port":
+            return device.vc_port_xml()
+        out = etree.Element("output")
+        if cmd == "show system commit":
+            out.text = device.commit_list_text()
+            return out
+        if cmd.startswith("show system rollback compare"):
+            a, b = (int(x) for x in cmd.split()[-2:])
+            out.text = device.rollback_compare_text(a, b)
+            return out
+        raise RPCError(f"unknown command: {cmd}")
+
+
+# --------------------------
+# fleet construction / CLI
+# --------------------------
+
+def build_fleet(count, members=2, ports=48, vlans=40, prefix="sim", recorded=None):
+    devices = {}
+    for i in range(count):
+        name = f"{prefix}-{i:04d}"
+        devices[name] = SimDevice(name, members=members, ports=ports, vlans=vlans)
+
+    if recorded:
+        for name in sorted(os.listdir(recorded)):
+            d = os.path.join(recorded, name)
+            cfg = os.path.join(d, "config.xml")
+            if not os.path.isfile(cfg):
+                continue
+            vc = os.path.join(d, "vc-port.xml")
+            vc_reply = None
+            if os.path.isfile(vc):
+                root = etree.parse(vc).getroot()
+                found = root.xpath('//*[local-name()="multi-routing-engine-results"]')
+                vc_reply = etree.tostring(found[0] if found else root)
+            devices[name] = SimDevice(name, config=load_recorded_config(cfg), vc_reply=vc_reply)
+    return devices
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Junos NETCONF simulator")
+    ap.add_argument("--devices", type=int, default=10)
+    ap.add_argument("--members", type=int, default=2, help="VC members per device")
+    ap.add_argument("--ports", type=int, default=48, help="ge ports per member")
+    ap.add_argument("--vlans", type=int, default=40)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8830)
+    ap.add_argument("--latency", type=float, default=0.05, help="seconds per RPC")
+    ap.add_argument("--jitter", type=float, default=0.02)
+    ap.add_argument("--commit-time", type=float, default=1.0)
+    ap.add_argument("--recorded", help="dir with <device>/config.xml recordings")
+    ap.add_argument("--hang", default="", help="comma separated devices that never answer")
+    ap.add_argument("--dead", default="", help="comma separated devices that refuse login")
+    ap.add_argument("--flap", type=float, default=0.0, help="oper-state flap ratio per 10s")
+    ap.add_argument("--write-devices", help="write a devices.json for the backend")
+    args = ap.parse_args()
+
+    devices = build_fleet(args.devices, args.members, args.ports, args.vlans, recorded=args.recorded)
+    sim = SimServer(
+        devices, host=args.host, port=args.port, latency=args.latency, jitter=args.jitter,
+        commit_time=args.commit_time,
+        hang=[d for d in args.hang.split(",") if d], dead=[d for d in args.dead.split(",") if d],
+    ).start()
+
+    if args.write_devices:
+        with open(args.write_devices, "w") as fh:
+            json.dump(sim.devices_json(), fh, indent=2)
+        print(f"✔ devices written: {args.write_devices}")
+
+    print(f"NETCONF simulator: {len(devices)} devices on {args.host}:{sim.port}")
+    try:
+        while True:
+            time.sleep(10)
+            if args.flap:
+                for d in devices.values():
+                    d.flap(args.flap)
+            print(f"  sessions={sim.sessions} rpcs={sim.rpc_count}")
+    except KeyboardInterrupt:
+        sim.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+# /app/backend/app/snapshots.py
+"""
+Content-addressed running-config snapshots.
+
+After every retrieve (and the refresh that follows a commit) the
+<interfaces> and <vlans> sections are canonicalised, hashed (sha256) and
+stored zlib-compressed in config_blobs. config_snapshots records which
+blob a device had when; an unchanged config only bumps last_seen_at.
+
+    record("sw01", "interfaces", cfg_ele, reason="retrieve")
+    diff(load(db, a), load(db, b))  -> [{"op", "path", "old"/"new"/"config"}]
+
+Diffs are structural: list entries are matched by their <name> key, leaf
+lists (vlan members) by value, so a reordered config is not a change.
+Paths use Junos "set" wording: "interfaces interface ge-0/0/1 description".
+"""
+import os
+import zlib
+import hashlib
+from datetime import datetime
+from lxml import etree
+
+from .database import SessionLocal
+from .models import ConfigBlob, ConfigSnapshot
+
+SECTIONS = ("interfaces", "vlans")
+SNAPSHOT_KEEP = int(os.getenv("SNAPSHOT_KEEP", "1000"))   # per device + section
+
+
+# ---- canonical form ----
+
+def _section_element(ele, section):
+    if etree.QName(ele).localname == section:
+        return ele
+    found = ele.xpath(f'//*[local-name()="configuration"]/*[local-name()="{section}"]')
+    return found[0] if found else None
+
+
+def _clean(el):
+    """Copy without namespaces, junos:* attributes, comments and whitespace."""
+    out = etree.Element(etree.QName(el).localname)
+    for k, v in sorted(el.attrib.items()):
+        if not k.startswith("{"):
+            out.set(k, v)
+    children = [c for c in el if isinstance(c.tag, str)]
+    if children:
+        for c in children:
+            out.append(_clean(c))
+    elif el.text and el.text.strip():
+        out.text = el.text.strip()
+    return out
+
+
+def canonical(ele, section):
+    """Canonical bytes of one config section (empty element if absent)."""
+    sec = _section_element(ele, section)
+    clean = _clean(sec) if sec is not None else etree.Element(section)
+    return etree.tostring(clean)
+
+
+# ---- store ----
+
+def latest(db, device, section):
+    return (
+        db.query(ConfigSnapshot)
+          .filter(ConfigSnapshot.device == device, ConfigSnapshot.section == section)
+          .order_by(ConfigSnapshot.id.desc())
+          .first()
+    )
+
+
+def save(db, device, section, ele, reason="retrieve"):
+    data = canonical(ele, section)
+    digest = hashlib.sha256(data).hexdigest()
+    now = datetime.utcnow()
+
+    last = latest(db, device, section)
+    if last is not None and last.hash == digest:
+        last.last_seen_at = now
+        db.commit()
+        return last
+
+    if db.query(ConfigBlob.hash).filter(ConfigBlob.hash == digest).first() is None:
+        db.merge(ConfigBlob(hash=digest, data=zlib.compress(data, 6), size=len(data), created_at=now))
+    snap = ConfigSnapshot(device=device, section=section, hash=digest, reason=reason,
+                          taken_at=now, last_seen_at=now)
+    db.add(snap)
+    db.commit()
+    _prune(db, device, section)
+    return snap
+
+
+def _prune(db, device, section):
+    old = (
+        db.query(ConfigSnapshot.id)
+          .filter(ConfigSnapshot.device == device, ConfigSnapshot.section == section)
+          .order_by(ConfigSnapshot.id.desc())
+          .offset(SNAPSHOT_KEEP)
+          .all()
+    )
+    if not old:
+        return
+    db.query(ConfigSnapshot).filter(ConfigSnapshot.id.in_([r.id for r in old])).delete(synchronize_session=False)
+    used = db.query(ConfigSnapshot.hash).distinct()
+    db.query(ConfigBlob).filter(ConfigBlob.hash.notin_(used)).delete(synchronize_session=False)
+    db.commit()
+
+
+def record(device, section, ele, reason="retrieve"):
+    """Best-effort save in its own session; never breaks the caller."""
+    db = SessionLocal()
+    try:
+        save(db, device, section, ele, reason)
+    except Exception as e:
+        db.rollback()
+        print(f"snapshot {device}/{section} failed: {e}")
+    finally:
+        db.close()
+
+
+def load_bytes(db, snap):
+    blob = db.query(ConfigBlob).filter(ConfigBlob.hash == snap.hash).one()
+    return zlib.decompress(blob.data)
+
+
+def load(db, snap):
+    return etree.fromstring(load_bytes(db, snap))
+
+
+# ---- structural diff ----
+
+def _children(el):
+    """Children keyed by identity: (tag, <name>) for lists, (tag, text) for leaves."""
+    out = {}
+    for c in el:
+        if len(c):
+            n = c.find("name")
+            out[(c.tag, n.text if n is not None else None)] = c
+        else:
+            out[(c.tag, c.text or "")] = c
+    return out
+
+
+def _segment(key, el):
+    tag, ident = key
+    return f"{tag} {ident}" if len(el) and ident is not None else tag
+
+
+def flatten(el, prefix=""):
+    """Junos `display set`-style lines for a subtree."""
+    if not len(el):
+        return [" ".join(p for p in (prefix, el.tag, el.text or "") if p)]
+    name = el.find("name")
+    here = " ".join(p for p in (prefix, el.tag, name.text if name is not None else "") if p)
+    lines = []
+    for c in el:
+        if c is not name:
+            lines.extend(flatten(c, here))
+    return lines or [here]
+
+
+def _diff(a, b, path, out):
+    ca, cb = _children(a), _children(b)
+    removed = [k for k in ca if k not in cb]
+    added = [k for k in cb if k not in ca]
+
+    # single-valued leaf with a new value → "changed" instead of removed + added
+    for k in list(removed):
+        if len(ca[k]):
+            continue
+        tag = k[0]
+        ra = [x for x in ca if x[0] == tag]
+        rb = [x for x in cb if x[0] == tag]
+        if len(ra) == 1 and len(rb) == 1 and rb[0] in added and not len(cb[rb[0]]):
+            out.append({"op": "changed", "path": " ".join(path + [tag]), "old": k[1], "new": rb[0][1]})
+            removed.remove(k)
+            added.remove(rb[0])
+
+    prefix = " ".join(path)
+    for k in removed:
+        out.append({"op": "removed", "path": " ".join(path + [_segment(k, ca[k])]),
+                    "config": flatten(ca[k], prefix)})
+    for k in added:
+        out.append({"op": "added", "path": " ".join(path + [_segment(k, cb[k])]),
+                    "config": flatten(cb[k], prefix)})
+
+    for k, ea in ca.items():
+        eb = cb.get(k)
+        if eb is None or not len(ea) or not len(eb):
+            continue
+        # canonical form → identical subtrees serialise identically
+        if etree.tostring(ea) != etree.tostring(eb):
+            _diff(ea, eb, path + [_segment(k, ea)], out)
+
+
+def diff(old, new, within=None):
+    """
+    Structural diff between two canonical section elements.
+    `within` limits the result to paths starting with it
+    (e.g. "interfaces interface ge-0/0/1").
+    """
+    out = []
+    if etree.tostring(old) != etree.tostring(new):
+        _diff(old, new, [old.tag], out)
+    if within:
+        out = [c for c in out if c["path"] == within or c["path"].startswith(within + " ")]
+    return out
@@ -0,0 +1,280 @@
+# /app/backend/app/tracing.py
+"""
+Lightweight span tracing.
+
+    with tracing.span("netconf.commit", device="sw01"):
+        ...
+
+    @tracing.traced("apply_interface_config")
+    def apply_interface_config(...): ...
+
+The active span lives in a contextvar, so it follows the request into
+FastAPI's threadpool automatically. For threads you start yourself use
+tracing.wrap(fn) (or executor.submit(tracing.wrap(fn), ...)).
+
+Finished traces are:
+  - summarised in a Server-Timing response header (see trace_request)
+  - appended as JSON lines to TRACE_FILE (if set)
+  - POSTed as OTLP/HTTP JSON to OTEL_EXPORTER_OTLP_ENDPOINT (if set),
+    e.g. http://localhost:4318 for a local collector
+"""
+import os
+import re
+import json
+import time
+import queue
+import random
+import threading
+import functools
+import contextvars
+import urllib.request
+from contextlib import contextmanager
+
+TRACE_FILE = os.getenv("TRACE_FILE")
+OTLP_ENDPOINT = os.getenv("OTEL_EXPORTER_OTLP_ENDPOINT")
+SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "manager-backend")
+SERVER_TIMING_MAX = int(os.getenv("SERVER_TIMING_MAX", "20"))
+
+_current = contextvars.ContextVar("current_span", default=None)
+_traceparent_re = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+_token_re = re.compile(r"[^A-Za-z0-9!#$%&'*+\-.^_`|~]")
+
+
+def _new_id(bits):
+    return f"{random.getrandbits(bits):0{bits // 4}x}"
+
+
+class Trace:
+    def __init__(self, trace_id=None, remote_parent=None):
+        self.trace_id = trace_id or _new_id(128)
+        self.remote_parent = remote_parent
+        self.spans = []
+        self.lock = threading.Lock()
+
+
+class Span:
+    __slots__ = ("trace", "span_id", "parent_id", "name", "attributes",
+                 "start_ns", "end_ns", "error")
+
+    def __init__(self, trace, name, parent_id=None, attributes=None):
+        self.trace = trace
+        self.span_id = _new_id(64)
+        self.parent_id = parent_id
+        self.name = name
+        self.attributes = dict(attributes or {})
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.error = None
+
+    @property
+    def duration_ms(self):
+        end = self.end_ns or time.time_ns()
+        return (end - self.start_ns) / 1e6
+
+    def set(self, **attrs):
+        self.attributes.update(attrs)
+
+    def to_dict(self):
+        return {
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": round(self.duration_ms, 3),
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+def current_span():
+    return _current.get()
+
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Child span of the current one. Without an active span this starts a new
+    trace which is exported when the span ends (jobs, scripts).
+    """
+    parent = _current.get()
+    root = parent is None
+    trace = Trace() if root else parent.trace
+    s = Span(trace, name, None if root else parent.span_id, attributes)
+    token = _current.set(s)
+    try:
+        yield s
+    except Exception as e:
+        s.error = str(e)
+        raise
+    finally:
+        s.end_ns = time.time_ns()
+        _current.reset(token)
+        with trace.lock:
+            trace.spans.append(s)
+        if root:
+            export(trace)
+
+
+def record(name, start_ns, end_ns, **attributes):
+    """Attach an already finished span (e.g. timed by an event hook)."""
+    parent = _current.get()
+    if parent is None:
+        return
+    s = Span(parent.trace, name, parent.span_id, attributes)
+    s.start_ns, s.end_ns = start_ns, end_ns
+    with parent.trace.lock:
+        parent.trace.spans.append(s)
+
+
+def traced(name=None):
+    """Decorator: run the function inside a span (keeps the signature intact)."""
+    def deco(fn):
+        span_name = name or fn.__name__
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with span(span_name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+
+def wrap(fn):
+    """Bind fn to the caller's context so spans in another thread nest correctly."""
+    ctx = contextvars.copy_context()
+
+    @functools.wraps(fn)
+    def runner(*args, **kwargs):
+        return ctx.run(fn, *args, **kwargs)
+    return runner
+
+
+# ---- HTTP integration ----
+
+@contextmanager
+def trace_request(method, path, traceparent=None):
+    """Root span for one API request; continues a W3C traceparent if given."""
+    m = _traceparent_re.match((traceparent or "").strip())
+    trace = Trace(m.group(1), m.group(2)) if m else Trace()
+    s = Span(trace, f"{method} {path}", trace.remote_parent, {"http.method": method, "http.path": path})
+    token = _current.set(s)
+    try:
+        yield s
+    except Exception as e:
+        s.error = str(e)
+        raise
+    finally:
+        s.end_ns = time.time_ns()
+        _current.reset(token)
+        with trace.lock:
+            trace.spans.append(s)
+        export(trace)
+
+
+def server_timing(root: Span) -> str:
+    """Server-Timing header value: total + per span-name durations (summed)."""
+    totals = {}
+    with root.trace.lock:
+        spans = [s for s in root.trace.spans if s is not root]
+    for s in spans:
+        key = _token_re.sub("_", s.name)
+        dur, n = totals.get(key, (0.0, 0))
+        totals[key] = (dur + s.duration_ms, n + 1)
+
+    ranked = sorted(totals.items(), key=lambda kv: -kv[1][0])[:SERVER_TIMING_MAX]
+    parts = [f"total;dur={root.duration_ms:.1f}"]
+    for key, (dur, n) in ranked:
+        parts.append(f'{key};dur={dur:.1f}' + (f';desc="x{n}"' if n > 1 else ""))
+    return ", ".join(parts)
+
+
+# ---- exporters ----
+
+_export_q = queue.Queue(maxsize=1000)
+_export_thread = None
+_export_lock = threading.Lock()
+
+
+def export(trace: Trace):
+    if not (TRACE_FILE or OTLP_ENDPOINT):
+        return
+    global _export_thread
+    with _export_lock:
+        if _export_thread is None:
+            _export_thread = threading.Thread(target=_export_loop, name="trace-export", daemon=True)
+            _export_thread.start()
+    try:
+        _export_q.put_nowait(trace)
+    except queue.Full:
+        pass   # never block requests on tracing
+
+
+def _trace_record(trace):
+    spans = sorted((s.to_dict() for s in trace.spans), key=lambda d: d["start_ns"])
+    root = next((s for s in spans if s["parent_id"] in (None, trace.remote_parent)), spans[0])
+    return {
+        "trace_id": trace.trace_id,
+        "name": root["name"],
+        "duration_ms": root["duration_ms"],
+        "ts": root["start_ns"] / 1e9,
+        "spans": spans,
+    }
+
+
+def _otlp_payload(traces):
+    def attrs(d):
+        return [{"key": k, "value": {"stringValue": str(v)}} for k, v in d.items()]
+
+    spans = []
+    for t in traces:
+        for s in t.spans:
+            item = {
+                "traceId": t.trace_id,
+                "spanId": s.span_id,
+                "name": s.name,
+                "kind": 1,
+                "startTimeUnixNano": str(s.start_ns),
+                "endTimeUnixNano": str(s.end_ns),
+                "attributes": attrs(s.attributes),
+                "status": {"code": 2, "message": s.error} if s.error else {"code": 1},
+            }
+            if s.parent_id:
+                item["parentSpanId"] = s.parent_id
+            spans.append(item)
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": attrs({"service.name": SERVICE_NAME})},
+            "scopeSpans": [{"scope": {"name": "app.tracing"}, "spans": spans}],
+        }]
+    }
+
+
+def _export_loop():
+    while True:
+        batch = [_export_q.get()]
+        while len(batch) < 50:
+            try:
+                batch.append(_export_q.get_nowait())
+            except queue.Empty:
+                break
+
+        if TRACE_FILE:
+            try:
+                with open(TRACE_FILE, "a") as fh:
+                    for t in batch:
+                        fh.write(json.dumps(_trace_record(t), default=str) + "\n")
+            except Exception as e:
+                print(f"trace file export failed: {e}")
+
+        if OTLP_ENDPOINT:
+            try:
+                req = urllib.request.Request(
+                    OTLP_ENDPOINT.rstrip("/") + "/v1/traces",
+                    data=json.dumps(_otlp_payload(batch)).encode(),
+                    headers={"Content-Type": "application/json"},
+                    method="POST",
+                )
+                urllib.request.urlopen(req, timeout=5).close()
+            except Exception as e:
+                print(f"OTLP export failed: {e}")
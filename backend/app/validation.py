@@ -0,0 +1,183 @@
+# /app/backend/app/validation.py
+"""
+Change request pre-validation against cached device state.
+
+Checked before a request is stored and again before it is applied, so a
+request that can only fail never costs a NETCONF session:
+
+  * mode / vlan fields follow the rules of netconf.interface_element
+  * VLANs exist in vlan_cache (by name or id, ranges, "all" on trunks)
+  * the interface exists (cached, or a valid name on a known VC member),
+    is not a VC port and is not a LAG member
+  * a delete targets a configured interface
+
+    errors = validation.check(db, "sw01", "ge-0/0/1", config)         # [] = ok
+    errors = validation.check(db, "sw01", "ge-0/0/1", None, "delete")
+
+Per device the cached rows are turned into lookup sets once and reused
+until vlan_cache / interface_cache change (only their updated_at columns
+are read per request). Checks whose cache is empty (never retrieved) are
+skipped: the device gets the last word there.
+"""
+import re
+import threading
+
+from sqlalchemy import select, bindparam
+
+from . import metrics
+from .models import CachedVlan, InterfaceCache, VcTopology
+
+REJECTED = metrics.Counter(
+    "change_requests_rejected_total", "Change requests rejected by local validation", ("rule",))
+
+_PHYS_RE = re.compile(r"^(?:ge|xe|et|mge)-(\d+)/(\d+)/(\d+)$")
+_AE_RE = re.compile(r"^ae\d+$")
+
+# version stamps of the cached rows, one round trip (built once)
+_STAMPS = select(*[
+    select(m.updated_at).where(m.device == bindparam("device")).scalar_subquery()
+    for m in (CachedVlan, InterfaceCache, VcTopology)
+])
+
+_lock = threading.Lock()
+_lookups = {}   # device -> (key, _Lookup)
+
+
+class _Lookup:
+    """Lookup sets for one device, built from the cached rows."""
+
+    __slots__ = ("vlans_known", "vlan_names", "vlan_ids", "ports_known", "ports", "members")
+
+    def __init__(self, vlan_row, iface_row, topo_row):
+        self.vlans_known = vlan_row is not None
+        self.vlan_names, self.vlan_ids = set(), set()
+        for v in (vlan_row.data if vlan_row else None) or []:
+            if v.get("name"):
+                self.vlan_names.add(v["name"])
+            if v.get("id") is not None:
+                self.vlan_ids.add(int(v["id"]))
+
+        self.ports_known = iface_row is not None
+        self.ports = {p["name"]: p for p in ((iface_row.data if iface_row else None) or []) if p.get("name")}
+
+        self.members = set(topo_row.members or []) if topo_row else set()
+        for name in self.ports:
+            m = _PHYS_RE.match(name)
+            if m:
+                self.members.add(int(m.group(1)))
+
+    def vlan_exists(self, value):
+        v = str(value).strip()
+        if v in self.vlan_names:
+            return True
+        if v.isdigit():
+            return int(v) in self.vlan_ids
+        lo, sep, hi = v.partition("-")
+        if sep and lo.isdigit() and hi.isdigit() and int(lo) <= int(hi):
+            return all(i in self.vlan_ids for i in range(int(lo), int(hi) + 1))
+        return False
+
+
+def _lookup(db, device):
+    key = tuple(db.execute(_STAMPS, {"device": device}).one())
+    with _lock:
+        hit = _lookups.get(device)
+    if hit and hit[0] == key:
+        return hit[1]
+    lk = _Lookup(
+        db.get(CachedVlan, device) if key[0] else None,
+        db.get(InterfaceCache, device) if key[1] else None,
+        db.get(VcTopology, device) if key[2] else None,
+    )
+    with _lock:
+        _lookups[device] = (key, lk)
+    return lk
+
+
+def interface_known(db, device, interface):
+    """
+    True when `interface` is one of the switch's cached ports; before the
+    first retrieve any well-formed port / ae name counts.
+    """
+    lk = _lookup(db, device)
+    if lk.ports_known:
+        return interface in lk.ports
+    return bool(_PHYS_RE.match(interface) or _AE_RE.match(interface))
+
+
+def _check_interface(lk, interface, errors):
+    port = lk.ports.get(interface)
+    if port is None:
+        m = _PHYS_RE.match(interface)
+        if not (m or _AE_RE.match(interface)):
+            errors.append(("interface", f"{interface}: not a switch port or ae interface"))
+        elif m and lk.members and int(m.group(1)) not in lk.members:
+            errors.append(("interface", f"{interface}: no VC member {m.group(1)} on this switch"))
+        return None
+    if port.get("vc_port"):
+        errors.append(("vc_port", f"{interface}: VC port configuration is not allowed"))
+    return port
+
+
+def _check_config(lk, interface, port, config, errors):
+    if not isinstance(config, dict):
+        errors.append(("config", "config must be an object"))
+        return
+    if config.get("vc_port"):
+        errors.append(("vc_port", f"{interface}: VC port configuration is not allowed"))
+    if port is not None and port.get("bundle"):
+        errors.append(("bundle", f"{interface}: member of {port['bundle']}, configure {port['bundle']} instead"))
+
+    mode = config.get("mode")
+    if mode not in ("access", "trunk"):
+        errors.append(("mode", "mode must be 'access' or 'trunk'"))
+        return
+
+    if mode == "access":
+        vlans = [config["access_vlan"]] if config.get("access_vlan") else []
+        if config.get("trunk_vlans"):
+            errors.append(("mode", "trunk_vlans given for an access port"))
+        if config.get("native_vlan"):
+            errors.append(("mode", "native_vlan given for an access port"))
+    else:
+        vlans = config.get("trunk_vlans") or []
+        if not isinstance(vlans, list):
+            errors.append(("vlan", "trunk_vlans must be a list"))
+            vlans = []
+        if "all" in vlans:
+            vlans = [v for v in vlans if v != "all"]
+
+    native = config.get("native_vlan")
+    if native:
+        if not str(native).isdigit() or not 1 <= int(native) <= 4094:
+            errors.append(("vlan", f"native_vlan {native}: must be a vlan id (1-4094)"))
+        elif lk.vlans_known and int(native) not in lk.vlan_ids:
+            errors.append(("vlan", f"native_vlan {native}: unknown vlan"))
+
+    if lk.vlans_known:
+        for v in vlans:
+            if not lk.vlan_exists(v):
+                errors.append(("vlan", f"vlan {v}: unknown on this switch"))
+
+
+def check(db, device, interface, config, type="config"):
+    """List of problems with this request ([] = ok to store / apply)."""
+    from .devices import get_device
+    try:
+        get_device(device)
+    except KeyError:
+        errors = [("device", f"unknown device {device}")]
+    else:
+        lk = _lookup(db, device)
+        errors = []
+        port = _check_interface(lk, interface, errors) if lk.ports_known else None
+        if type == "delete":
+            if lk.ports_known and (port is None or port.get("configured") is False):
+                errors.append(("delete", f"{interface}: not configured, nothing to delete"))
+        else:
+            _check_config(lk, interface, port, config, errors)
+
+    for rule, _ in errors:
+        REJECTED.inc(rule=rule)
+    return [msg for _, msg in errors]
+
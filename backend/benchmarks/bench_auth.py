@@ -0,0 +1,106 @@
+# /app/backend/benchmarks/bench_auth.py
+"""
+Login throughput by password pool size.
+
+    cd backend
+    python -m benchmarks.bench_auth --pool-sizes 0,1,2,4 --logins 64 --out /tmp/auth.json
+
+For each pool size (0 = inline bcrypt on the calling thread, the old
+behaviour) N concurrent logins are verified and we report logins/sec.
+A probe thread meanwhile times a tiny pure-Python task every 10 ms; its
+p95 shows how much a login burst stalls the rest of the process.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.bench_backend import stats
+
+
+def _probe(stop, samples):
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        sum(i * i for i in range(2000))
+        samples.append(time.perf_counter() - t0)
+        time.sleep(0.01)
+
+
+def bench_pool(size, hashed, args):
+    from app import passwords
+
+    passwords.configure(size=size, queue_max=args.logins)
+    # start the workers outside the measurement
+    for _ in range(max(1, size)):
+        passwords.verify_password("secret", hashed)
+
+    probe, stop = [], threading.Event()
+    t = threading.Thread(target=_probe, args=(stop, probe), daemon=True)
+    t.start()
+
+    latencies = []
+
+    def login(_):
+        t0 = time.perf_counter()
+        assert passwords.verify_password("secret", hashed)
+        latencies.append(time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as ex:
+        list(ex.map(login, range(args.logins)))
+    wall = time.perf_counter() - t0
+    stop.set()
+    t.join()
+    passwords.shutdown()
+
+    return {
+        "pool_size": size,
+        "logins": args.logins,
+        "wall_s": round(wall, 3),
+        "logins_per_sec": round(args.logins / wall, 2),
+        "login_latency": stats(latencies),
+        "probe": stats(probe),
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="password pool benchmark")
+    ap.add_argument("--pool-sizes", default=f"0,1,2,{os.cpu_count() or 1}")
+    ap.add_argument("--logins", type=int, default=64)
+    ap.add_argument("--concurrency", type=int, default=32, help="simultaneous login requests")
+    ap.add_argument("--rounds", type=int, default=12, help="bcrypt cost factor")
+    ap.add_argument("--out", default="bench_auth.json")
+    args = ap.parse_args()
+
+    from app import passwords
+    hashed = passwords.pwd_ctx.hash("secret", rounds=args.rounds)
+
+    sizes = sorted({int(s) for s in args.pool_sizes.split(",") if s != ""})
+    results = []
+    for size in sizes:
+        print(f"▶ pool size {size}")
+        r = bench_pool(size, hashed, args)
+        print(f"  {r['logins_per_sec']} logins/s, probe p95 {r['probe']['p95_ms']} ms")
+        results.append(r)
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "params": vars(args),
+        },
+        "results": results,
+    }
+    with open(args.out, "w") as fh:
+        json.dump(report, fh, indent=2)
+    print(f"✔ written: {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,236 @@
+# /app/backend/benchmarks/bench_backend.py
+"""
+End-to-end benchmarks for the backend hot paths.
+
+Drives the FastAPI app (in-process TestClient) against the NETCONF simulator
+(app/sim) and a scratch SQLite database, then writes machine-readable JSON:
+
+    cd backend
+    python -m benchmarks.bench_backend --devices 20 --out bench.json
+    python -m benchmarks.bench_backend --compare bench.json     # vs. previous run
+
+Measured:
+  parser            parse_interfaces_config on 48 / 480 / 4800-port configs
+  cached_reads      GET /interfaces (InterfaceCache) requests per second
+  retrieve          POST /interfaces/retrieve latency
+  live_ae / live    /interface/{if}/live cold + warm, AE and non-AE
+  approve           create request + approve-and-apply round trip
+  nightly           refresh_interfaces + refresh_vlans wall time for N devices
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+
+
+def stats(samples, unit_ops=1):
+    """Latency stats (ms) for a list of durations in seconds."""
+    s = sorted(samples)
+    total = sum(s)
+    return {
+        "n": len(s),
+        "mean_ms": round(1000 * total / len(s), 3),
+        "p50_ms": round(1000 * s[len(s) // 2], 3),
+        "p95_ms": round(1000 * s[min(len(s) - 1, int(len(s) * 0.95))], 3),
+        "min_ms": round(1000 * s[0], 3),
+        "max_ms": round(1000 * s[-1], 3),
+        "stdev_ms": round(1000 * statistics.pstdev(s), 3),
+        "ops_per_sec": round(len(s) * unit_ops / total, 2) if total else None,
+    }
+
+
+def timed(fn, n, before=None):
+    out = []
+    for _ in range(n):
+        if before:
+            before()
+        t0 = time.perf_counter()
+        fn()
+        out.append(time.perf_counter() - t0)
+    return out
+
+
+def _git_rev():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def setup_environment(args):
+    """Start the simulator and point the app at a scratch DB + devices.json."""
+    from app.sim.server import SimServer, build_fleet
+
+    workdir = tempfile.mkdtemp(prefix="bench-")
+    fleet = build_fleet(args.devices, members=args.members)
+    sim = SimServer(fleet, port=0, latency=args.latency, jitter=0,
+                    commit_time=args.commit_time).start()
+
+    devices_path = os.path.join(workdir, "devices.json")
+    with open(devices_path, "w") as fh:
+        json.dump(sim.devices_json(), fh)
+
+    # must be set before app modules are imported
+    os.environ["APP_DB_PATH"] = os.path.join(workdir, "app.db")
+    os.environ["NETCONF_DEVICES_JSON"] = devices_path
+    return sim, workdir
+
+
+def bench_parser(args):
+    from lxml import etree
+    from app.sim.junos import build_config
+    from app.netconf import parse_interfaces_config
+
+    results = {}
+    for members in (1, 10, 100):
+        ports = members * 48
+        xml = etree.tostring(build_config(members=members, ports=48))
+        n = max(3, args.iterations // members)
+
+        def run():
+            parse_interfaces_config(etree.fromstring(xml))
+
+        samples = timed(run, n)
+        r = stats(samples)
+        r["ports_per_sec"] = round(ports * len(samples) / sum(samples))
+        r["xml_kb"] = round(len(xml) / 1024, 1)
+        results[f"{ports}_ports"] = r
+    return results
+
+
+def bench_api(args, sim):
+    from fastapi.testclient import TestClient
+    from app.main import app
+    from app import netconf
+
+    client = TestClient(app)
+    devices = list(sim.devices)
+    dev = devices[0]
+    hdr = {"X-User": "bench", "X-Role": "admin"}
+    results = {}
+
+    def ok(r):
+        if r.status_code >= 400:
+            raise RuntimeError(f"{r.request.method} {r.request.url}: {r.status_code} {r.text[:200]}")
+        return r
+
+    # retrieve (live NETCONF round trip + cache write)
+    results["retrieve"] = stats(timed(
+        lambda: ok(client.post(f"/api/switches/{dev}/interfaces/retrieve")), args.iterations))
+
+    # cached reads
+    n = args.iterations * 10
+    results["cached_reads"] = stats(timed(
+        lambda: ok(client.get(f"/api/switches/{dev}/interfaces")), n))
+
+    # live view: cold (cache invalidated) and warm
+    ifs = ok(client.get(f"/api/switches/{dev}/interfaces")).json()["interfaces"]
+    ge = next(p["name"] for p in ifs if p["name"].startswith("ge-") and p.get("configured"))
+    ae = next(p["name"] for p in ifs if p["name"].startswith("ae"))
+    for label, ifname in (("live", ge), ("live_ae", ae)):
+        url = f"/api/switches/{dev}/interface/{ifname}/live"
+        results[f"{label}_cold"] = stats(timed(
+            lambda: ok(client.get(url)), args.iterations,
+            before=lambda: netconf.invalidate_device_cache(dev)))
+        ok(client.get(url))
+        results[f"{label}_warm"] = stats(timed(lambda: ok(client.get(url)), args.iterations * 10))
+
+    # approve-and-apply round trip
+    def approve():
+        body = {"device": dev, "interface": ge,
+                "config": {"mode": "access", "access_vlan": "v101", "description": "bench"}}
+        rid = ok(client.post("/api/requests", json=body, headers=hdr)).json()["id"]
+        ok(client.post(f"/api/requests/{rid}/approve", headers=hdr))
+
+    results["approve"] = stats(timed(approve, max(2, args.iterations // 5)))
+    return results
+
+
+def bench_nightly(args):
+    from app.jobs import refresh_interfaces, refresh_vlans
+
+    t0 = time.perf_counter()
+    refresh_interfaces.refresh()
+    t1 = time.perf_counter()
+    refresh_vlans.refresh()
+    t2 = time.perf_counter()
+    return {
+        "devices": args.devices,
+        "interfaces_s": round(t1 - t0, 3),
+        "vlans_s": round(t2 - t1, 3),
+        "total_s": round(t2 - t0, 3),
+        "per_device_ms": round(1000 * (t2 - t0) / args.devices, 1),
+    }
+
+
+def compare(old, new):
+    """Print ratios of headline numbers between two result files."""
+    def flat(d, prefix=""):
+        for k, v in d.items():
+            if isinstance(v, dict):
+                yield from flat(v, f"{prefix}{k}.")
+            elif k in ("p50_ms", "total_s", "ports_per_sec", "ops_per_sec"):
+                yield f"{prefix}{k}", v
+
+    o = dict(flat(old["results"]))
+    for key, v in flat(new["results"]):
+        if key in o and o[key] and v:
+            ratio = v / o[key]
+            print(f"  {key:<40} {o[key]:>12} -> {v:>12}  ({ratio:.2f}x)")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="backend benchmarks")
+    ap.add_argument("--devices", type=int, default=20)
+    ap.add_argument("--members", type=int, default=2)
+    ap.add_argument("--latency", type=float, default=0.02, help="simulated seconds per RPC")
+    ap.add_argument("--commit-time", type=float, default=0.2)
+    ap.add_argument("--iterations", type=int, default=20)
+    ap.add_argument("--only", default="", help="comma separated: parser,api,nightly")
+    ap.add_argument("--out", default="bench_results.json")
+    ap.add_argument("--compare", help="previous result file to compare against")
+    args = ap.parse_args()
+
+    only = {s for s in args.only.split(",") if s}
+    sim, workdir = setup_environment(args)
+    results = {}
+    try:
+        if not only or "parser" in only:
+            print("▶ parser"); results["parser"] = bench_parser(args)
+        if not only or "api" in only:
+            print("▶ api"); results.update(bench_api(args, sim))
+        if not only or "nightly" in only:
+            print("▶ nightly"); results["nightly"] = bench_nightly(args)
+    finally:
+        sim.stop()
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "git_rev": _git_rev(),
+            "python": sys.version.split()[0],
+            "platform": platform.platform(),
+            "params": vars(args),
+            "sim": {"sessions": sim.sessions, "rpcs": sim.rpc_count},
+        },
+        "results": results,
+    }
+
+    with open(args.out, "w") as fh:
+        json.dump(report, fh, indent=2)
+    print(json.dumps(results, indent=2))
+    print(f"✔ written: {args.out}")
+
+    if args.compare:
+        with open(args.compare) as fh:
+            compare(json.load(fh), report)
+
+
+if __name__ == "__main__":
+    main()
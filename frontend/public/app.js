@@ -1,17 +1,23 @@
 // frontend/public/app.js
 import {
   drawPorts,
+  initPortTable,
   fetchInterfaceLiveClient,
   highlightVlan,
   clearVlanHighlight,
 } from "./renderer.js";
+import { cachedFetch, invalidateCached } from "./datacache.js";
 
+// safety net next to the push channel: ETag revalidation, so mostly 304s
 const POLL_INTERVAL = 30000;
 let pollTimer = null;
+let eventSource = null;
 let currentSwitch = window.currentSwitch = null;
 let pendingByInterface = {};
 let CURRENT_SWITCH_PORTS = null;
 let CURRENT_DEVICE = null;
+let approvalsReloadTimer = null;
+const VC_TOPOLOGY = {}; // device → { members, ports } (faceplate layout)
 let CURRENT_PORT = null;
 let CURRENT_SWITCH_RENDER_STATE = null;
 let auditDT = null;
@@ -109,22 +115,28 @@ function setText(id, txt) {
   if (el) el.textContent = txt;
 }
 
+function fillSwitchSelect(sel, list) {
+  const keep = sel.value;
+  sel.innerHTML = `<option value="">-- select switch --</option>`;
+
+  list.forEach(s => {
+    const o = document.createElement("option");
+    o.value = s.name;
+    o.textContent = s.name;
+    sel.appendChild(o);
+  });
+
+  if (keep && list.some(s => s.name === keep)) sel.value = keep;
+}
+
 async function loadSwitches() {
   try {
-    const res = await fetch("/api/switches");
-    const list = await res.json();
-
     const sel = document.getElementById("deviceSelect");
     if (!sel) return;
 
-    sel.innerHTML = `<option value="">-- select switch --</option>`;
-
-    list.forEach(s => {
-      const o = document.createElement("option");
-      o.value = s.name;
-      o.textContent = s.name;
-      sel.appendChild(o);
-    });
+    // lokale kopie direct tonen, netwerk‑antwoord alleen als het anders is
+    const res = await cachedFetch("/api/switches", list => fillSwitchSelect(sel, list));
+    if (!res.data) return;
 
     // ✅ expliciet geen selectie
     sel.value = "";
@@ -142,10 +154,15 @@ async function loadSwitches() {
     
       // ✅ ALTIJD eerst knoppen activeren
       setSwitchButtons(true);
+
+      // push channel volgt de gekozen switch (+ polling als vangnet)
+      openEventStream(sw);
+      startPolling();
     
       try {
         await loadPending();
         await loadVlanList();
+        await loadTopology(sw);
         await reloadAllPorts(false);
       } catch (e) {
         console.error("switch load failed", e);
@@ -170,48 +187,60 @@ let _vlans_cache = [];
 async function loadVlanList() {
   _vlans_cache = [];
   if (!currentSwitch) return;
+  const sw = currentSwitch;
   try {
-    const r = await fetch(`/api/switches/${currentSwitch}/vlans`);
-    if (!r.ok) return;
-
-    const raw = await r.json();
-    _vlans_cache =
-      Array.isArray(raw) ? raw :
-      Array.isArray(raw.vlans) ? raw.vlans :
-      Array.isArray(raw.data)  ? raw.data  :
-      [];
-
-    // if (Array.isArray(raw)) {
-    //   _vlans_cache = raw;
-    // } else if (raw?.data && typeof raw.data === "object") {
-    //   _vlans_cache = Object.entries(raw.data).map(([name, v]) => ({
-    //     name,
-    //     id: v.vlan_id ?? v.id ?? null
-    //   }));
-    // } else {
-    //   _vlans_cache = [];
-    // }
-
-    const vlanSel = document.getElementById("vlan-select");
-    if (vlanSel) {
-      vlanSel.innerHTML = `<option value="">-- highlight VLAN --</option>`;
-      _vlans_cache.forEach(v => {
-        const o = document.createElement("option");
-        o.value = v.name;
-        o.textContent = `${v.name} (${v.id ?? ""})`;
-        vlanSel.appendChild(o);
-      });
-      vlanSel.addEventListener("change", (e) => {
-        const v = e.target.value;
-        clearVlanHighlight();
-        if (v) highlightVlan(v);
-      });
-    }
+    await cachedFetch(`/api/switches/${sw}/vlans`, raw => {
+      if (sw === currentSwitch) renderVlanList(raw);
+    });
   } catch (e) {
     console.error("loadVlanList", e);
   }
 }
 
+function renderVlanList(raw) {
+  _vlans_cache =
+    Array.isArray(raw) ? raw :
+    Array.isArray(raw.vlans) ? raw.vlans :
+    Array.isArray(raw.data)  ? raw.data  :
+    [];
+
+  // if (Array.isArray(raw)) {
+  //   _vlans_cache = raw;
+  // } else if (raw?.data && typeof raw.data === "object") {
+  //   _vlans_cache = Object.entries(raw.data).map(([name, v]) => ({
+  //     name,
+  //     id: v.vlan_id ?? v.id ?? null
+  //   }));
+  // } else {
+  //   _vlans_cache = [];
+  // }
+
+  const vlanSel = document.getElementById("vlan-select");
+  if (vlanSel) {
+    vlanSel.innerHTML = `<option value="">-- highlight VLAN --</option>`;
+    _vlans_cache.forEach(v => {
+      const o = document.createElement("option");
+      o.value = v.name;
+      o.textContent = `${v.name} (${v.id ?? ""})`;
+      vlanSel.appendChild(o);
+    });
+    vlanSel.onchange = (e) => {
+      const v = e.target.value;
+      clearVlanHighlight();
+      if (v) highlightVlan(v);
+    };
+  }
+}
+
+// VC layout (members + VC ports) from the long-lived topology cache
+async function loadTopology(sw) {
+  try {
+    await cachedFetch(`/api/switches/${sw}/topology`, topo => { VC_TOPOLOGY[sw] = topo; });
+  } catch (e) {
+    console.warn("topology load failed", e); // skeleton valt terug op members 0/1
+  }
+}
+
 async function reloadAllPorts(live = false, forcedSwitch = null) {
   const sw = forcedSwitch || currentSwitch;
   if (!sw) {
@@ -219,15 +248,43 @@ async function reloadAllPorts(live = false, forcedSwitch = null) {
     return;
   }
 
-  const url = live
-    ? `/api/switches/${sw}/interfaces/retrieve`
-    : `/api/switches/${sw}/interfaces`;
+  const render = data => {
+    if (sw !== currentSwitch) return;   // inmiddels andere switch gekozen
+    setDeviceHealth(sw, data);
+    mergeAndRedrawPorts(sw, data);
+  };
 
-  const r = await fetch(url, { method: live ? "POST" : "GET" });
+  if (!live) {
+    // IndexedDB kopie eerst, daarna revalidatie via ETag
+    const res = await cachedFetch(`/api/switches/${sw}/interfaces`, render);
+    if (res.status === 503) setDeviceHealth(sw, { stale: true });
+    return;
+  }
+
+  const r = await fetch(`/api/switches/${sw}/interfaces/retrieve`, { method: "POST" });
+  if (r.status === 503) {
+    // switch onbereikbaar (circuit open) → cache blijft staan, wel markeren
+    setDeviceHealth(sw, { stale: true });
+    return;
+  }
   if (!r.ok) return;
 
-  const data = await r.json();
-  mergeAndRedrawPorts(sw, data);
+  invalidateCached(`/api/switches/${sw}/`);
+  render(await r.json());
+}
+
+// stale badge: device unreachable, ports shown from cache
+function setDeviceHealth(device, h) {
+  if (device !== currentSwitch) return;
+  const el = document.getElementById("device-health");
+  if (!el) return;
+  if (!h.stale) {
+    el.classList.add("hidden");
+    return;
+  }
+  el.textContent = "⚠ switch unreachable • cached data";
+  el.title = h.last_error || "";
+  el.classList.remove("hidden");
 }
 
 
@@ -444,7 +501,8 @@ async function openModalForPort(port) {
         body: JSON.stringify(payload)
       });
       if (!r.ok) {
-        alert("Failed to create change request");
+        const j = await r.json().catch(() => null);
+        alert("Failed to create change request" + (j?.detail ? ":\n" + j.detail : ""));
       } else {
         // alert("Change request created (pending approval)");
         // optionally close modal and fast-repoll to show candidate state if you want
@@ -600,6 +658,7 @@ document.addEventListener("DOMContentLoaded", () => {
   
 
   renderInitialVC();
+  initPortTable();
   loadSwitches();
   loadPending();
   loadAuditDevices();
@@ -772,21 +831,16 @@ async function approveRequest(id) {
     document.getElementById("deviceSelect")?.value ||
     null;
 
+  // backend already refreshed the cache and pushes it over /api/events;
+  // reload anyway in case the event went missing (cheap: ETag)
   if (!device) {
     console.warn("Approve success, but no device available for refresh");
-  } else {
+  } else if (device === currentSwitch) {
     try {
-      const live = await fetch(
-        `/api/switches/${device}/interfaces/retrieve`,
-        { method: "POST" }
-      );
-
-      if (live.ok) {
-        const data = await live.json();
-        mergeAndRedrawPorts(device, data.interfaces || data);
-      }
+      invalidateCached(`/api/switches/${device}/interfaces`);
+      await reloadAllPorts(false, device);
     } catch (e) {
-      console.error("Live refresh failed after approve", e);
+      console.error("Cache reload failed after approve", e);
     }
   }
 
@@ -898,10 +952,17 @@ function mergeAndRedrawPorts(device, dataOrArray) {
   incoming = incoming.filter(p => p?.name);
 
   // -------- build deterministic skeleton --------
+  // members 0/1 always; bigger VC stacks from the topology + the member numbers we got
+  const topo = VC_TOPOLOGY[device];
+  const members = new Set([0, 1, ...(topo?.members || [])]);
+  for (const p of incoming) {
+    const m = p.name.match(/^(?:ge|xe)-(\d+)\//);
+    if (m) members.add(Number(m[1]));
+  }
   const map = {};
 
   // GE (48 per member)
-  [0, 1].forEach(member => {
+  members.forEach(member => {
     for (let i = 0; i < 48; i++) {
       const name = `ge-${member}/0/${i}`;
       map[name] = {
@@ -923,7 +984,7 @@ function mergeAndRedrawPorts(device, dataOrArray) {
   });
 
   // XE (uplinks)
-  [0, 1].forEach(member => {
+  members.forEach(member => {
     for (let i = 0; i < 4; i++) {
       const name = `xe-${member}/2/${i}`;
       map[name] = {
@@ -941,6 +1002,11 @@ function mergeAndRedrawPorts(device, dataOrArray) {
     }
   });
 
+  // VC ports are known from the topology before any interface data arrives
+  (topo?.ports || []).forEach(vp => {
+    if (map[vp.name]) Object.assign(map[vp.name], { vc_port: true, vc_status: vp.vc_status });
+  });
+
   // AE placeholders (stabiel, max 8)
   for (let i = 0; i < 8; i++) {
     const name = `ae${i}`;
@@ -982,6 +1048,98 @@ function mergeAndRedrawPorts(device, dataOrArray) {
   drawPorts(renderPorts, device);
 }
 
+// -----------------------------
+// Push channel (/api/events)
+// -----------------------------
+function eventStreamOpen() {
+  return !!eventSource && eventSource.readyState === EventSource.OPEN;
+}
+
+// periodic resync of the open switch; tighter while the stream is down
+function startPolling() {
+  clearTimeout(pollTimer);
+  const tick = async () => {
+    try {
+      if (currentSwitch) {
+        if (!eventStreamOpen()) invalidateCached(`/api/switches/${currentSwitch}/interfaces`);
+        await reloadAllPorts(false);
+        await loadPending();
+      }
+    } catch (e) {
+      console.warn("poll failed", e);
+    }
+    pollTimer = setTimeout(tick, eventStreamOpen() ? POLL_INTERVAL : POLL_INTERVAL / 3);
+  };
+  pollTimer = setTimeout(tick, POLL_INTERVAL);
+}
+
+function isViewVisible(name) {
+  const el = document.getElementById(`view-${name}`);
+  return !!el && !el.classList.contains("hidden");
+}
+
+function openEventStream(device) {
+  if (eventSource) eventSource.close();
+
+  const qs = device ? `?devices=${encodeURIComponent(device)}` : "";
+  eventSource = new EventSource(`/api/events${qs}`);
+
+  eventSource.addEventListener("interfaces", e => {
+    const data = JSON.parse(e.data);
+    invalidateCached(`/api/switches/${data.device}/interfaces`);
+    if (data.device !== currentSwitch) return;
+    mergeAndRedrawPorts(data.device, data);
+  });
+
+  eventSource.addEventListener("health", e => {
+    const data = JSON.parse(e.data);
+    setDeviceHealth(data.device, data);
+  });
+
+  eventSource.addEventListener("vlans", e => {
+    const data = JSON.parse(e.data);
+    invalidateCached(`/api/switches/${data.device}/vlans`);
+    if (data.device === currentSwitch) loadVlanList();
+  });
+
+  eventSource.addEventListener("request", e => {
+    const req = JSON.parse(e.data);
+    const key = `${req.device}|${req.interface}`;
+
+    if (req.status === "pending") pendingByInterface[key] = req;
+    else delete pendingByInterface[key];
+
+    if (req.device === currentSwitch && CURRENT_SWITCH_PORTS) {
+      mergeAndRedrawPorts(currentSwitch, CURRENT_SWITCH_PORTS);
+    }
+    // change sets push one event per request: reload the list once per burst
+    if (isViewVisible("approvals")) {
+      clearTimeout(approvalsReloadTimer);
+      approvalsReloadTimer = setTimeout(loadApprovals, 150);
+    }
+  });
+
+  eventSource.addEventListener("audit", () => {
+    if (isViewVisible("audit")) load_audit();
+  });
+
+  // dropped events (slow tab or reconnect) → resync from cache
+  const resync = async () => {
+    await loadPending();
+    if (currentSwitch) await reloadAllPorts(false);
+  };
+  let reconnecting = false;
+
+  eventSource.addEventListener("resync", resync);
+  eventSource.onerror = () => { reconnecting = true; };
+  eventSource.onopen = () => {
+    if (reconnecting) {
+      reconnecting = false;
+      resync();
+    }
+  };
+}
+
 async function loadPending() {
   const r = await fetch("/api/requests?status=pending");
   if (!r.ok) return;
@@ -1168,6 +1326,7 @@ document.getElementById("btn-refresh-vlans").onclick = async () => {
   try {
     const r = await fetch(`/api/switches/${currentSwitch}/vlans/refresh`, { method: "POST" });
     if (!r.ok) throw new Error("vlan refresh failed");
+    invalidateCached(`/api/switches/${currentSwitch}/vlans`);
     await loadVlanCacheStatus(currentSwitch);
     alert("VLANs refreshed");
   } catch (e) {
@@ -1207,10 +1366,8 @@ async function loadAuditDevices() {
   const sel = document.getElementById("audit-device");
   if (!sel) return;
 
-  const res = await fetch("/api/switches");
-  if (!res.ok) return;
-
-  const list = await res.json();
+  const { data: list } = await cachedFetch("/api/switches", () => {});
+  if (!list) return;
 
   list.forEach(d => {
     const o = document.createElement("option");
@@ -1485,9 +1642,11 @@ async function applyRollback(device, idx) {
     load_audit();
     loadRollbackList();
   
-    // 🔄 Refresh interfaces grid (if you're on switch tab)
+    // 🔄 Interfaces grid: backend refreshes after rollback and pushes the
+    // new state; reload anyway in case the event went missing
     if (currentSwitch) {
-      await fetch(`/api/switches/${currentSwitch}/interfaces/retrieve`, { method: "POST" });
+      invalidateCached(`/api/switches/${currentSwitch}/interfaces`);
+      await reloadAllPorts(false);
     }
   } catch (e) {
     console.error("applyRollback:", e);
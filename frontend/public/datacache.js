@@ -0,0 +1,125 @@
+// frontend/public/datacache.js
+// Client-side response cache (IndexedDB) for the read-mostly GET endpoints:
+// /api/switches, /api/switches/{sw}/interfaces, /api/switches/{sw}/vlans
+//
+// cachedFetch(url, render):
+//   1. local copy (memory → IndexedDB) is rendered immediately
+//   2. revalidated in the background with If-None-Match
+//      304 → nothing to do, 200 → stored + rendered again
+// A copy validated less than FRESH_MS ago is not revalidated at all
+// (the SSE stream pushes changes for the open switch anyway).
+
+const DB_NAME = "netconf-ui";
+const STORE = "responses";
+const FRESH_MS = 10 * 1000;
+
+const MEM = new Map(); // url → { url, etag, data, ts, checked }
+let dbPromise = null;
+let invalidating = Promise.resolve();
+
+function openDb() {
+  if (dbPromise) return dbPromise;
+  dbPromise = new Promise(resolve => {
+    if (!window.indexedDB) return resolve(null);
+    const req = indexedDB.open(DB_NAME, 1);
+    req.onupgradeneeded = () => req.result.createObjectStore(STORE, { keyPath: "url" });
+    req.onsuccess = () => resolve(req.result);
+    req.onerror = () => resolve(null); // private mode e.d. → alleen geheugen
+  });
+  return dbPromise;
+}
+
+async function idbGet(url) {
+  const db = await openDb();
+  if (!db) return null;
+  return new Promise(resolve => {
+    const req = db.transaction(STORE).objectStore(STORE).get(url);
+    req.onsuccess = () => resolve(req.result || null);
+    req.onerror = () => resolve(null);
+  });
+}
+
+async function idbPut(rec) {
+  const db = await openDb();
+  if (!db) return;
+  try {
+    db.transaction(STORE, "readwrite").objectStore(STORE).put(rec);
+  } catch (e) {
+    console.warn("datacache put failed", e);
+  }
+}
+
+async function getLocal(url) {
+  await invalidating;
+  let rec = MEM.get(url);
+  if (!rec) {
+    rec = await idbGet(url);
+    if (rec) MEM.set(url, rec);
+  }
+  return rec;
+}
+
+function store(rec) {
+  MEM.set(rec.url, rec);
+  idbPut(rec);
+}
+
+/**
+ * Render from the local copy, then revalidate.
+ * render(data, { source: "local" | "network" }) may be called twice.
+ * Resolves to { status, data } of the network answer
+ * (status 304 = local copy still valid, 0 = network error with local copy).
+ */
+export async function cachedFetch(url, render) {
+  const local = await getLocal(url);
+  if (local) {
+    render(local.data, { source: "local" });
+    if (Date.now() - (local.checked || 0) < FRESH_MS) {
+      return { status: 304, data: local.data };
+    }
+  }
+
+  let r;
+  try {
+    r = await fetch(url, {
+      cache: "no-store",
+      headers: local?.etag ? { "If-None-Match": local.etag } : {}
+    });
+  } catch (e) {
+    if (local) return { status: 0, data: local.data };
+    throw e;
+  }
+
+  if (r.status === 304 && local) {
+    store({ ...local, checked: Date.now() });
+    return { status: 304, data: local.data };
+  }
+  if (!r.ok) return { status: r.status, data: null };
+
+  const data = await r.json();
+  const etag = r.headers.get("ETag");
+  if (etag) {
+    const now = Date.now();
+    store({ url, etag, data, ts: now, checked: now });
+  }
+  render(data, { source: "network" });
+  return { status: r.status, data };
+}
+
+// drop local copies (all, or those whose url starts with prefix)
+export function invalidateCached(prefix = "") {
+  for (const url of [...MEM.keys()]) {
+    if (url.startsWith(prefix)) MEM.delete(url);
+  }
+  invalidating = openDb().then(db => new Promise(resolve => {
+    if (!db) return resolve();
+    const tx = db.transaction(STORE, "readwrite");
+    tx.objectStore(STORE).openCursor().onsuccess = e => {
+      const cur = e.target.result;
+      if (!cur) return;
+      if (cur.key.startsWith(prefix)) cur.delete();
+      cur.continue();
+    };
+    tx.oncomplete = tx.onerror = tx.onabort = () => resolve();
+  }));
+}
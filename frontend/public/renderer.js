@@ -10,6 +10,9 @@ let globalTooltip = null;
    New: global registries to prevent duplication
 ========================================= */
 const PORT_DOM = new Map(); // ifname → DOM element
+const PORT_DATA = new Map(); // ifname → last port object (tooltip / click)
+const PORT_SIG = new Map(); // ifname → signature of what the tile shows
+const MEMBER_DOM = new Map(); // VC member → { geTop, geBottom, xe }
 // ✅ debug expose (alleen voor debugging)
 window.__PORT_DOM__ = PORT_DOM;
 let RENDER_DEVICE = null;
@@ -82,9 +85,6 @@ function createPortTile(initialPort) {
   el.className = "port";
   el.dataset.ifname = initialPort.name;
 
-  // store initial data, but will be updated by updatePortTile()
-  el.dataset.port = JSON.stringify(initialPort);
-
   const label = document.createElement("div");
   label.className = "label-top";
   el.appendChild(label);
@@ -94,7 +94,7 @@ function createPortTile(initialPort) {
   el.appendChild(dot);
 
   el.addEventListener("mouseenter", ev => {
-    const port = JSON.parse(el.dataset.port || "{}");
+    const port = PORT_DATA.get(el.dataset.ifname) || {};
 
     if (port.type === "ae") highlightBundle(port.name);
     if (port.bundle) {
@@ -169,183 +169,333 @@ function createPortTile(initialPort) {
   });
 
   el.addEventListener("click", () => {
-    const port = JSON.parse(el.dataset.port || "{}");
+    const port = PORT_DATA.get(el.dataset.ifname) || {};
     window.openModalForPort?.(port);
   });
 
   return el;
 }
 
-function updatePortTile(el, port) {
-  el.classList.remove(
-    "cached",
-    "live",
-    "pending",
-    "approved",
-    "unconfigured",
-    "oper-up",
-    "oper-down",
-    "is-bundled",
-    "vc-port",
-    "member-0",
-    "member-1"
-  );
-  el.classList.add("port");  el.dataset.port = JSON.stringify(port);
-  el.dataset.description = port.description ?? "";
-
-  if (port._source === "cache") el.classList.add("cached");
-  if (port._source === "live") el.classList.add("live");
-  if (port.pending) el.classList.add("pending");
-  if (port.approved) el.classList.add("approved");
-  if (!port.configured) el.classList.add("unconfigured");
-
-  el.classList.add(port.oper_up ? "oper-up" : "oper-down");
-
-  if (port.bundle) {
-    el.classList.add("is-bundled");
-    el.dataset.bundle = port.bundle;
-  } else {
-    delete el.dataset.bundle;
+// set/remove a data-* attribute only when it actually changes
+function setData(el, key, value) {
+  if (value === null || value === undefined || value === "") {
+    if (key in el.dataset) delete el.dataset[key];
+  } else if (el.dataset[key] !== String(value)) {
+    el.dataset[key] = value;
   }
+}
 
-  if (port.type === "ae") el.dataset.ae = port.name;
-  else delete el.dataset.ae;
-
-  if (port.vc_port) {
-    el.classList.add("vc-port");
-    el.dataset.vcLink = vcLinkId(port.name);
-  } else {
-    delete el.dataset.vcLink;
-  }
+// everything updatePortTile() looks at; equal signature → no DOM work
+function portSignature(p) {
+  return JSON.stringify([
+    p._source, p.pending, p.pending_type, p.approved, p.configured,
+    p.oper_up, p.admin_up, p.mode, p.access_vlan, p.trunk_vlans, p.native_vlan,
+    p.description, p.bundle, p.type, p.vc_port, p.vc_status
+  ]);
+}
 
-  el.classList.add(
-    port.name.startsWith("ge-1/") || port.name.startsWith("xe-1/")
-      ? "member-1"
-      : "member-0"
-  );
+function updatePortTile(el, port, info) {
+  const cl = el.classList;
+  cl.toggle("cached", port._source === "cache");
+  cl.toggle("live", port._source === "live");
+  cl.toggle("pending", !!port.pending);
+  cl.toggle("approved", !!port.approved);
+  cl.toggle("unconfigured", !port.configured);
+  cl.toggle("oper-up", !!port.oper_up);
+  cl.toggle("oper-down", !port.oper_up);
+  cl.toggle("is-bundled", !!port.bundle);
+  cl.toggle("vc-port", !!port.vc_port);
+
+  // kleur per VC member (afwisselend)
+  const member = info.member ?? 0;
+  cl.toggle("member-0", member % 2 === 0);
+  cl.toggle("member-1", member % 2 === 1);
+
+  setData(el, "description", port.description);
+  setData(el, "bundle", port.bundle);
+  setData(el, "ae", port.type === "ae" ? port.name : null);
+  setData(el, "vcLink", port.vc_port ? vcLinkId(port.name) : null);
 
   const label = el.querySelector(".label-top");
-  label.textContent = port.name.split("/").pop();
+  const text = port.name.split("/").pop();
+  if (label.textContent !== text) label.textContent = text;
 
   const dot = el.querySelector(".dot");
-  dot.className = `dot ${port.oper_up ? "oper-up" : "oper-down"}`;
+  const dotClass = `dot ${port.oper_up ? "oper-up" : "oper-down"}`;
+  if (dot.className !== dotClass) dot.className = dotClass;
 
   // VLAN tokens
   const vlans = [];
   if (port.access_vlan) vlans.push(port.access_vlan);
   if (Array.isArray(port.trunk_vlans)) vlans.push(...port.trunk_vlans);
-  if (vlans.length) el.dataset.vlan = vlans.join(" ");
-  else delete el.dataset.vlan;
-  
+  setData(el, "vlan", vlans.join(" "));
+
   // ---------------------------------------------
   // PENDING BADGES (change + delete) + pulsate
   // ---------------------------------------------
+  const want = port.pending ? (port.pending_type === "delete" ? "DEL" : "PEND") : null;
+  const badge = el.querySelector(".pending-badge");
+  if (badge && badge.textContent !== want) badge.remove();
+
+  if (want && (!badge || badge.textContent !== want)) {
+    const b = document.createElement("div");
+    b.classList.add("pending-badge", "pulsate",
+      want === "DEL" ? "pending-delete" : "pending-change");
+    b.textContent = want;
+    el.appendChild(b);
+  }
+}
+
+// ---------- VC member containers (created on demand, 10-member stacks) ----------
+function memberGrid(n) {
+  let grid = MEMBER_DOM.get(n);
+  if (grid) return grid;
+
+  let block = document.querySelector(`.vc-member[data-member="${n}"]`);
+  if (!block) {
+    block = document.createElement("div");
+    block.className = "vc-member";
+    block.dataset.member = n;
+    block.innerHTML = `
+      <div class="member-header">Member ${n}</div>
+      <div class="member-faceplate">
+        <div class="ge-block">
+          <div id="m${n}-ge-top" class="ge-row"></div>
+          <div id="m${n}-ge-bottom" class="ge-row"></div>
+        </div>
+        <div id="m${n}-xe" class="xe-row"></div>
+      </div>`;
+
+    // keep members in numeric order, all before the AE heading
+    const after = [...document.querySelectorAll(".vc-member[data-member]")]
+      .find(b => Number(b.dataset.member) > n);
+    const aeTitle = document.getElementById("grid-ae")?.previousElementSibling;
+    (after || aeTitle)?.before(block);
+  }
 
-  // verwijder oude badges
-  el.querySelectorAll(".pending-badge").forEach(b => b.remove());
+  grid = {
+    geTop: block.querySelector(`#m${n}-ge-top`),
+    geBottom: block.querySelector(`#m${n}-ge-bottom`),
+    xe: block.querySelector(`#m${n}-xe`),
+  };
+  MEMBER_DOM.set(n, grid);
+  return grid;
+}
 
-  if (port.pending) {
-    const badge = document.createElement("div");
-    badge.classList.add("pending-badge", "pulsate");
+function containerFor(info) {
+  if (info.type === "ae") return document.getElementById("grid-ae");
+  const m = memberGrid(info.member);
+  if (info.type === "xe") return m.xe;
+  return info.index % 2 === 0 ? m.geTop : m.geBottom;
+}
 
-    if (port.pending_type === "delete") {
-      badge.textContent = "DEL";
-      badge.classList.add("pending-delete");
-    } else {
-      badge.textContent = "PEND";
-      badge.classList.add("pending-change");
-    }
+// ---------- frame scheduler ----------
+// Work is queued per interface (latest data wins) and applied in
+// requestAnimationFrame slices of at most FRAME_BUDGET_MS.
+const FRAME_BUDGET_MS = 8;
+const PENDING_PORTS = new Map();   // ifname → port
+let frameRequested = false;
+
+export const RENDER_STATS = {
+  frames: 0,
+  patched: 0,        // tiles whose DOM was touched
+  skipped: 0,        // tiles with unchanged signature
+  lastFrameMs: 0,
+  maxFrameMs: 0,
+  overBudget: 0,     // frames that exceeded FRAME_BUDGET_MS
+  budgetMs: FRAME_BUDGET_MS
+};
+window.__RENDER_STATS__ = RENDER_STATS;
+
+function applyPort(port) {
+  const info = parseIfname(port.name);
+  if (!info) return;
+
+  PORT_DATA.set(port.name, port);
+
+  let el = PORT_DOM.get(port.name);
+  const parent = containerFor(info);
+  if (!el) {
+    el = createPortTile(port);
+    PORT_DOM.set(port.name, el);
+  }
+  if (parent && el.parentElement !== parent) parent.appendChild(el);
 
-    el.appendChild(badge);
+  const sig = portSignature(port);
+  if (PORT_SIG.get(port.name) === sig) {
+    RENDER_STATS.skipped++;
+    return;
   }
+  PORT_SIG.set(port.name, sig);
+  updatePortTile(el, port, info);
+  RENDER_STATS.patched++;
 }
 
-// ---------- main renderer ----------
-export function drawPorts(ports, device) {
+function flushFrame() {
+  frameRequested = false;
+  const t0 = performance.now();
 
-  // first-time init: set RENDER_DEVICE if null
-  if (RENDER_DEVICE === null) {
-    RENDER_DEVICE = device;
-    // do NOT clear PORT_DOM on first set — we want skeleton elements reused
-  } else if (device !== RENDER_DEVICE) {
-    // device changed AFTER initial render
-    // Only clear if switching between TWO real devices (not skeleton -> real)
-    const bothReal = (RENDER_DEVICE !== "__skeleton__") && (device !== "__skeleton__");
-    if (bothReal) {
-      // switching between two real devices -> clear DOM cache so we don't mix devices
-      PORT_DOM.forEach(el => el.remove());
-      PORT_DOM.clear();
-    }
-    // if going skeleton -> real OR real -> skeleton, we keep PORT_DOM and reuse nodes
-    RENDER_DEVICE = device;
+  for (const [name, port] of PENDING_PORTS) {
+    PENDING_PORTS.delete(name);
+    applyPort(port);
+    if (performance.now() - t0 > FRAME_BUDGET_MS) break;
   }
 
-  const grids = {
-    m0: {
-      geTop: document.getElementById("m0-ge-top"),
-      geBottom: document.getElementById("m0-ge-bottom"),
-      xe: document.getElementById("m0-xe"),
-    },
-    m1: {
-      geTop: document.getElementById("m1-ge-top"),
-      geBottom: document.getElementById("m1-ge-bottom"),
-      xe: document.getElementById("m1-xe"),
-    },
-    ae: document.getElementById("grid-ae")
-  };
+  const dt = performance.now() - t0;
+  RENDER_STATS.frames++;
+  RENDER_STATS.lastFrameMs = Math.round(dt * 100) / 100;
+  RENDER_STATS.maxFrameMs = Math.max(RENDER_STATS.maxFrameMs, RENDER_STATS.lastFrameMs);
+  if (dt > FRAME_BUDGET_MS) RENDER_STATS.overBudget++;
 
-  // track which ports we saw this frame
-  const seen = new Set();
-
-  for (const port of ports) {
-    if (!port || !port.name) continue;
-    const info = parseIfname(port.name);
-    if (!info) continue;
+  if (PENDING_PORTS.size) requestFrame();
+}
 
-    seen.add(port.name);
+function requestFrame() {
+  if (frameRequested) return;
+  frameRequested = true;
+  requestAnimationFrame(flushFrame);
+}
 
-    let el = PORT_DOM.get(port.name);
-
-    if (!el) {
-      // not present yet — create and attach
-      el = createPortTile(port);
-      PORT_DOM.set(port.name, el);
-
-      if (info.type === "ae") {
-        grids.ae?.appendChild(el);
-      } else if (info.type === "xe") {
-        const m = port.name.startsWith("xe-1/") ? grids.m1 : grids.m0;
-        m?.xe?.appendChild(el);
-      } else {
-        const m = info.member === 1 ? grids.m1 : grids.m0;
-        const target = info.index % 2 === 0 ? m.geTop : m.geBottom;
-        target?.appendChild(el);
-      }
-    } else {
-      // already have element — ensure it's in the right container (in case structure changed)
-      const parentExpected = (info.type === "ae")
-        ? grids.ae
-        : (info.type === "xe")
-          ? (port.name.startsWith("xe-1/") ? grids.m1?.xe : grids.m0?.xe)
-          : (info.member === 1 ? (info.index % 2 === 0 ? grids.m1?.geTop : grids.m1?.geBottom) : (info.index % 2 === 0 ? grids.m0?.geTop : grids.m0?.geBottom));
-
-      if (parentExpected && el.parentElement !== parentExpected) {
-        parentExpected.appendChild(el);
-      }
-    }
+// ---------- main renderer ----------
+// Keyed by interface name: existing tiles are patched in place, only when
+// their signature changed. Safe to call with the full list on every update.
+export function drawPorts(ports, device) {
+  RENDER_DEVICE = device;
 
-    // update visual state
-    updatePortTile(el, port);
+  const seen = new Set();
+  for (const port of ports) {
+    if (!port || !port.name || !parseIfname(port.name)) continue;
+    seen.add(port.name);
+    PENDING_PORTS.set(port.name, port);
   }
 
-  // cleanup any port DOM entries that are no longer in the incoming list
+  // drop tiles (and queued work) for interfaces that are gone
   for (const [key, el] of PORT_DOM.entries()) {
     if (!seen.has(key)) {
-      // remove from DOM and cache
       el.remove();
       PORT_DOM.delete(key);
+      PORT_SIG.delete(key);
+      PORT_DATA.delete(key);
     }
   }
+  for (const key of PENDING_PORTS.keys()) {
+    if (!seen.has(key)) PENDING_PORTS.delete(key);
+  }
+
+  requestFrame();
+  setTableData(ports.filter(p => p && seen.has(p.name)));
+}
+
+// ---------- virtualized interface table ----------
+// Only the rows in view (+ overscan) exist in the DOM; row elements are
+// reused while scrolling and patched cell by cell.
+const ROW_HEIGHT = 28;
+const OVERSCAN = 8;
+const TABLE = { rows: [], filtered: [], filter: "", pool: [], frame: false };
+
+function portVlans(p) {
+  if (p.mode === "trunk") return (p.trunk_vlans || []).join(", ");
+  return p.access_vlan || "";
+}
+
+function portStatus(p) {
+  if (p.vc_port) return `VC ${p.vc_status || ""}`.trim();
+  if (!p.configured) return "unconfigured";
+  return p.oper_up ? "up" : "down";
+}
+
+function applyTableFilter() {
+  const f = TABLE.filter;
+  TABLE.filtered = !f ? TABLE.rows : TABLE.rows.filter(p =>
+    p.name.toLowerCase().includes(f) ||
+    (p.description || "").toLowerCase().includes(f) ||
+    portVlans(p).toLowerCase().includes(f)
+  );
+}
+
+function setTableData(ports) {
+  TABLE.rows = ports;
+  applyTableFilter();
+  scheduleTable();
+}
+
+function scheduleTable() {
+  if (TABLE.frame) return;
+  TABLE.frame = true;
+  requestAnimationFrame(renderTable);
+}
+
+function tableRow() {
+  const tr = document.createElement("div");
+  tr.className = "pt-row";
+  tr.innerHTML = `<span class="pt-name"></span><span class="pt-status"></span>` +
+    `<span class="pt-mode"></span><span class="pt-vlans"></span><span class="pt-desc"></span>`;
+  tr.addEventListener("click", () => {
+    const port = PORT_DATA.get(tr.dataset.ifname);
+    if (port && !port.vc_port) window.openModalForPort?.(port);
+  });
+  return tr;
+}
+
+function setCell(cell, text) {
+  if (cell.textContent !== text) cell.textContent = text;
+}
+
+function renderTable() {
+  TABLE.frame = false;
+  const box = document.getElementById("port-table");
+  if (!box || box.offsetParent === null) return;   // hidden view
+
+  const spacer = box.querySelector(".pt-spacer");
+  const body = box.querySelector(".pt-rows");
+  const rows = TABLE.filtered;
+
+  spacer.style.height = `${rows.length * ROW_HEIGHT}px`;
+
+  const first = Math.max(0, Math.floor(box.scrollTop / ROW_HEIGHT) - OVERSCAN);
+  const count = Math.ceil(box.clientHeight / ROW_HEIGHT) + 2 * OVERSCAN;
+  const last = Math.min(rows.length, first + count);
+
+  body.style.transform = `translateY(${first * ROW_HEIGHT}px)`;
+
+  while (TABLE.pool.length < last - first) {
+    const tr = tableRow();
+    TABLE.pool.push(tr);
+    body.appendChild(tr);
+  }
+
+  TABLE.pool.forEach((tr, i) => {
+    const p = rows[first + i];
+    if (!p) {
+      tr.hidden = true;
+      return;
+    }
+    tr.hidden = false;
+    tr.dataset.ifname = p.name;
+    const [name, status, mode, vlans, desc] = tr.children;
+    setCell(name, p.name);
+    setCell(status, portStatus(p));
+    setCell(mode, p.vc_port ? "" : (p.mode || ""));
+    setCell(vlans, portVlans(p));
+    setCell(desc, p.description || "");
+    const cls = `pt-row ${p.oper_up ? "pt-up" : "pt-down"}${p.pending ? " pt-pending" : ""}`;
+    if (tr.className !== cls) tr.className = cls;
+  });
+}
+
+export function initPortTable() {
+  const box = document.getElementById("port-table");
+  if (!box) return;
+  box.addEventListener("scroll", scheduleTable, { passive: true });
+  window.addEventListener("resize", scheduleTable);
+
+  const input = document.getElementById("port-table-filter");
+  input?.addEventListener("input", () => {
+    TABLE.filter = input.value.trim().toLowerCase();
+    applyTableFilter();
+    box.scrollTop = 0;
+    scheduleTable();
+  });
 }
 
 